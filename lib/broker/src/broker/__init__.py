@@ -1,5 +1,5 @@
 from .rabbitmq._conn import RabbitMQPool
-from .rabbitmq.settings import RabbitMQSettings
+from .rabbitmq.settings import RabbitMQSettings, SubscriberSettings
 from .rabbitmq.publisher import RabbitMQPublisher
 from .rabbitmq.subscriber import RabbitMQSubscriber
 from .models import TaskMessage
@@ -11,6 +11,7 @@ from aio_pika.abc import AbstractIncomingMessage
 __all__ = [
     "RabbitMQPool",
     "RabbitMQSettings",
+    "SubscriberSettings",
     "RabbitMQPublisher",
     "RabbitMQSubscriber",
     "TaskMessage",
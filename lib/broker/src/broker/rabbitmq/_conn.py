@@ -33,11 +33,20 @@ class RabbitMQPool:
 
         async def create_channel() -> AbstractChannel:
             async with self._pool.acquire() as connection:
-                return await connection.channel()
+                return await connection.channel(publisher_confirms=False)
+
+        async def create_confirm_channel() -> AbstractChannel:
+            async with self._pool.acquire() as connection:
+                return await connection.channel(publisher_confirms=True)
 
         self._channel_pool: Pool[AbstractChannel] = Pool(
             create_channel, max_size=self.settings.max_channel
         )
+        # Kept apart so that only batched publishes pay for the confirms,
+        # channels are opened on first use.
+        self._confirm_channel_pool: Pool[AbstractChannel] = Pool(
+            create_confirm_channel, max_size=self.settings.max_channel
+        )
 
         self.logger.info(
             "RabbitMQ connection initialized",
@@ -53,8 +62,9 @@ class RabbitMQPool:
             yield connection
 
     @asynccontextmanager
-    async def acquire_channel(self):
-        async with self._channel_pool.acquire() as channel:
+    async def acquire_channel(self, confirms: bool = False):
+        pool = self._confirm_channel_pool if confirms else self._channel_pool
+        async with pool.acquire() as channel:
             yield channel
 
     async def bind(self, exchange_name: str, queue_name: str, routing_key: str):
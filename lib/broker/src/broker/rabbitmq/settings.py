@@ -12,3 +12,13 @@ class RabbitMQSettings(BaseModel):
 
     max_conn: int = 2
     max_channel: int = 10
+
+
+class SubscriberSettings(BaseModel):
+    """Consumer-side settings for a RabbitMQ subscriber."""
+
+    prefetch_count: int = 1
+    # Number of callbacks allowed to run concurrently, defaults to prefetch_count.
+    max_in_flight: int | None = None
+    # Seconds to wait for in-flight callbacks on shutdown before giving up.
+    drain_timeout: float = 30.0
@@ -1,7 +1,6 @@
 import asyncio
 from dataclasses import dataclass
-import signal
-from aio_pika.abc import AbstractIncomingMessage
+from aio_pika.abc import AbstractIncomingMessage, AbstractQueue
 
 from structlog.stdlib import BoundLogger
 from logs import get_logger
@@ -14,24 +13,85 @@ from .types import SubcriberCallback
 class RabbitMQSubscriber:
     pool: RabbitMQPool
     queue_name: str
+    prefetch_count: int = 1
+    max_in_flight: int | None = None
+    drain_timeout: float = 30.0
     logger: BoundLogger = get_logger("broker.rabbitmq.subscriber")
 
+    def __post_init__(self):
+        self._semaphore = asyncio.Semaphore(self.max_in_flight or self.prefetch_count)
+        self._in_flight: set[asyncio.Task] = set()
+        self._queue: AbstractQueue | None = None
+        self._consumer_tag: str | None = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
     async def subscribe(self, callback: SubcriberCallback):
         async with self.pool.acquire_channel() as channel:
-            await channel.set_qos(prefetch_count=1)
+            await channel.set_qos(prefetch_count=self.prefetch_count)
             queue = await channel.get_queue(self.queue_name)
+            self._queue = queue
 
             await self.logger.ainfo(
                 "Subscribed to queue",
                 queue=self.queue_name,
+                prefetch_count=self.prefetch_count,
+                max_in_flight=self.max_in_flight or self.prefetch_count,
             )
 
             async def callback_wrapper(msg: AbstractIncomingMessage):
                 async with msg.process(ignore_processed=True):
-                    ret = await callback(msg)
+                    try:
+                        async with self._semaphore:
+                            ret = await callback(msg)
+                    except asyncio.CancelledError:
+                        # Interrupted by shutdown, hand the message back to the queue
+                        await msg.nack(requeue=True)
+                        raise
                     if ret:
                         await msg.ack()
                     else:
                         await msg.reject(requeue=False)
 
-            return queue.consume(callback_wrapper)
+            async def on_message(msg: AbstractIncomingMessage):
+                task = asyncio.create_task(callback_wrapper(msg))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+            async def consume() -> str:
+                self._consumer_tag = await queue.consume(on_message)
+                return self._consumer_tag
+
+            return consume()
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """
+        Stop consuming new messages and wait for in-flight callbacks to finish.
+        Callbacks still running after the timeout are cancelled and requeued.
+        """
+        if self._queue is not None and self._consumer_tag is not None:
+            await self._queue.cancel(self._consumer_tag)
+            self._consumer_tag = None
+
+        if not self._in_flight:
+            return
+
+        await self.logger.ainfo(
+            "Draining in-flight messages",
+            queue=self.queue_name,
+            in_flight=len(self._in_flight),
+        )
+        _, pending = await asyncio.wait(
+            set(self._in_flight),
+            timeout=timeout if timeout is not None else self.drain_timeout,
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await self.logger.ainfo(
+            "Subscriber drained",
+            queue=self.queue_name,
+            requeued=len(pending),
+        )
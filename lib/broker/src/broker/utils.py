@@ -1,12 +1,15 @@
 import asyncio
 import signal
+from collections.abc import Awaitable, Callable
 
 from structlog.stdlib import BoundLogger
 from logs import get_logger
 
 
 async def start_subscriber(
-    coro, logger: BoundLogger = get_logger("broker.rabbitmq.runner")
+    coro,
+    logger: BoundLogger = get_logger("broker.rabbitmq.runner"),
+    drain: Callable[[], Awaitable[None]] | None = None,
 ) -> None:
 
     shutdown_event = asyncio.Event()
@@ -16,6 +19,12 @@ async def start_subscriber(
 
     _task = asyncio.create_task(coro)
     await shutdown_event.wait()
+    if drain is not None:
+        await logger.ainfo("Shutdown requested, draining subscriber")
+        try:
+            await drain()
+        except Exception:
+            await logger.aexception("Error while draining subscriber")
     _task.cancel()
     try:
         await _task
@@ -2,16 +2,43 @@ from .proto import (
     ObjectStorageOptionalPutArgs,
     ObjectStorage,
     ObjectStorageOptionalGetArgs,
+    StoredObject,
+)
+from .codec import (
+    ArtifactCodec,
+    JSONCodec,
+    MsgpackCodec,
+    ArrowCodec,
+    get_codec,
+    codec_for_content_type,
+)
+from .compression import (
+    Compressor,
+    ZstdCompressor,
+    Lz4Compressor,
+    get_compressor,
 )
 from ._minio import MinIOStorage, MinIOOptionalGetArgs, MinIOOptionalPutArgs
-from .settings import MinioSettings
+from .settings import MinioSettings, CompressionSettings
 
 __all__ = [
     "ObjectStorage",
     "ObjectStorageOptionalGetArgs",
     "ObjectStorageOptionalPutArgs",
+    "StoredObject",
+    "ArtifactCodec",
+    "JSONCodec",
+    "MsgpackCodec",
+    "ArrowCodec",
+    "get_codec",
+    "codec_for_content_type",
+    "Compressor",
+    "ZstdCompressor",
+    "Lz4Compressor",
+    "get_compressor",
     "MinIOStorage",
     "MinIOOptionalGetArgs",
     "MinIOOptionalPutArgs",
     "MinioSettings",
+    "CompressionSettings",
 ]
@@ -1,14 +1,22 @@
-from dataclasses import asdict
-from typing import BinaryIO
+import asyncio
+import io
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from functools import partial
+from typing import Any, BinaryIO
 
 import minio
+import urllib3
 from minio.sse import SseCustomerKey, Sse
 from minio.commonconfig import Tags
 from minio.retention import Retention
+from minio.error import S3Error
 
 from structlog.stdlib import BoundLogger
 
 from .settings import MinioSettings
+from .compression import Compressor, get_compressor
 
 from logs import get_logger
 
@@ -16,9 +24,33 @@ from .proto import (
     ObjectStorage,
     ObjectStorageOptionalGetArgs,
     ObjectStorageOptionalPutArgs,
+    StoredObject,
 )
 
 
+_META_PREFIX = "x-amz-meta-"
+# Metadata key recording the compression applied to the stored bytes
+_COMPRESSION_KEY = "compression"
+
+# Buckets known to exist, shared by every MinIOStorage in the process so that
+# uploads skip the `bucket_exists` round trip once a bucket has been seen.
+_known_buckets: set[str] = set()
+_bucket_locks: dict[str, asyncio.Lock] = {}
+
+
+def _is_missing_bucket(error: Exception) -> bool:
+    return isinstance(error, S3Error) and error.code == "NoSuchBucket"
+
+
+def _is_missing_object(error: Exception) -> bool:
+    return isinstance(error, S3Error) and error.code in (
+        "NoSuchKey",
+        "NoSuchBucket",
+        "NoSuchObject",
+    )
+
+
+@dataclass(slots=True)
 class MinIOOptionalGetArgs(ObjectStorageOptionalGetArgs):
     offset: int = 0
     length: int = 0
@@ -28,10 +60,9 @@ class MinIOOptionalGetArgs(ObjectStorageOptionalGetArgs):
     extra_query_params: dict[str, str | list[str] | tuple[str]] | None = None
 
 
+@dataclass(slots=True)
 class MinIOOptionalPutArgs(ObjectStorageOptionalPutArgs):
     length: int = 1
-    content_type: str = "application/octet-stream"
-    metadata: dict[str, str | list[str] | tuple[str]] | None = None
     sse: Sse | None = None
     part_size: int = 0
     num_parallel_uploads: int = 3
@@ -40,24 +71,159 @@ class MinIOOptionalPutArgs(ObjectStorageOptionalPutArgs):
     legal_hold: bool = False
 
 
+def _as_kwargs(optional_args: Any, exclude: tuple[str, ...] = ()) -> dict[str, Any]:
+    # `dataclasses.asdict` deep-copies values and rebuilds dict subclasses such
+    # as `Tags`, so read the fields shallowly instead.
+    return {
+        f.name: getattr(optional_args, f.name)
+        for f in fields(optional_args)
+        if f.name not in exclude
+    }
+
+
+class _AsyncChunkReader(io.RawIOBase):
+    """
+    Blocking file-like view over an async chunk iterator, read by minio from a
+    worker thread while the chunks are produced on the event loop. The thread
+    must not belong to a pool the iterator depends on, see `put_stream`.
+    """
+
+    def __init__(
+        self, chunks: AsyncIterable[bytes], loop: asyncio.AbstractEventLoop
+    ) -> None:
+        self._chunks = aiter(chunks)
+        self._loop = loop
+        self._buffer = bytearray()
+        self._eof = False
+
+    async def _next_chunk(self) -> bytes:
+        return await anext(self._chunks)
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(
+                    self._next_chunk(), self._loop
+                ).result()
+            except StopAsyncIteration:
+                self._eof = True
+                break
+            self._buffer += chunk
+        if size < 0 or size > len(self._buffer):
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
 class MinIOStorage(ObjectStorage):
     def __init__(
         self, settings: MinioSettings, logger: BoundLogger = get_logger("S3.MinIO")
     ):
+        self._settings = settings
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.max_workers, thread_name_prefix="minio"
+        )
+        self._stream_executor = ThreadPoolExecutor(
+            max_workers=settings.stream_max_workers,
+            thread_name_prefix="minio-stream",
+        )
         self._client = minio.Minio(
             endpoint=settings.endpoint,
             access_key=settings.access_key.get_secret_value(),
             secret_key=settings.secret_key.get_secret_value(),
             secure=False,
+            http_client=urllib3.PoolManager(
+                maxsize=settings.max_workers,
+                timeout=urllib3.Timeout(connect=300, read=300),
+                retries=urllib3.Retry(
+                    total=5,
+                    backoff_factor=0.2,
+                    status_forcelist=[500, 502, 503, 504],
+                ),
+            ),
         )
         self._logger = logger
+        # Built eagerly so a missing compression extra fails at startup
+        self._compressors: dict[str, Compressor] = {
+            bucket_name: get_compressor(c.algorithm, c.level)
+            for bucket_name, c in settings.compression.items()
+        }
+        self._decompressors: dict[str, Compressor] = {}
+
+    def _decompressor(self, name: str) -> Compressor:
+        if name not in self._decompressors:
+            self._decompressors[name] = get_compressor(name)
+        return self._decompressors[name]
+
+    def _compression_metadata(
+        self, compressor: Compressor, metadata: dict | None, **extra: str
+    ) -> dict:
+        return {**(metadata or {}), _COMPRESSION_KEY: compressor.name, **extra}
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking minio call on the storage thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(func, *args, **kwargs)
+        )
 
     async def _check_bucket(self, bucket_name: str):
-        if not self._client.bucket_exists(bucket_name):
-            await self._logger.ainfo(
-                "Bucket do not exists, creating new one", bucket_name=bucket_name
+        if bucket_name in _known_buckets:
+            return
+        lock = _bucket_locks.setdefault(bucket_name, asyncio.Lock())
+        async with lock:
+            if bucket_name in _known_buckets:
+                return
+            if not await self._run(self._client.bucket_exists, bucket_name):
+                await self._logger.ainfo(
+                    "Bucket do not exists, creating new one", bucket_name=bucket_name
+                )
+                try:
+                    await self._run(self._client.make_bucket, bucket_name)
+                except S3Error as e:
+                    # Another process created it in the meantime
+                    if e.code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                        raise
+            _known_buckets.add(bucket_name)
+
+    def _forget_bucket(self, bucket_name: str) -> None:
+        _known_buckets.discard(bucket_name)
+
+    async def ensure_buckets(self, bucket_names: Iterable[str]) -> None:
+        """
+        Pre-warm the bucket cache, creating any missing bucket.
+        """
+        await asyncio.gather(*(self._check_bucket(b) for b in set(bucket_names)))
+
+    def _read_object(
+        self, bucket_name: str, object_name: str, **kwargs
+    ) -> StoredObject:
+        resp = None
+        try:
+            resp = self._client.get_object(bucket_name, object_name, **kwargs)
+            data = resp.read()
+            metadata = {
+                k.lower().removeprefix(_META_PREFIX): v
+                for k, v in resp.headers.items()
+                if k.lower().startswith(_META_PREFIX)
+            }
+            if compression := metadata.get(_COMPRESSION_KEY):
+                data = self._decompressor(compression).decompress(data)
+            return StoredObject(
+                data=data,
+                content_type=resp.headers.get(
+                    "Content-Type", "application/octet-stream"
+                ),
+                metadata=metadata,
             )
-            self._client.make_bucket(bucket_name)
+        finally:
+            if resp:
+                resp.close()
+                resp.release_conn()
 
     async def get_file(
         self,
@@ -65,30 +231,51 @@ class MinIOStorage(ObjectStorage):
         object_name: str,
         optional_args: ObjectStorageOptionalGetArgs = ObjectStorageOptionalGetArgs(),
     ) -> bytes | None:
-        kwargs = {}
-        if isinstance(optional_args, MinIOOptionalGetArgs):
-            kwargs = asdict(optional_args)
-        resp = None
+        obj = await self.get_object(bucket_name, object_name, optional_args)
+        return obj.data if obj else None
+
+    async def get_object(
+        self,
+        bucket_name: str,
+        object_name: str,
+        optional_args: ObjectStorageOptionalGetArgs = ObjectStorageOptionalGetArgs(),
+    ) -> StoredObject | None:
+        kwargs = _as_kwargs(optional_args)
         try:
-            resp = self._client.get_object(bucket_name, object_name, **kwargs)
-            if resp.status == 200:
-                await self._logger.ainfo(
-                    "File found", bucket_name=bucket_name, object_name=object_name
-                )
-                return resp.read()
+            obj = await self._run(
+                self._read_object, bucket_name, object_name, **kwargs
+            )
             await self._logger.ainfo(
-                "File not found", bucket_name=bucket_name, object_name=object_name
+                "File found", bucket_name=bucket_name, object_name=object_name
             )
-            return None
-        except Exception:
+            return obj
+        except Exception as e:
+            if _is_missing_bucket(e):
+                self._forget_bucket(bucket_name)
+            if _is_missing_object(e):
+                # An expected outcome for lookups, e.g. cache misses
+                await self._logger.adebug(
+                    "File not found", bucket_name=bucket_name, object_name=object_name
+                )
+                return None
             await self._logger.aexception(
                 "Error getting file", bucket_name=bucket_name, object_name=object_name
             )
             return None
-        finally:
-            if resp:
-                resp.close()
-                resp.release_conn()
+
+    async def exists(self, bucket_name: str, object_name: str) -> bool:
+        """
+        Whether the object is stored, using a HEAD request.
+        """
+        try:
+            await self._run(self._client.stat_object, bucket_name, object_name)
+            return True
+        except S3Error as e:
+            if _is_missing_bucket(e):
+                self._forget_bucket(bucket_name)
+            if _is_missing_object(e):
+                return False
+            raise
 
     async def put_file(
         self,
@@ -99,14 +286,47 @@ class MinIOStorage(ObjectStorage):
     ) -> tuple[str, str] | None:
         try:
             await self._check_bucket(bucket_name)
-            kwargs = {}
-            if isinstance(optional_args, MinIOOptionalPutArgs):
-                kwargs = asdict(optional_args)
-            data_length = len(data.read())
-            data.seek(0)
-            _ = self._client.put_object(
-                bucket_name, object_name, data, length=data_length, **kwargs
-            )
+            kwargs = _as_kwargs(optional_args, exclude=("length",))
+            # Measure the payload by seeking rather than reading it into memory
+            start = data.tell()
+            data_length = data.seek(0, io.SEEK_END) - start
+            data.seek(start)
+            compressor = self._compressors.get(bucket_name)
+            if (
+                compressor is not None
+                and data_length >= self._settings.compression[bucket_name].min_size
+            ):
+                compressed = await self._run(compressor.compress, data.read())
+                kwargs["metadata"] = self._compression_metadata(
+                    compressor,
+                    kwargs.get("metadata"),
+                    **{"uncompressed-size": str(data_length)},
+                )
+                data, start, data_length = io.BytesIO(compressed), 0, len(compressed)
+            try:
+                _ = await self._run(
+                    self._client.put_object,
+                    bucket_name,
+                    object_name,
+                    data,
+                    length=data_length,
+                    **kwargs,
+                )
+            except S3Error as e:
+                if not _is_missing_bucket(e):
+                    raise
+                # The bucket was removed behind the cache's back, recreate it once
+                self._forget_bucket(bucket_name)
+                await self._check_bucket(bucket_name)
+                data.seek(start)
+                _ = await self._run(
+                    self._client.put_object,
+                    bucket_name,
+                    object_name,
+                    data,
+                    length=data_length,
+                    **kwargs,
+                )
             await self._logger.ainfo(
                 "File uploaded", bucket_name=bucket_name, object_name=object_name
             )
@@ -116,3 +336,124 @@ class MinIOStorage(ObjectStorage):
                 "Error uploading file", bucket_name=bucket_name, object_name=object_name
             )
             return None
+
+    async def get_stream(
+        self,
+        bucket_name: str,
+        object_name: str,
+        chunk_size: int | None = None,
+        optional_args: ObjectStorageOptionalGetArgs = ObjectStorageOptionalGetArgs(),
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield the object in chunks of at most `chunk_size` bytes, so only one
+        chunk is held in memory at a time. Compressed objects are decompressed
+        chunk by chunk, `chunk_size` then applies to the stored bytes.
+        """
+        kwargs = _as_kwargs(optional_args)
+        chunk_size = chunk_size or self._settings.stream_chunk_size
+        try:
+            resp = await self._run(
+                self._client.get_object, bucket_name, object_name, **kwargs
+            )
+        except Exception as e:
+            if _is_missing_bucket(e):
+                self._forget_bucket(bucket_name)
+            await self._logger.aexception(
+                "Error getting file", bucket_name=bucket_name, object_name=object_name
+            )
+            raise
+        try:
+            compression = resp.headers.get(_META_PREFIX + _COMPRESSION_KEY)
+            decompressor = (
+                self._decompressor(compression).stream_decompressor()
+                if compression
+                else None
+            )
+            stream = resp.stream(chunk_size)
+            while (chunk := await self._run(next, stream, None)) is not None:
+                if decompressor is not None:
+                    chunk = await self._run(decompressor.decompress, chunk)
+                    if not chunk:
+                        continue
+                yield chunk
+        finally:
+            resp.close()
+            resp.release_conn()
+
+    async def put_stream(
+        self,
+        bucket_name: str,
+        object_name: str,
+        chunks: AsyncIterable[bytes],
+        optional_args: ObjectStorageOptionalPutArgs = ObjectStorageOptionalPutArgs(),
+    ) -> tuple[str, str] | None:
+        """
+        Upload an async chunk iterator as a multipart object of unknown length.
+        Peak memory is bounded by `part_size * num_parallel_uploads`. Chunks
+        are compressed on the fly when the bucket has compression enabled.
+        """
+        try:
+            await self._check_bucket(bucket_name)
+            kwargs = _as_kwargs(optional_args, exclude=("length",))
+            if not isinstance(optional_args, MinIOOptionalPutArgs):
+                kwargs["num_parallel_uploads"] = self._settings.stream_parallel_uploads
+            kwargs["part_size"] = (
+                kwargs.get("part_size") or self._settings.stream_part_size
+            )
+            compressor = self._compressors.get(bucket_name)
+            if compressor is not None:
+                chunks = self._compress_stream(compressor, chunks)
+                kwargs["metadata"] = self._compression_metadata(
+                    compressor, kwargs.get("metadata")
+                )
+            loop = asyncio.get_running_loop()
+            reader = _AsyncChunkReader(chunks, loop)
+            # The upload thread blocks until the next chunk is produced. Run
+            # it off the main pool, so sources that need the main pool (such
+            # as a get_stream) never wait on threads held by the uploads.
+            _ = await loop.run_in_executor(
+                self._stream_executor,
+                partial(
+                    self._client.put_object,
+                    bucket_name,
+                    object_name,
+                    reader,
+                    length=-1,
+                    **kwargs,
+                ),
+            )
+            await self._logger.ainfo(
+                "File streamed",
+                bucket_name=bucket_name,
+                object_name=object_name,
+                part_size=kwargs["part_size"],
+            )
+            return (bucket_name, object_name)
+        except Exception as e:
+            if _is_missing_bucket(e):
+                self._forget_bucket(bucket_name)
+            await self._logger.aexception(
+                "Error streaming file",
+                bucket_name=bucket_name,
+                object_name=object_name,
+            )
+            return None
+
+    async def _compress_stream(
+        self, compressor: Compressor, chunks: AsyncIterable[bytes]
+    ) -> AsyncIterator[bytes]:
+        # Runs off the storage pools: a stream thread is blocked reading this
+        # very iterator inside `put_object`.
+        stream = compressor.stream_compressor()
+        async for chunk in chunks:
+            if compressed := await asyncio.to_thread(stream.compress, chunk):
+                yield compressed
+        if tail := await asyncio.to_thread(stream.flush):
+            yield tail
+
+    async def close(self):
+        # Waited for off the loop: stream uploads still read their chunks on
+        # it, and other shutdown work (e.g. draining) goes on meanwhile.
+        await asyncio.to_thread(self._stream_executor.shutdown, wait=True)
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        await self._logger.ainfo("MinIO storage closed")
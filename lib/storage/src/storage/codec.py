@@ -0,0 +1,172 @@
+import json
+from typing import Any, Protocol
+
+
+class ArtifactCodec(Protocol):
+    """
+    Encoding of pipeline artifacts. The content type is recorded with the
+    stored object so readers can pick the matching codec.
+    """
+
+    content_type: str
+
+    def encode(self, data: Any) -> bytes: ...
+
+    def decode(self, data: bytes) -> Any: ...
+
+
+class JSONCodec:
+    content_type = "application/json"
+
+    def encode(self, data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """Compact binary row format, requires the `msgpack` extra."""
+
+    content_type = "application/x-msgpack"
+
+    def __init__(self):
+        import msgpack  # type: ignore[import]
+
+        self._msgpack = msgpack
+
+    def encode(self, data: Any) -> bytes:
+        return self._msgpack.packb(data, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False)
+
+
+class ArrowCodec:
+    """
+    Columnar Arrow IPC, requires the `arrow` extra.
+
+    Every list field of the artifact is written as its own IPC stream: lists
+    of rows (e.g. chunks, entities) as record batches with one column per
+    key, other lists as a single `value` column. The remaining fields are kept
+    as JSON in the schema metadata of a leading stream. `decode_tables` gives
+    the lists as tables over the payload without copying it.
+    """
+
+    content_type = "application/vnd.apache.arrow.stream"
+
+    _FIELD = b"artifact.field"
+    _KIND = b"artifact.kind"
+    _JSON = b"artifact.json"
+
+    def __init__(self):
+        import pyarrow as pa  # type: ignore[import]
+
+        self._pa = pa
+
+    def _write(self, sink: Any, table: Any, metadata: dict[bytes, bytes]) -> None:
+        table = table.replace_schema_metadata(metadata)
+        with self._pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    def encode(self, data: Any) -> bytes:
+        pa = self._pa
+        if isinstance(data, dict):
+            lists = {k: v for k, v in data.items() if isinstance(v, list)}
+            header = {
+                self._KIND: b"fields",
+                self._JSON: json.dumps(
+                    {k: v for k, v in data.items() if k not in lists},
+                    ensure_ascii=False,
+                ).encode("utf-8"),
+            }
+        else:
+            lists = {}
+            header = {
+                self._KIND: b"root",
+                self._JSON: json.dumps(data, ensure_ascii=False).encode("utf-8"),
+            }
+
+        sink = pa.BufferOutputStream()
+        self._write(sink, pa.table({}), header)
+        for name, values in lists.items():
+            if values and all(isinstance(v, dict) for v in values):
+                kind = b"rows"
+                table = pa.Table.from_batches(
+                    [pa.RecordBatch.from_struct_array(pa.array(values))]
+                )
+            else:
+                kind = b"values"
+                table = pa.table({"value": pa.array(values)})
+            self._write(
+                sink,
+                table,
+                {self._FIELD: name.encode("utf-8"), self._KIND: kind},
+            )
+        return sink.getvalue().to_pybytes()
+
+    def decode_tables(self, data: bytes) -> tuple[Any, dict[str, Any]]:
+        """
+        The non-list fields of the artifact, or the whole artifact when it is
+        not a mapping, and its lists as `pyarrow.Table` keyed by field name.
+        """
+        pa = self._pa
+        buffer = pa.py_buffer(data)
+        source = pa.BufferReader(buffer)
+        header = pa.ipc.open_stream(source).read_all().schema.metadata
+        fields = json.loads(header[self._JSON])
+        tables: dict[str, Any] = {}
+        while source.tell() < buffer.size:
+            table = pa.ipc.open_stream(source).read_all()
+            tables[table.schema.metadata[self._FIELD].decode("utf-8")] = table
+        if header[self._KIND] == b"root":
+            return fields, {}
+        return fields, tables
+
+    def decode(self, data: bytes) -> Any:
+        fields, tables = self.decode_tables(data)
+        if not isinstance(fields, dict):
+            return fields
+        for name, table in tables.items():
+            # Converted column by column, not row by row
+            columns = table.to_pydict()
+            if table.schema.metadata[self._KIND] == b"rows":
+                fields[name] = [
+                    dict(zip(columns, values)) for values in zip(*columns.values())
+                ]
+            else:
+                fields[name] = columns["value"]
+        return fields
+
+
+_CODECS: dict[str, type[ArtifactCodec]] = {
+    "json": JSONCodec,
+    "msgpack": MsgpackCodec,
+    "arrow": ArrowCodec,
+}
+
+_CONTENT_TYPES: dict[str, type[ArtifactCodec]] = {
+    codec.content_type: codec for codec in _CODECS.values()
+}
+
+
+def get_codec(name: str) -> ArtifactCodec:
+    """
+    Get a codec by short name (`json`, `msgpack`, `arrow`) or content type.
+    """
+    codec = _CODECS.get(name) or _CONTENT_TYPES.get(name)
+    if codec is None:
+        raise ValueError(f"Unknown artifact codec: {name}")
+    return codec()
+
+
+def codec_for_content_type(content_type: str | None) -> ArtifactCodec:
+    """
+    Codec for a stored object's content type. Objects written before codecs
+    were recorded carry a generic content type and are JSON.
+    """
+    if content_type:
+        codec = _CONTENT_TYPES.get(content_type.split(";")[0].strip())
+        if codec is not None:
+            return codec()
+    return JSONCodec()
@@ -0,0 +1,114 @@
+from typing import Protocol
+
+
+class StreamCompressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class StreamDecompressor(Protocol):
+    def decompress(self, data: bytes) -> bytes: ...
+
+
+class Compressor(Protocol):
+    """
+    Compression applied to stored objects. The name is recorded in the object
+    metadata so reads can pick the matching decompressor.
+    """
+
+    name: str
+
+    def compress(self, data: bytes) -> bytes: ...
+
+    def decompress(self, data: bytes) -> bytes: ...
+
+    def stream_compressor(self) -> StreamCompressor: ...
+
+    def stream_decompressor(self) -> StreamDecompressor: ...
+
+
+class ZstdCompressor:
+    """Zstandard frames, requires the `zstd` extra."""
+
+    name = "zstd"
+
+    def __init__(self, level: int | None = None):
+        import zstandard  # type: ignore[import]
+
+        self._zstd = zstandard
+        self._level = 3 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return self._zstd.ZstdCompressor(level=self._level).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        # Frames written by the stream compressor carry no content size, which
+        # the one-shot `ZstdDecompressor.decompress` requires.
+        return self.stream_decompressor().decompress(data)
+
+    def stream_compressor(self) -> StreamCompressor:
+        return self._zstd.ZstdCompressor(level=self._level).compressobj()
+
+    def stream_decompressor(self) -> StreamDecompressor:
+        return self._zstd.ZstdDecompressor().decompressobj()
+
+
+class _Lz4StreamCompressor:
+    def __init__(self, compressor):
+        self._compressor = compressor
+        self._started = False
+
+    def _begin(self) -> bytes:
+        if self._started:
+            return b""
+        self._started = True
+        return self._compressor.begin()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._begin() + self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._begin() + self._compressor.flush()
+
+
+class Lz4Compressor:
+    """LZ4 frames, requires the `lz4` extra. Faster than zstd, larger output."""
+
+    name = "lz4"
+
+    def __init__(self, level: int | None = None):
+        import lz4.frame  # type: ignore[import]
+
+        self._lz4 = lz4.frame
+        self._level = 0 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return self._lz4.compress(data, compression_level=self._level)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._lz4.decompress(data)
+
+    def stream_compressor(self) -> StreamCompressor:
+        return _Lz4StreamCompressor(
+            self._lz4.LZ4FrameCompressor(compression_level=self._level)
+        )
+
+    def stream_decompressor(self) -> StreamDecompressor:
+        return self._lz4.LZ4FrameDecompressor()
+
+
+_COMPRESSORS: dict[str, type[Compressor]] = {
+    "zstd": ZstdCompressor,
+    "lz4": Lz4Compressor,
+}
+
+
+def get_compressor(name: str, level: int | None = None) -> Compressor:
+    """
+    Get a compressor by the name recorded in object metadata.
+    """
+    compressor = _COMPRESSORS.get(name)
+    if compressor is None:
+        raise ValueError(f"Unknown compression: {name}")
+    return compressor(level)
@@ -1,5 +1,6 @@
+from collections.abc import AsyncIterable, AsyncIterator
 from typing import Protocol, BinaryIO
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass(slots=True)
@@ -9,7 +10,16 @@ class ObjectStorageOptionalGetArgs:
 
 @dataclass(slots=True)
 class ObjectStorageOptionalPutArgs:
-    pass
+    content_type: str = "application/octet-stream"
+    metadata: dict[str, str | list[str] | tuple[str]] | None = None
+
+
+@dataclass(slots=True)
+class StoredObject:
+    data: bytes
+    content_type: str = "application/octet-stream"
+    # User metadata recorded with the object, keys lower-cased without prefix
+    metadata: dict[str, str] = field(default_factory=dict)
 
 
 class ObjectStorage(Protocol):
@@ -21,6 +31,15 @@ class ObjectStorage(Protocol):
         optional_args: ObjectStorageOptionalGetArgs = ObjectStorageOptionalGetArgs(),
     ) -> bytes | None: ...
 
+    async def get_object(
+        self,
+        bucket_name: str,
+        object_name: str,
+        optional_args: ObjectStorageOptionalGetArgs = ObjectStorageOptionalGetArgs(),
+    ) -> StoredObject | None: ...
+
+    async def exists(self, bucket_name: str, object_name: str) -> bool: ...
+
     async def put_file(
         self,
         bucket_name: str,
@@ -28,3 +47,19 @@ class ObjectStorage(Protocol):
         data: BinaryIO,
         optional_args: ObjectStorageOptionalPutArgs = ObjectStorageOptionalPutArgs(),
     ) -> tuple[str, str] | None: ...
+
+    def get_stream(
+        self,
+        bucket_name: str,
+        object_name: str,
+        chunk_size: int | None = None,
+        optional_args: ObjectStorageOptionalGetArgs = ObjectStorageOptionalGetArgs(),
+    ) -> AsyncIterator[bytes]: ...
+
+    async def put_stream(
+        self,
+        bucket_name: str,
+        object_name: str,
+        chunks: AsyncIterable[bytes],
+        optional_args: ObjectStorageOptionalPutArgs = ObjectStorageOptionalPutArgs(),
+    ) -> tuple[str, str] | None: ...
@@ -1,7 +1,37 @@
+from typing import Literal
+
 from pydantic import BaseModel, SecretStr
 
 
+class CompressionSettings(BaseModel):
+    algorithm: Literal["zstd", "lz4"] = "zstd"
+    # Codec specific level, None uses the library default
+    level: int | None = None
+    # Objects smaller than this are stored as is, the frame overhead and CPU
+    # time outweigh the savings.
+    min_size: int = 4096
+
+
 class MinioSettings(BaseModel):
     endpoint: str
     access_key: SecretStr
     secret_key: SecretStr
+
+    # Size of the thread pool running blocking minio calls, also used as the
+    # HTTP connection pool size so every worker thread can hold a connection.
+    max_workers: int = 8
+
+    # Streaming transfers: size of the chunks yielded by get_stream and the
+    # multipart part size / parallelism used by put_stream.
+    stream_chunk_size: int = 1024 * 1024
+    stream_part_size: int = 16 * 1024 * 1024
+    stream_parallel_uploads: int = 3
+    # Threads running put_stream uploads, separate from `max_workers`: they
+    # block on the source iterator, which may itself need the main pool
+    # (e.g. a get_stream of the same storage).
+    stream_max_workers: int = 4
+
+    # Opt-in compression per bucket name, e.g. {"crawler": {"algorithm": "zstd"}}.
+    # The algorithm is recorded in the object metadata and reads decompress
+    # transparently, whatever the current setting of the bucket.
+    compression: dict[str, CompressionSettings] = {}
@@ -1,14 +1,45 @@
-from .proto import TaskController
+from .proto import TaskController, OutboxPublisher
 from .pg._controller import PostgreSQLController
-from .models import TaskCreate, Task, TaskStatus, TaskUpdate, TaskInfo, Pipeline
+from .buffered import BufferedTaskController
+from .recorder import StageRecorder
+from .settings import StatusWriterSettings
+from .pg.ddl import install as install_schema, ensure_partitions
+from .pg.listener import TaskListener
+from .models import (
+    TaskCreate,
+    Task,
+    TaskStatus,
+    TaskUpdate,
+    TaskInfo,
+    Pipeline,
+    SubtaskCount,
+    OutboxMessage,
+    TaskEvent,
+    StageRecord,
+    StageStats,
+    TaskPage,
+)
 
 __all__ = [
     "TaskController",
+    "OutboxPublisher",
     "PostgreSQLController",
+    "BufferedTaskController",
+    "StageRecorder",
+    "StatusWriterSettings",
+    "install_schema",
+    "ensure_partitions",
+    "TaskListener",
     "TaskCreate",
     "Task",
     "TaskStatus",
     "TaskUpdate",
     "TaskInfo",
     "Pipeline",
+    "SubtaskCount",
+    "OutboxMessage",
+    "TaskEvent",
+    "StageRecord",
+    "StageStats",
+    "TaskPage",
 ]
@@ -0,0 +1,209 @@
+import asyncio
+import datetime
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+
+from .proto import TaskController, OutboxPublisher
+from .models import (
+    TaskCreate,
+    Task,
+    TaskUpdate,
+    TaskStatus,
+    SubtaskCount,
+    OutboxMessage,
+    StageRecord,
+    StageStats,
+    TaskPage,
+)
+
+
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+
+def _merge(
+    previous: TaskUpdate, update: TaskUpdate, ranks: dict[str, int]
+) -> TaskUpdate:
+    """
+    Fold `update` into the earlier `previous` update of the same task. A
+    terminal status is kept over a later non-terminal one, with its phase,
+    and a phase earlier in `ranks` than the previous one is dropped.
+    """
+    fields = update.model_dump(exclude={"id"}, exclude_none=True)
+    if update.status not in TERMINAL_STATUSES:
+        if previous.status in TERMINAL_STATUSES:
+            fields.pop("status", None)
+            fields.pop("phase", None)
+        elif (
+            previous.phase in ranks
+            and update.phase in ranks
+            and ranks[update.phase] < ranks[previous.phase]
+        ):
+            fields.pop("phase")
+    return TaskUpdate(
+        id=update.id,
+        **{**previous.model_dump(exclude={"id"}, exclude_none=True), **fields},
+    )
+
+
+@dataclass
+class BufferedTaskController(TaskController):
+    """
+    Write-behind status updates over another controller.
+
+    `update` buffers the update in memory, merged with the pending update of
+    the same task, and the buffer is written with one `update_many` once it
+    holds `max_batch` tasks or `flush_interval` seconds after the first
+    buffered update. Terminal statuses are written before `update` returns.
+    Given the pipeline `phases` in execution order, late updates never move a
+    task back to an earlier phase, in the buffer nor in the database.
+    Every other method goes straight to the wrapped controller. `close` must
+    be awaited on shutdown to write what is left.
+    """
+
+    controller: TaskController
+    max_batch: int = 500
+    flush_interval: float = 0.5
+    phases: Sequence[str] = ()
+    logger: BoundLogger = get_logger("tasks.controller.buffered")
+
+    def __post_init__(self):
+        self._ranks = {phase: i for i, phase in enumerate(self.phases)}
+        self._pending: dict[str, TaskUpdate] = {}
+        # Flushes are serialised so an older batch never lands after a newer
+        self._lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+
+    async def update(self, task: TaskUpdate):
+        previous = self._pending.get(task.id)
+        self._pending[task.id] = (
+            _merge(previous, task, self._ranks) if previous else task
+        )
+        if task.status in TERMINAL_STATUSES or len(self._pending) >= self.max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def update_many(
+        self, tasks: Sequence[TaskUpdate], phases: Sequence[str] = ()
+    ):
+        for task in tasks:
+            await self.update(task)
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception:
+            await self.logger.aexception(
+                "Failed to write task updates", pending=len(self._pending)
+            )
+            if self._pending and self._timer is None:
+                self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        """
+        Write every buffered update. Updates that could not be written are
+        buffered again, behind any newer update of the same task.
+        """
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            try:
+                await self.controller.update_many(
+                    list(batch.values()), self.phases
+                )
+            except BaseException:
+                for task_id, update in batch.items():
+                    newer = self._pending.get(task_id)
+                    self._pending[task_id] = (
+                        _merge(update, newer, self._ranks) if newer else update
+                    )
+                raise
+        await self.logger.adebug("Task updates written", count=len(batch))
+
+    async def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
+
+    async def create(self, task: TaskCreate):
+        return await self.controller.create(task)
+
+    async def get(self, task_id: str) -> Task | None:
+        return await self.controller.get(task_id)
+
+    async def create_with_outbox(self, task: TaskCreate, message: OutboxMessage):
+        return await self.controller.create_with_outbox(task, message)
+
+    async def create_many(
+        self, tasks: Sequence[TaskCreate], messages: Sequence[OutboxMessage] = ()
+    ):
+        return await self.controller.create_many(tasks, messages)
+
+    async def get_many(self, task_ids: Sequence[str]) -> list[Task]:
+        return await self.controller.get_many(task_ids)
+
+    async def relay_outbox(self, publish: OutboxPublisher, limit: int) -> int:
+        return await self.controller.relay_outbox(publish, limit)
+
+    async def create_subtasks(
+        self, parent_id: str, count: int, phase: str
+    ) -> list[str]:
+        return await self.controller.create_subtasks(parent_id, count, phase)
+
+    async def complete_subtask(
+        self, task_id: str, parent_id: str, phase: str, resource_url: str
+    ) -> list[str] | None:
+        return await self.controller.complete_subtask(
+            task_id, parent_id, phase, resource_url
+        )
+
+    async def count_subtasks(self, parent_id: str) -> list[SubtaskCount]:
+        return await self.controller.count_subtasks(parent_id)
+
+    async def count_subtasks_many(
+        self, parent_ids: Sequence[str]
+    ) -> dict[str, list[SubtaskCount]]:
+        return await self.controller.count_subtasks_many(parent_ids)
+
+    async def record_stages(self, records: Sequence[StageRecord]):
+        return await self.controller.record_stages(records)
+
+    async def stage_stats(
+        self,
+        since: datetime.datetime,
+        until: datetime.datetime,
+        bucket: datetime.timedelta | None = None,
+    ) -> list[StageStats]:
+        return await self.controller.stage_stats(since, until, bucket)
+
+    async def purge(
+        self,
+        before: datetime.datetime,
+        limit: int,
+        statuses: Sequence[TaskStatus] = (TaskStatus.COMPLETED,),
+        archive: bool = True,
+    ) -> int:
+        return await self.controller.purge(before, limit, statuses, archive)
+
+    # Defined last, the name shadows the builtin in the class body
+    async def list(
+        self,
+        status: TaskStatus | None = None,
+        phase: str | None = None,
+        department: str | None = None,
+        since: datetime.datetime | None = None,
+        include_subtasks: bool = False,
+        cursor: str | None = None,
+        limit: int = 100,
+    ) -> TaskPage:
+        return await self.controller.list(
+            status, phase, department, since, include_subtasks, cursor, limit
+        )
@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Any
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator, model_validator
 from enum import Enum
 
 
@@ -23,6 +23,7 @@ class TaskCreate(BaseModel):
     status: TaskStatus
     department: str
     phase: str
+    parent_id: str | None = None
 
 
 class Task(BaseModel):
@@ -32,6 +33,77 @@ class Task(BaseModel):
     phase: str
     createAt: datetime
     updateAt: datetime
+    # Set on sub-tasks created by a fan-out, `resource_url` holds the output of
+    # a completed sub-task for the fan-in.
+    parent_id: str | None = None
+    resource_url: str | None = None
+
+
+class TaskEvent(BaseModel):
+    """
+    Change of a task status or phase, as notified by Postgres. The previous
+    values are unset for new tasks.
+    """
+
+    id: str
+    status: TaskStatus
+    phase: str
+    parent_id: str | None = None
+    previous_status: TaskStatus | None = None
+    previous_phase: str | None = None
+
+    @field_validator("status", "previous_status", mode="before")
+    @classmethod
+    def _status_name(cls, value: Any) -> Any:
+        # Statuses are stored by name
+        return TaskStatus[value] if isinstance(value, str) else value
+
+
+class StageRecord(BaseModel):
+    """
+    One run of a pipeline stage for a task. Byte counts are unset when the
+    stage input or output was not read from or written to storage.
+    """
+
+    task_id: str
+    phase: str
+    status: TaskStatus
+    started_at: datetime
+    finished_at: datetime
+    worker_id: str
+    bytes_in: int | None = None
+    bytes_out: int | None = None
+
+
+class StageStats(BaseModel):
+    phase: str
+    window_start: datetime
+    count: int
+    failed: int
+    # Durations in seconds of the completed runs
+    p50: float | None
+    p95: float | None
+    p99: float | None
+    bytes_in: int | None
+    bytes_out: int | None
+
+
+class OutboxMessage(BaseModel):
+    exchange_name: str
+    routing_key: str
+    payload: bytes
+
+
+class TaskPage(BaseModel):
+    tasks: list[Task]
+    # Opaque cursor of the next page, None on the last page
+    next_cursor: str | None = None
+
+
+class SubtaskCount(BaseModel):
+    phase: str
+    status: TaskStatus
+    count: int
 
 
 class TaskInfo(BaseModel):
@@ -44,10 +116,21 @@ class TaskInfo(BaseModel):
     last: bool = False
 
     routing_key: str
+    # Queue the stage consumes when the pipeline uses per-stage queues,
+    # defaults to `<backlog_queue_name>.<task_name>`.
+    queue_name: str | None = None
 
     bucket_name: str
     object_name: str
 
+    # Persist this stage's output even when it runs inside a fused chain
+    checkpoint: bool = False
+
+    # Split the stage output into sub-tasks of at most this many documents,
+    # processed in parallel by the following stages and gathered again before
+    # the builder. 0 disables the fan-out.
+    fan_out: int = 0
+
     args: dict[str, Any] = {}
 
 
@@ -56,3 +139,94 @@ class Pipeline(BaseModel):
     exchange_name: str
     backlog_queue_name: str
     builder_queue_name: str
+
+    # Consecutive stages executed in-process by a single worker, passing their
+    # outputs in memory. Empty means every stage goes through the broker.
+    fuse: list[str] = []
+
+    # Artifact codec used by the workers (`json`, `msgpack` or `arrow`). Readers
+    # follow the content type stored with each object, so it can be changed
+    # while artifacts of the previous format are still in flight.
+    codec: str = "json"
+
+    # Key stage outputs by a hash of their input and handler configuration
+    # instead of the task id, so stages whose output already exists are
+    # skipped and repeated queries reuse the stored artifacts.
+    content_addressed: bool = False
+
+    # Give every stage its own queue, routed by `<exchange_name>.<task_name>`,
+    # so workers can serve a subset of the stages. Otherwise all stages share
+    # the backlog queue and are routed by their `routing_key`.
+    stage_queues: bool = False
+
+    @model_validator(mode="after")
+    def _check_fuse(self) -> "Pipeline":
+        for name in self.fuse:
+            if name not in self.pipeline:
+                raise ValueError(f"Fused stage '{name}' is not in the pipeline")
+        for prev, name in zip(self.fuse, self.fuse[1:]):
+            if self.pipeline[prev].next_task_name != name:
+                raise ValueError(
+                    f"Fused stages must be consecutive, '{name}' does not follow '{prev}'"
+                )
+            if self.pipeline[prev].fan_out:
+                raise ValueError(
+                    f"Fan-out stage '{prev}' must be the last of the fused stages"
+                )
+        return self
+
+    def fused_chain(self, task_name: str) -> list[str]:
+        """
+        Stages to run in-process for a message addressed to `task_name`.
+        """
+        if task_name in self.fuse:
+            return self.fuse[self.fuse.index(task_name) :]
+        return [task_name]
+
+    @property
+    def phases(self) -> list[str]:
+        """
+        Task phases in execution order, from the first stage to the one
+        following the last (the builder).
+        """
+        phases = [self.first_task_name]
+        while phases[-1] in self.pipeline and len(phases) <= len(self.pipeline):
+            phases.append(self.pipeline[phases[-1]].next_task_name)
+        return phases
+
+    @property
+    def first_task_name(self) -> str:
+        for task_name, task_info in self.pipeline.items():
+            if task_info.first:
+                return task_name
+        raise ValueError("No first task found in the pipeline configuration")
+
+    def input_queue(self, task_name: str) -> str:
+        """
+        Queue holding the messages addressed to a stage. Names outside the
+        pipeline (the builder) map to the builder queue.
+        """
+        if task_name not in self.pipeline:
+            return self.builder_queue_name
+        if not self.stage_queues:
+            return self.backlog_queue_name
+        return (
+            self.pipeline[task_name].queue_name
+            or f"{self.backlog_queue_name}.{task_name}"
+        )
+
+    def input_routing_key(self, task_name: str) -> str:
+        """Routing key of the messages addressed to a stage."""
+        return f"{self.exchange_name}.{task_name}"
+
+    def output_route(self, task_name: str) -> tuple[str, str]:
+        """
+        Routing key and destination queue of the messages a stage publishes.
+        """
+        task_info = self.pipeline[task_name]
+        if not self.stage_queues:
+            return task_info.routing_key, self.input_queue(task_info.next_task_name)
+        return (
+            self.input_routing_key(task_info.next_task_name),
+            self.input_queue(task_info.next_task_name),
+        )
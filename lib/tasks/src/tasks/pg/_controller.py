@@ -1,15 +1,65 @@
+import base64
+import datetime
+import json
+from collections.abc import Sequence
 from dataclasses import dataclass
 
-from sqlalchemy import insert, update
+from sqlalchemy import (
+    String,
+    and_,
+    any_,
+    case,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from structlog.stdlib import BoundLogger
 
 from logs import get_logger
 from db import PostgresClient
 
-from ..proto import TaskController
-from ..models import TaskCreate, Task, TaskUpdate
+from ..proto import TaskController, OutboxPublisher
+from ..models import (
+    TaskCreate,
+    Task,
+    TaskUpdate,
+    TaskStatus,
+    SubtaskCount,
+    OutboxMessage,
+    StageRecord,
+    StageStats,
+    TaskPage,
+)
 
-from .schema import Task as TaskSchema
+from .schema import Task as TaskSchema, TaskArchive, Outbox, StageEvent
+
+
+def _array(items: Sequence[str]):
+    # A single array parameter, `= ANY(...)` instead of one parameter per id
+    return literal(list(items), ARRAY(String))
+
+
+def _encode_cursor(task: TaskSchema) -> str:
+    key = json.dumps([task.updateAt.isoformat(), task.id])
+    return base64.urlsafe_b64encode(key.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime.datetime, str]:
+    try:
+        updated, task_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.datetime.fromisoformat(updated), task_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 
 @dataclass
@@ -44,6 +94,75 @@ class PostgreSQLController(TaskController):
                 await session.execute(stmt)
                 await self.logger.ainfo("Task updated", task_id=task.id, **values)
 
+    async def update_many(
+        self, tasks: Sequence[TaskUpdate], phases: Sequence[str] = ()
+    ):
+        """
+        Update several tasks with a single `UPDATE ... FROM (VALUES ...)`.
+        Fields left unset keep their value. Updates to a non-terminal status
+        do not apply to tasks already completed or failed, so a late write
+        can not move a finished task back. Likewise, given the `phases` in
+        execution order, a phase earlier than the stored one is only applied
+        with a terminal status.
+        """
+        if not tasks:
+            return
+        rows = values(
+            column("id", String),
+            column("status", String),
+            column("department", String),
+            column("phase", String),
+            name="task_updates",
+        ).data(
+            [
+                (
+                    task.id,
+                    task.status.name if task.status is not None else None,
+                    task.department,
+                    task.phase,
+                )
+                for task in tasks
+            ]
+        )
+        status = cast(rows.c.status, TaskSchema.__table__.c.status.type)
+        terminal = [TaskStatus.COMPLETED.name, TaskStatus.FAILED.name]
+        order = _array(phases)
+        stmt = (
+            update(TaskSchema)
+            .where(TaskSchema.id == rows.c.id)
+            .where(
+                or_(
+                    rows.c.status.in_(terminal),
+                    TaskSchema.status.not_in(
+                        [TaskStatus.COMPLETED, TaskStatus.FAILED]
+                    ),
+                )
+            )
+            .values(
+                status=func.coalesce(status, TaskSchema.status),
+                department=func.coalesce(rows.c.department, TaskSchema.department),
+                phase=(
+                    case(
+                        (
+                            and_(
+                                func.coalesce(rows.c.status, "").not_in(terminal),
+                                func.array_position(order, rows.c.phase)
+                                < func.array_position(order, TaskSchema.phase),
+                            ),
+                            TaskSchema.phase,
+                        ),
+                        else_=func.coalesce(rows.c.phase, TaskSchema.phase),
+                    )
+                    if phases
+                    else func.coalesce(rows.c.phase, TaskSchema.phase)
+                ),
+            )
+        )
+        async with self.client.get_session() as session:
+            async with session.begin():
+                await session.execute(stmt)
+        await self.logger.ainfo("Tasks updated", count=len(tasks))
+
     async def get(self, task_id: str) -> Task | None:
         async with self.client.get_session() as session:
             async with session.begin():
@@ -55,3 +174,422 @@ class PostgreSQLController(TaskController):
                     if result
                     else None
                 )
+
+    async def create_with_outbox(self, task: TaskCreate, message: OutboxMessage):
+        """
+        Create a task together with the message announcing it, in one
+        transaction. The message is published later by `relay_outbox`.
+        """
+        await self.create_many([task], [message])
+
+    async def create_many(
+        self, tasks: Sequence[TaskCreate], messages: Sequence[OutboxMessage] = ()
+    ):
+        """
+        Create several tasks with a single multi-row insert, along with their
+        outbox messages in the same transaction.
+        """
+        if not tasks:
+            return
+        async with self.client.get_session() as session:
+            async with session.begin():
+                await session.execute(
+                    insert(TaskSchema).values(
+                        [
+                            task.model_dump(exclude_none=True, exclude_unset=True)
+                            for task in tasks
+                        ]
+                    )
+                )
+                if messages:
+                    await session.execute(
+                        insert(Outbox).values(
+                            [message.model_dump() for message in messages]
+                        )
+                    )
+                await self.logger.ainfo("Tasks created", count=len(tasks))
+
+    async def relay_outbox(self, publish: OutboxPublisher, limit: int) -> int:
+        """
+        Publish up to `limit` outbox messages, oldest first, and delete them
+        once the broker confirmed them. Rows are claimed with `SKIP LOCKED` so
+        several relays can run side by side. A failed publish rolls back and
+        leaves the messages for the next attempt. Returns the number of
+        messages published.
+        """
+        async with self.client.get_session() as session:
+            async with session.begin():
+                rows = (
+                    await session.execute(
+                        select(Outbox)
+                        .order_by(Outbox.id)
+                        .limit(limit)
+                        .with_for_update(skip_locked=True)
+                    )
+                ).scalars().all()
+                if not rows:
+                    return 0
+                batches: dict[str, list[tuple[str, bytes]]] = {}
+                for row in rows:
+                    batches.setdefault(row.exchange_name, []).append(
+                        (row.routing_key, row.payload)
+                    )
+                for exchange_name, messages in batches.items():
+                    await publish(exchange_name, messages)
+                await session.execute(
+                    delete(Outbox).where(Outbox.id.in_([row.id for row in rows]))
+                )
+        await self.logger.adebug("Outbox relayed", count=len(rows))
+        return len(rows)
+
+    async def get_many(self, task_ids: Sequence[str]) -> list[Task]:
+        """
+        Tasks among `task_ids` that exist, in no particular order.
+        """
+        if not task_ids:
+            return []
+        async with self.client.get_session() as session:
+            async with session.begin():
+                result = await session.scalars(
+                    select(TaskSchema).where(TaskSchema.id == any_(_array(task_ids)))
+                )
+                return [
+                    Task.model_validate(row, from_attributes=True)
+                    for row in result.all()
+                ]
+
+    async def create_subtasks(
+        self, parent_id: str, count: int, phase: str
+    ) -> list[str]:
+        """
+        Create `count` pending sub-tasks `<parent_id>.<i>` of a task. Sub-tasks
+        left by an earlier run, e.g. on a redelivered message, are reset to
+        pending and those beyond `count` are deleted, so the fan-in neither
+        waits for nor gathers parts of another split.
+        """
+        ids = [f"{parent_id}.{i}" for i in range(count)]
+        async with self.client.get_session() as session:
+            async with session.begin():
+                department = await session.scalar(
+                    select(TaskSchema.department).where(TaskSchema.id == parent_id)
+                )
+                if department is None:
+                    raise ValueError(f"Task not found: {parent_id}")
+                stmt = pg_insert(TaskSchema).values(
+                    [
+                        {
+                            "id": task_id,
+                            "status": TaskStatus.PENDING,
+                            "department": department,
+                            "phase": phase,
+                            "parent_id": parent_id,
+                        }
+                        for task_id in ids
+                    ]
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[TaskSchema.id],
+                    set_={
+                        "status": stmt.excluded.status,
+                        "phase": stmt.excluded.phase,
+                        "resource_url": None,
+                    },
+                )
+                await session.execute(stmt)
+                await session.execute(
+                    delete(TaskSchema).where(
+                        TaskSchema.parent_id == parent_id,
+                        TaskSchema.id.not_in(ids),
+                    )
+                )
+                await self.logger.ainfo(
+                    "Sub-tasks created", task_id=parent_id, count=count
+                )
+        return ids
+
+    async def complete_subtask(
+        self, task_id: str, parent_id: str, phase: str, resource_url: str
+    ) -> list[str] | None:
+        """
+        Mark a sub-task completed with its output. Returns the outputs of all
+        sub-tasks, in order, to the caller completing the last one and None
+        otherwise, so exactly one caller proceeds past the fan-in.
+
+        A redelivered sub-task that is already completed gets the outputs
+        again while the parent is not finished, so a fan-in interrupted
+        before its publish is retried.
+        """
+        async with self.client.get_session() as session:
+            async with session.begin():
+                # Completions of the same parent are serialised on its row
+                parent_status = await session.scalar(
+                    select(TaskSchema.status)
+                    .where(TaskSchema.id == parent_id)
+                    .with_for_update()
+                )
+                previous = await session.scalar(
+                    select(TaskSchema.status).where(TaskSchema.id == task_id)
+                )
+                if previous == TaskStatus.COMPLETED:
+                    if parent_status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+                        return None
+                else:
+                    await session.execute(
+                        update(TaskSchema)
+                        .where(TaskSchema.id == task_id)
+                        .values(
+                            status=TaskStatus.COMPLETED,
+                            phase=phase,
+                            resource_url=resource_url,
+                        )
+                    )
+                rows = (
+                    await session.execute(
+                        select(
+                            TaskSchema.id, TaskSchema.status, TaskSchema.resource_url
+                        ).where(TaskSchema.parent_id == parent_id)
+                    )
+                ).all()
+        await self.logger.ainfo(
+            "Sub-task completed", task_id=task_id, parent_id=parent_id
+        )
+        if any(row.status != TaskStatus.COMPLETED for row in rows):
+            return None
+        rows.sort(key=lambda row: int(row.id.rsplit(".", 1)[1]))
+        return [row.resource_url for row in rows]
+
+    async def count_subtasks(self, parent_id: str) -> list[SubtaskCount]:
+        async with self.client.get_session() as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(TaskSchema.phase, TaskSchema.status, func.count())
+                    .where(TaskSchema.parent_id == parent_id)
+                    .group_by(TaskSchema.phase, TaskSchema.status)
+                )
+                return [
+                    SubtaskCount(phase=phase, status=status, count=count)
+                    for phase, status, count in result.all()
+                ]
+
+    async def count_subtasks_many(
+        self, parent_ids: Sequence[str]
+    ) -> dict[str, list[SubtaskCount]]:
+        """
+        Sub-task counts of several tasks, keyed by parent id. Tasks without
+        sub-tasks are left out.
+        """
+        if not parent_ids:
+            return {}
+        async with self.client.get_session() as session:
+            async with session.begin():
+                result = await session.execute(
+                    select(
+                        TaskSchema.parent_id,
+                        TaskSchema.phase,
+                        TaskSchema.status,
+                        func.count(),
+                    )
+                    .where(TaskSchema.parent_id == any_(_array(parent_ids)))
+                    .group_by(
+                        TaskSchema.parent_id, TaskSchema.phase, TaskSchema.status
+                    )
+                )
+                counts: dict[str, list[SubtaskCount]] = {}
+                for parent_id, phase, status, count in result.all():
+                    counts.setdefault(parent_id, []).append(
+                        SubtaskCount(phase=phase, status=status, count=count)
+                    )
+                return counts
+
+    async def record_stages(self, records: Sequence[StageRecord]):
+        """
+        Append stage runs to the task history with a single insert.
+        """
+        if not records:
+            return
+        async with self.client.get_session() as session:
+            async with session.begin():
+                await session.execute(
+                    insert(StageEvent).values(
+                        [record.model_dump() for record in records]
+                    )
+                )
+        await self.logger.adebug("Stage runs recorded", count=len(records))
+
+    async def stage_stats(
+        self,
+        since: datetime.datetime,
+        until: datetime.datetime,
+        bucket: datetime.timedelta | None = None,
+    ) -> list[StageStats]:
+        """
+        Duration percentiles of the stage runs started in `[since, until)`,
+        per phase and, when `bucket` is given, per time bucket from `since`.
+        Only the partitions covering the range are scanned.
+        """
+        duration = case(
+            (
+                StageEvent.status == TaskStatus.COMPLETED,
+                func.extract("epoch", StageEvent.finished_at - StageEvent.started_at),
+            )
+        )
+        if bucket is None:
+            window = literal(since, StageEvent.started_at.type)
+        else:
+            window = func.date_bin(
+                literal(bucket), StageEvent.started_at, literal(since)
+            )
+        # Grouped by output name, a repeated expression would get new
+        # parameters and no longer match the selected one
+        window_start = literal_column("window_start")
+        stmt = (
+            select(
+                StageEvent.phase,
+                window.label("window_start"),
+                func.count(),
+                func.count().filter(StageEvent.status == TaskStatus.FAILED),
+                func.percentile_cont(0.5).within_group(duration),
+                func.percentile_cont(0.95).within_group(duration),
+                func.percentile_cont(0.99).within_group(duration),
+                func.sum(StageEvent.bytes_in),
+                func.sum(StageEvent.bytes_out),
+            )
+            .where(StageEvent.started_at >= since, StageEvent.started_at < until)
+            .group_by(StageEvent.phase, window_start)
+            .order_by(window_start, StageEvent.phase)
+        )
+        async with self.client.get_session() as session:
+            async with session.begin():
+                result = await session.execute(stmt)
+                return [
+                    StageStats(
+                        phase=phase,
+                        window_start=window_start,
+                        count=count,
+                        failed=failed,
+                        p50=p50,
+                        p95=p95,
+                        p99=p99,
+                        bytes_in=bytes_in,
+                        bytes_out=bytes_out,
+                    )
+                    for (
+                        phase,
+                        window_start,
+                        count,
+                        failed,
+                        p50,
+                        p95,
+                        p99,
+                        bytes_in,
+                        bytes_out,
+                    ) in result.all()
+                ]
+
+    async def purge(
+        self,
+        before: datetime.datetime,
+        limit: int,
+        statuses: Sequence[TaskStatus] = (TaskStatus.COMPLETED,),
+        archive: bool = True,
+    ) -> int:
+        """
+        Delete up to `limit` top-level tasks with one of `statuses` last
+        updated before `before`, together with their sub-tasks, copying them
+        to `tasks_archive` first when `archive` is set. Rows locked by other
+        transactions are skipped. Returns the number of rows removed.
+        """
+        doomed = (
+            select(TaskSchema.id)
+            .where(
+                TaskSchema.parent_id.is_(None),
+                TaskSchema.status.in_(statuses),
+                TaskSchema.updateAt < before,
+            )
+            .order_by(TaskSchema.updateAt)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .cte("doomed")
+        )
+        columns = [
+            "id",
+            "status",
+            "department",
+            "phase",
+            "createAt",
+            "updateAt",
+            "parent_id",
+            "resource_url",
+        ]
+        deleted = (
+            delete(TaskSchema)
+            .where(
+                or_(
+                    TaskSchema.id.in_(select(doomed.c.id)),
+                    TaskSchema.parent_id.in_(select(doomed.c.id)),
+                )
+            )
+            .returning(*(TaskSchema.__table__.c[name] for name in columns))
+            .cte("deleted")
+        )
+        if archive:
+            stmt = (
+                insert(TaskArchive)
+                .from_select(columns, select(*(deleted.c[name] for name in columns)))
+                .add_cte(deleted)
+            )
+        else:
+            stmt = select(func.count()).select_from(deleted)
+        async with self.client.get_session() as session:
+            async with session.begin():
+                result = await session.execute(stmt)
+                count = result.rowcount if archive else result.scalar_one()
+        await self.logger.ainfo("Tasks purged", count=count, archived=archive)
+        return count
+
+    # Defined last, the name shadows the builtin in the class body
+    async def list(
+        self,
+        status: TaskStatus | None = None,
+        phase: str | None = None,
+        department: str | None = None,
+        since: datetime.datetime | None = None,
+        include_subtasks: bool = False,
+        cursor: str | None = None,
+        limit: int = 100,
+    ) -> TaskPage:
+        """
+        Tasks matching the filters, most recently updated first. Pages are
+        keyed on `(updateAt, id)`, pass `next_cursor` to get the next one.
+        `since` bounds `updateAt`, naive values are taken as UTC. Sub-tasks
+        are left out by default.
+        """
+        stmt = select(TaskSchema)
+        if status is not None:
+            stmt = stmt.where(TaskSchema.status == status)
+        if phase is not None:
+            stmt = stmt.where(TaskSchema.phase == phase)
+        if department is not None:
+            stmt = stmt.where(TaskSchema.department == department)
+        if since is not None:
+            # `updateAt` holds the database time without zone, UTC
+            if since.tzinfo is not None:
+                since = since.astimezone(datetime.UTC).replace(tzinfo=None)
+            stmt = stmt.where(TaskSchema.updateAt >= since)
+        if not include_subtasks:
+            stmt = stmt.where(TaskSchema.parent_id.is_(None))
+        if cursor is not None:
+            stmt = stmt.where(
+                tuple_(TaskSchema.updateAt, TaskSchema.id) < _decode_cursor(cursor)
+            )
+        # One extra row tells whether there is a next page
+        stmt = stmt.order_by(TaskSchema.updateAt.desc(), TaskSchema.id.desc())
+        stmt = stmt.limit(limit + 1)
+        async with self.client.get_session() as session:
+            async with session.begin():
+                rows = (await session.scalars(stmt)).all()
+        page = rows[:limit]
+        return TaskPage(
+            tasks=[Task.model_validate(row, from_attributes=True) for row in page],
+            next_cursor=_encode_cursor(page[-1]) if len(rows) > limit else None,
+        )
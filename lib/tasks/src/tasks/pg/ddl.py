@@ -0,0 +1,112 @@
+import datetime
+
+from sqlalchemy import text
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+from db import PostgresClient
+
+
+# Channel notified with a `TaskEvent` payload whenever the status or phase
+# of a task changes.
+NOTIFY_CHANNEL = "task_events"
+
+# `create_all` only creates missing tables, these bring tables created by
+# earlier versions up to date. Every statement must be idempotent.
+UPGRADES = [
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS parent_id VARCHAR",
+    "ALTER TABLE tasks ADD COLUMN IF NOT EXISTS resource_url VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_parent_id ON tasks (parent_id)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_status_update_at "
+    'ON tasks (status, "updateAt")',
+    "CREATE INDEX IF NOT EXISTS ix_tasks_department_create_at "
+    'ON tasks (department, "createAt")',
+    f"""
+    CREATE OR REPLACE FUNCTION notify_task_change() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE'
+            AND OLD.status IS NOT DISTINCT FROM NEW.status
+            AND OLD.phase IS NOT DISTINCT FROM NEW.phase THEN
+            RETURN NEW;
+        END IF;
+        PERFORM pg_notify(
+            '{NOTIFY_CHANNEL}',
+            json_build_object(
+                'id', NEW.id,
+                'status', NEW.status,
+                'phase', NEW.phase,
+                'parent_id', NEW.parent_id,
+                'previous_status', CASE WHEN TG_OP = 'UPDATE' THEN OLD.status END,
+                'previous_phase', CASE WHEN TG_OP = 'UPDATE' THEN OLD.phase END
+            )::text
+        );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE TRIGGER tasks_notify
+    AFTER INSERT OR UPDATE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION notify_task_change()
+    """,
+]
+
+
+def _add_months(day: datetime.date, months: int) -> datetime.date:
+    month = day.month - 1 + months
+    return datetime.date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_statements(today: datetime.date, months_ahead: int = 2) -> list[str]:
+    """
+    Monthly partitions of `stage_events` from the current month to
+    `months_ahead` months later, and a default partition for rows outside.
+    """
+    first = today.replace(day=1)
+    statements = [
+        "CREATE TABLE IF NOT EXISTS stage_events_default "
+        "PARTITION OF stage_events DEFAULT"
+    ]
+    for i in range(months_ahead + 1):
+        start = _add_months(first, i)
+        end = _add_months(first, i + 1)
+        statements.append(
+            f"CREATE TABLE IF NOT EXISTS stage_events_{start:%Y_%m} "
+            f"PARTITION OF stage_events "
+            f"FOR VALUES FROM ('{start.isoformat()} 00:00+00') "
+            f"TO ('{end.isoformat()} 00:00+00')"
+        )
+    return statements
+
+
+async def ensure_partitions(
+    client: PostgresClient,
+    months_ahead: int = 2,
+    logger: BoundLogger = get_logger("tasks.pg.ddl"),
+) -> None:
+    """
+    Create the upcoming monthly partitions of `stage_events`. Run at start
+    and periodically by long running services.
+    """
+    statements = partition_statements(
+        datetime.datetime.now(datetime.UTC).date(), months_ahead
+    )
+    async with client.get_session() as session:
+        async with session.begin():
+            for statement in statements:
+                await session.execute(text(statement))
+    await logger.ainfo("Stage event partitions ensured", months_ahead=months_ahead)
+
+
+async def install(
+    client: PostgresClient, logger: BoundLogger = get_logger("tasks.pg.ddl")
+) -> None:
+    """
+    Apply the schema upgrades of the tasks tables.
+    """
+    async with client.get_session() as session:
+        async with session.begin():
+            for statement in UPGRADES:
+                await session.execute(text(statement))
+    await ensure_partitions(client, logger=logger)
+    await logger.ainfo("Tasks schema up to date", statements=len(UPGRADES))
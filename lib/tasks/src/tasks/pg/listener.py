@@ -0,0 +1,114 @@
+import asyncio
+from collections import defaultdict
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+from db import PostgresClient
+
+from ..models import TaskEvent
+from .ddl import NOTIFY_CHANNEL
+
+
+# Queued for subscribers when events may have been missed, e.g. after the
+# listener reconnected. Subscribers should reload the state of their tasks.
+RESYNC = None
+
+
+@dataclass
+class TaskListener:
+    """
+    Single `LISTEN` connection fanning task events out to in-process
+    subscribers. A subscriber of a task also receives the events of its
+    sub-tasks.
+    """
+
+    client: PostgresClient
+    # Events buffered per subscriber, the oldest are dropped past that
+    queue_size: int = 256
+    reconnect_delay: float = 1.0
+    logger: BoundLogger = get_logger("tasks.listener.pg")
+
+    def __post_init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+    @asynccontextmanager
+    async def subscribe(
+        self, task_ids: Iterable[str]
+    ) -> AsyncIterator[asyncio.Queue[TaskEvent | None]]:
+        """
+        Queue receiving the events of `task_ids` until the context exits.
+        """
+        queue: asyncio.Queue[TaskEvent | None] = asyncio.Queue(self.queue_size)
+        ids = set(task_ids)
+        for task_id in ids:
+            self._subscribers[task_id].add(queue)
+        try:
+            yield queue
+        finally:
+            for task_id in ids:
+                queues = self._subscribers.get(task_id)
+                if queues is None:
+                    continue
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[task_id]
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, item: TaskEvent | None) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    def _dispatch(self, event: TaskEvent) -> None:
+        queues: set[asyncio.Queue] = set()
+        for task_id in (event.id, event.parent_id):
+            if task_id is not None:
+                queues.update(self._subscribers.get(task_id, ()))
+        for queue in queues:
+            self._deliver(queue, event)
+
+    def _resync(self) -> None:
+        for queue in {q for queues in self._subscribers.values() for q in queues}:
+            self._deliver(queue, RESYNC)
+
+    async def _listen(self) -> None:
+        async with self.client.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.exec_driver_sql(f"LISTEN {NOTIFY_CHANNEL}")
+            raw = await conn.get_raw_connection()
+            await self.logger.ainfo("Listening for task events")
+            self._resync()
+            async for notify in raw.driver_connection.notifies():
+                try:
+                    event = TaskEvent.model_validate_json(notify.payload)
+                except ValueError:
+                    await self.logger.awarning(
+                        "Invalid task event", payload=notify.payload
+                    )
+                    continue
+                self._dispatch(event)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """
+        Listen until `stop` is set, reconnecting after connection errors.
+        """
+        while not stop.is_set():
+            listen = asyncio.create_task(self._listen())
+            stopped = asyncio.create_task(stop.wait())
+            await asyncio.wait({listen, stopped}, return_when=asyncio.FIRST_COMPLETED)
+            if stopped.done():
+                listen.cancel()
+                await asyncio.gather(listen, return_exceptions=True)
+                break
+            stopped.cancel()
+            await self.logger.aerror(
+                "Task listener disconnected",
+                error=str(listen.exception()),
+                retry_in=self.reconnect_delay,
+            )
+            await asyncio.sleep(self.reconnect_delay)
+        await self.logger.ainfo("Task listener stopped")
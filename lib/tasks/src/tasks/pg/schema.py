@@ -1,6 +1,6 @@
 import datetime
 
-from sqlalchemy import func
+from sqlalchemy import BigInteger, DateTime, Identity, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from db.engines.pg import Base
@@ -9,6 +9,10 @@ from ..models import TaskStatus
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_status_update_at", "status", "updateAt"),
+        Index("ix_tasks_department_create_at", "department", "createAt"),
+    )
 
     id: Mapped[str] = mapped_column(
         primary_key=True,
@@ -20,3 +24,64 @@ class Task(Base):
     updateAt: Mapped[datetime.datetime] = mapped_column(
         server_default=func.now(), onupdate=func.now()
     )
+    parent_id: Mapped[str | None] = mapped_column(index=True)
+    resource_url: Mapped[str | None]
+
+
+class TaskArchive(Base):
+    """
+    Tasks moved out of `tasks` by the retention job.
+    """
+
+    __tablename__ = "tasks_archive"
+
+    id: Mapped[str] = mapped_column(primary_key=True)
+    status: Mapped[TaskStatus]
+    department: Mapped[str]
+    phase: Mapped[str]
+    createAt: Mapped[datetime.datetime]
+    updateAt: Mapped[datetime.datetime]
+    parent_id: Mapped[str | None]
+    resource_url: Mapped[str | None]
+    archivedAt: Mapped[datetime.datetime] = mapped_column(server_default=func.now())
+
+
+class Outbox(Base):
+    """
+    Messages written in the same transaction as their task, published to the
+    broker afterwards by a relay.
+    """
+
+    __tablename__ = "task_outbox"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    exchange_name: Mapped[str]
+    routing_key: Mapped[str]
+    payload: Mapped[bytes]
+    createAt: Mapped[datetime.datetime] = mapped_column(server_default=func.now())
+
+
+class StageEvent(Base):
+    """
+    Append-only history of stage runs, partitioned by month of `started_at`.
+    Partitions are created by `ddl.ensure_partitions`.
+    """
+
+    __tablename__ = "stage_events"
+    __table_args__ = (
+        Index("ix_stage_events_phase_started_at", "phase", "started_at"),
+        {"postgresql_partition_by": "RANGE (started_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, Identity(), primary_key=True)
+    # Part of the key, partitioned tables require it
+    started_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    task_id: Mapped[str] = mapped_column(index=True)
+    phase: Mapped[str]
+    status: Mapped[TaskStatus]
+    finished_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True))
+    worker_id: Mapped[str]
+    bytes_in: Mapped[int | None] = mapped_column(BigInteger)
+    bytes_out: Mapped[int | None] = mapped_column(BigInteger)
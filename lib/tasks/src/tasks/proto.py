@@ -1,9 +1,71 @@
+import datetime
+from collections.abc import Awaitable, Callable, Sequence
 from typing import Protocol
 
-from .models import TaskCreate, Task, TaskUpdate
+from .models import (
+    TaskCreate,
+    Task,
+    TaskUpdate,
+    SubtaskCount,
+    OutboxMessage,
+    StageRecord,
+    StageStats,
+    TaskPage,
+    TaskStatus,
+)
+
+
+# Publishes `(routing_key, payload)` pairs to an exchange
+OutboxPublisher = Callable[[str, Sequence[tuple[str, bytes]]], Awaitable[object]]
 
 
 class TaskController(Protocol):
     async def create(self, task: TaskCreate): ...
     async def update(self, task: TaskUpdate): ...
+    async def update_many(
+        self, tasks: Sequence[TaskUpdate], phases: Sequence[str] = ()
+    ): ...
     async def get(self, task_id: str) -> Task | None: ...
+    async def create_with_outbox(
+        self, task: TaskCreate, message: OutboxMessage
+    ) -> None: ...
+    async def create_many(
+        self, tasks: Sequence[TaskCreate], messages: Sequence[OutboxMessage] = ()
+    ): ...
+    async def get_many(self, task_ids: Sequence[str]) -> list[Task]: ...
+    async def relay_outbox(self, publish: OutboxPublisher, limit: int) -> int: ...
+    async def create_subtasks(
+        self, parent_id: str, count: int, phase: str
+    ) -> list[str]: ...
+    async def complete_subtask(
+        self, task_id: str, parent_id: str, phase: str, resource_url: str
+    ) -> list[str] | None: ...
+    async def count_subtasks(self, parent_id: str) -> list[SubtaskCount]: ...
+    async def count_subtasks_many(
+        self, parent_ids: Sequence[str]
+    ) -> dict[str, list[SubtaskCount]]: ...
+    async def record_stages(self, records: Sequence[StageRecord]): ...
+    async def stage_stats(
+        self,
+        since: datetime.datetime,
+        until: datetime.datetime,
+        bucket: datetime.timedelta | None = None,
+    ) -> list[StageStats]: ...
+    async def purge(
+        self,
+        before: datetime.datetime,
+        limit: int,
+        statuses: Sequence[TaskStatus] = (TaskStatus.COMPLETED,),
+        archive: bool = True,
+    ) -> int: ...
+    # Defined last, the name shadows the builtin in the class body
+    async def list(
+        self,
+        status: TaskStatus | None = None,
+        phase: str | None = None,
+        department: str | None = None,
+        since: datetime.datetime | None = None,
+        include_subtasks: bool = False,
+        cursor: str | None = None,
+        limit: int = 100,
+    ) -> TaskPage: ...
@@ -0,0 +1,85 @@
+import asyncio
+import datetime
+import os
+import socket
+from dataclasses import dataclass, field
+
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+
+from .proto import TaskController
+from .models import StageRecord, TaskStatus
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class StageRecorder:
+    """
+    Buffers stage runs and appends them to the task history in batches, once
+    `max_batch` runs are buffered or `flush_interval` seconds after the first
+    one. History is best effort: failed writes are logged and dropped rather
+    than failing the task. `close` must be awaited on shutdown.
+    """
+
+    controller: TaskController
+    max_batch: int = 500
+    flush_interval: float = 0.5
+    worker_id: str = field(default_factory=default_worker_id)
+    logger: BoundLogger = get_logger("tasks.recorder")
+
+    def __post_init__(self):
+        self._pending: list[StageRecord] = []
+        self._timer: asyncio.Task | None = None
+
+    async def record(
+        self,
+        task_id: str,
+        phase: str,
+        status: TaskStatus,
+        started_at: datetime.datetime,
+        finished_at: datetime.datetime | None = None,
+        bytes_in: int | None = None,
+        bytes_out: int | None = None,
+    ) -> None:
+        self._pending.append(
+            StageRecord(
+                task_id=task_id,
+                phase=phase,
+                status=status,
+                started_at=started_at,
+                finished_at=finished_at or datetime.datetime.now(datetime.UTC),
+                worker_id=self.worker_id,
+                bytes_in=bytes_in,
+                bytes_out=bytes_out,
+            )
+        )
+        if len(self._pending) >= self.max_batch:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        try:
+            await self.controller.record_stages(batch)
+        except Exception:
+            await self.logger.aexception(
+                "Failed to record stage runs", dropped=len(batch)
+            )
+
+    async def close(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
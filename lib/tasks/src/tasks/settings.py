@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+
+class StatusWriterSettings(BaseModel):
+    # Buffered status updates written at once
+    max_batch: int = 500
+    # Seconds an update may stay buffered before it is written
+    flush_interval: float = 0.5
@@ -0,0 +1,103 @@
+from collections.abc import Sequence
+
+import pytest
+
+from tasks import BufferedTaskController, TaskStatus, TaskUpdate
+
+PHASES = ["crawler", "parser", "chunker", "extractor", "builder"]
+
+
+class RecordingController:
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.batches: list[list[TaskUpdate]] = []
+
+    async def update_many(
+        self, tasks: Sequence[TaskUpdate], phases: Sequence[str] = ()
+    ):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unavailable")
+        assert list(phases) == PHASES
+        self.batches.append(list(tasks))
+
+
+def _buffered(inner: RecordingController) -> BufferedTaskController:
+    return BufferedTaskController(
+        inner,  # type: ignore[arg-type]
+        flush_interval=3600.0,
+        phases=PHASES,
+    )
+
+
+@pytest.mark.asyncio
+async def test_requeued_terminal_status_is_not_overwritten():
+    inner = RecordingController(failures=1)
+    controller = _buffered(inner)
+
+    with pytest.raises(ConnectionError):
+        await controller.update(
+            TaskUpdate(id="t", status=TaskStatus.COMPLETED, phase="builder")
+        )
+    await controller.update(
+        TaskUpdate(id="t", status=TaskStatus.IN_PROGRESS, phase="extractor")
+    )
+    await controller.close()
+
+    assert inner.batches == [
+        [TaskUpdate(id="t", status=TaskStatus.COMPLETED, phase="builder")]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_late_terminal_status_wins():
+    inner = RecordingController()
+    controller = _buffered(inner)
+
+    await controller.update(
+        TaskUpdate(id="t", status=TaskStatus.IN_PROGRESS, phase="chunker")
+    )
+    await controller.update(
+        TaskUpdate(id="t", status=TaskStatus.FAILED, phase="parser")
+    )
+    await controller.close()
+
+    assert inner.batches == [
+        [TaskUpdate(id="t", status=TaskStatus.FAILED, phase="parser")]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stale_phase_is_skipped():
+    inner = RecordingController()
+    controller = _buffered(inner)
+
+    await controller.update(
+        TaskUpdate(id="t", status=TaskStatus.IN_PROGRESS, phase="chunker")
+    )
+    await controller.update(
+        TaskUpdate(id="t", status=TaskStatus.IN_PROGRESS, phase="parser")
+    )
+    await controller.close()
+
+    assert inner.batches == [
+        [TaskUpdate(id="t", status=TaskStatus.IN_PROGRESS, phase="chunker")]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_phase_moves_forward():
+    inner = RecordingController()
+    controller = _buffered(inner)
+
+    await controller.update(
+        TaskUpdate(id="t", status=TaskStatus.IN_PROGRESS, phase="parser")
+    )
+    await controller.update(
+        TaskUpdate(id="t", status=TaskStatus.IN_PROGRESS, phase="chunker")
+    )
+    await controller.close()
+
+    assert inner.batches == [
+        [TaskUpdate(id="t", status=TaskStatus.IN_PROGRESS, phase="chunker")]
+    ]
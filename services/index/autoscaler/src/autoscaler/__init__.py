@@ -0,0 +1,83 @@
+import asyncio
+import signal
+
+import requests
+
+from logs import get_logger, setup_logging
+from tasks import Pipeline
+
+from .backends import ComposeBackend, SubprocessBackend, WorkerBackend
+from .controller import Autoscaler
+from .metrics import RabbitMQManagementClient
+from .settings import Settings, get_settings
+
+setup_logging()
+
+
+def _build_backend(settings: Settings) -> WorkerBackend:
+    match settings.backend:
+        case "subprocess":
+            return SubprocessBackend(command=settings.subprocess.command)
+        case "compose":
+            return ComposeBackend(
+                project_directory=settings.compose.project_directory,
+                service_template=settings.compose.service_template,
+                command=tuple(settings.compose.command),
+            )
+
+
+async def run() -> None:
+    settings = get_settings()
+
+    logger = get_logger("autoscaler.main")
+
+    pipeline_config = None
+    for i in range(3):
+        try:
+            response = await asyncio.to_thread(
+                requests.get, f"{settings.master.url}/pipeline/config", timeout=10.0
+            )
+            if response.status_code != 200:
+                await logger.aerror(
+                    "Failed to fetch pipeline configuration",
+                    retry=i + 1,
+                    status_code=response.status_code,
+                    url=settings.master.url,
+                )
+                continue
+            pipeline_config = Pipeline.model_validate_json(response.content)
+            break
+        except Exception:
+            await logger.aexception(
+                "Error occurred while fetching pipeline configuration",
+                url=settings.master.url,
+                retry=i + 1,
+            )
+            continue
+    if not pipeline_config:
+        raise RuntimeError("Failed to fetch pipeline configuration from master service")
+
+    metrics = RabbitMQManagementClient(settings.management)
+    backend = _build_backend(settings)
+    autoscaler = Autoscaler(
+        pipeline=pipeline_config,
+        metrics=metrics,
+        backend=backend,
+        settings=settings,
+    )
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, stop.set)
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+
+    try:
+        await autoscaler.run(stop)
+    finally:
+        await backend.close()
+        metrics.close()
+        await logger.ainfo("Autoscaler stopped")
+
+
+def main():
+    asyncio.run(run())
@@ -0,0 +1,129 @@
+import asyncio
+import signal
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Protocol
+
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+
+
+class WorkerBackend(Protocol):
+    """Starts and stops the workers serving a pipeline stage."""
+
+    async def current(self, stage: str) -> int: ...
+
+    async def scale(self, stage: str, count: int) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+@dataclass
+class SubprocessBackend:
+    """
+    Runs workers as local processes, `<command> --stages <stage>`. Meant for
+    development and tests. Stopped workers receive SIGTERM and drain their
+    in-flight messages before exiting.
+    """
+
+    command: list[str]
+    stop_timeout: float = 60.0
+    logger: BoundLogger = get_logger("autoscaler.backend.subprocess")
+
+    def __post_init__(self):
+        self._workers: dict[str, list[asyncio.subprocess.Process]] = defaultdict(list)
+        self._stopping: set[asyncio.Task] = set()
+
+    def _alive(self, stage: str) -> list[asyncio.subprocess.Process]:
+        workers = [p for p in self._workers[stage] if p.returncode is None]
+        self._workers[stage] = workers
+        return workers
+
+    async def current(self, stage: str) -> int:
+        return len(self._alive(stage))
+
+    async def _stop(self, process: asyncio.subprocess.Process) -> None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), self.stop_timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def scale(self, stage: str, count: int) -> None:
+        workers = self._alive(stage)
+        while len(workers) < count:
+            process = await asyncio.create_subprocess_exec(
+                *self.command, "--stages", stage
+            )
+            workers.append(process)
+            await self.logger.ainfo("Worker started", stage=stage, pid=process.pid)
+        while len(workers) > count:
+            process = workers.pop()
+            # Draining can take a while, do not hold up the other stages
+            task = asyncio.create_task(self._stop(process))
+            self._stopping.add(task)
+            task.add_done_callback(self._stopping.discard)
+            await self.logger.ainfo("Worker stopping", stage=stage, pid=process.pid)
+
+    async def close(self) -> None:
+        for stage in list(self._workers):
+            await self.scale(stage, 0)
+        await asyncio.gather(*self._stopping, return_exceptions=True)
+
+
+@dataclass
+class ComposeBackend:
+    """
+    Scales one docker compose service per stage, named after
+    `service_template`, e.g. `worker-extractor`.
+    """
+
+    project_directory: str = "."
+    service_template: str = "worker-{stage}"
+    command: tuple[str, ...] = ("docker", "compose")
+    logger: BoundLogger = get_logger("autoscaler.backend.compose")
+
+    def _service(self, stage: str) -> str:
+        return self.service_template.format(stage=stage)
+
+    async def _compose(self, *args: str) -> str:
+        process = await asyncio.create_subprocess_exec(
+            *self.command,
+            "--project-directory",
+            self.project_directory,
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(
+                f"{' '.join(args)} failed ({process.returncode}): "
+                f"{stderr.decode(errors='replace').strip()}"
+            )
+        return stdout.decode()
+
+    async def current(self, stage: str) -> int:
+        output = await self._compose(
+            "ps", "--quiet", "--status", "running", self._service(stage)
+        )
+        return len(output.split())
+
+    async def scale(self, stage: str, count: int) -> None:
+        service = self._service(stage)
+        await self._compose(
+            "up",
+            "--detach",
+            "--no-deps",
+            "--no-recreate",
+            "--scale",
+            f"{service}={count}",
+            service,
+        )
+        await self.logger.ainfo("Service scaled", service=service, replicas=count)
+
+    async def close(self) -> None:
+        # Containers outlive the autoscaler
+        return None
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from dataclasses import dataclass
+
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+from tasks import Pipeline
+
+from .backends import WorkerBackend
+from .metrics import RabbitMQManagementClient
+from .policy import StageScaler
+from .settings import Settings
+
+
+def scaled_stages(pipeline: Pipeline) -> list[str]:
+    """
+    Stages that get their own workers: every stage except those run inside
+    a fused chain by the worker of its first stage.
+    """
+    if not pipeline.stage_queues:
+        raise ValueError("Autoscaling stages requires `stage_queues` in the pipeline")
+    fused_tail = set(pipeline.fuse[1:])
+    return [name for name in pipeline.pipeline if name not in fused_tail]
+
+
+@dataclass
+class Autoscaler:
+    pipeline: Pipeline
+    metrics: RabbitMQManagementClient
+    backend: WorkerBackend
+    settings: Settings
+    logger: BoundLogger = get_logger("autoscaler.controller")
+
+    def __post_init__(self):
+        self._scalers = {
+            stage: StageScaler(stage, self.settings.policy(stage))
+            for stage in scaled_stages(self.pipeline)
+        }
+
+    async def _step_stage(self, scaler: StageScaler) -> None:
+        queue_name = self.pipeline.input_queue(scaler.stage)
+        stats = await self.metrics.queue(queue_name)
+        current = await self.backend.current(scaler.stage)
+        target = scaler.decide(stats, current, time.monotonic())
+
+        await self.logger.adebug(
+            "Stage metrics",
+            stage=scaler.stage,
+            queue=queue_name,
+            backlog=stats.backlog if stats else None,
+            consumers=stats.consumers if stats else None,
+            publish_rate=stats.publish_rate if stats else None,
+            ack_rate=stats.ack_rate if stats else None,
+            workers=current,
+        )
+        if target != current:
+            await self.logger.ainfo(
+                "Scaling stage",
+                stage=scaler.stage,
+                workers=current,
+                target=target,
+                backlog=stats.backlog if stats else 0,
+            )
+            await self.backend.scale(scaler.stage, target)
+
+    async def step(self) -> None:
+        results = await asyncio.gather(
+            *(self._step_stage(scaler) for scaler in self._scalers.values()),
+            return_exceptions=True,
+        )
+        for stage, result in zip(self._scalers, results):
+            if isinstance(result, Exception):
+                await self.logger.aerror(
+                    "Failed to scale stage", stage=stage, error=str(result)
+                )
+
+    async def run(self, stop: asyncio.Event) -> None:
+        await self.logger.ainfo(
+            "Autoscaler started",
+            stages=list(self._scalers),
+            poll_interval=self.settings.poll_interval,
+        )
+        while not stop.is_set():
+            await self.step()
+            try:
+                await asyncio.wait_for(stop.wait(), self.settings.poll_interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,73 @@
+import asyncio
+from dataclasses import dataclass
+from urllib.parse import quote
+
+import requests
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+
+from .settings import ManagementSettings
+
+
+@dataclass(slots=True)
+class QueueStats:
+    name: str
+    ready: int
+    unacked: int
+    consumers: int
+    # Messages per second, averaged by RabbitMQ over its sampling window
+    publish_rate: float
+    ack_rate: float
+
+    @property
+    def backlog(self) -> int:
+        return self.ready + self.unacked
+
+
+@dataclass
+class RabbitMQManagementClient:
+    """
+    Reads queue depth, consumer count and message rates from the RabbitMQ
+    management API.
+    """
+
+    settings: ManagementSettings
+    timeout: float = 10.0
+    logger: BoundLogger = get_logger("autoscaler.metrics")
+
+    def __post_init__(self):
+        self._session = requests.Session()
+        self._session.auth = (
+            self.settings.username,
+            self.settings.password.get_secret_value(),
+        )
+
+    def _get_queue(self, queue_name: str) -> QueueStats | None:
+        url = (
+            f"{str(self.settings.url).rstrip('/')}/api/queues/"
+            f"{quote(self.settings.vhost, safe='')}/{quote(queue_name, safe='')}"
+        )
+        response = self._session.get(url, timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        body = response.json()
+        message_stats = body.get("message_stats", {})
+        return QueueStats(
+            name=queue_name,
+            ready=body.get("messages_ready", 0),
+            unacked=body.get("messages_unacknowledged", 0),
+            consumers=body.get("consumers", 0),
+            publish_rate=message_stats.get("publish_details", {}).get("rate", 0.0),
+            ack_rate=message_stats.get("ack_details", {}).get("rate", 0.0),
+        )
+
+    async def queue(self, queue_name: str) -> QueueStats | None:
+        """
+        Statistics of a queue, None if it has not been declared yet.
+        """
+        return await asyncio.to_thread(self._get_queue, queue_name)
+
+    def close(self) -> None:
+        self._session.close()
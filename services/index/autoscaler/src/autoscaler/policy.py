@@ -0,0 +1,71 @@
+import math
+from collections import deque
+from dataclasses import dataclass, field
+
+from .metrics import QueueStats
+from .settings import StagePolicy
+
+
+@dataclass
+class StageScaler:
+    """
+    Worker count decisions for one stage.
+
+    The target is the number of workers needed to keep up with the publish
+    rate while draining the backlog within `target_drain_time`, using the
+    measured per-worker ack rate. Before a rate is available the backlog is
+    divided by `messages_per_worker`. Scaling up is immediate once the up
+    cooldown has passed; scaling down follows the highest target over the
+    last `scale_down_window` polls and its own, longer, cooldown.
+    """
+
+    stage: str
+    policy: StagePolicy
+    _last_change: float = field(default=-math.inf, init=False)
+    _recent: deque[int] = field(init=False)
+
+    def __post_init__(self):
+        self._recent = deque(maxlen=max(self.policy.scale_down_window, 1))
+
+    def _clamp(self, count: int) -> int:
+        return max(self.policy.min_workers, min(self.policy.max_workers, count))
+
+    def target(self, stats: QueueStats | None) -> int:
+        policy = self.policy
+        if stats is None or (stats.backlog == 0 and stats.publish_rate == 0):
+            return self._clamp(policy.min_workers)
+        if stats.consumers > 0 and stats.ack_rate > 0:
+            per_worker = stats.ack_rate / stats.consumers
+            needed = stats.publish_rate + stats.backlog / policy.target_drain_time
+            return self._clamp(math.ceil(needed / per_worker))
+        return self._clamp(math.ceil(stats.backlog / policy.messages_per_worker))
+
+    def decide(self, stats: QueueStats | None, current: int, now: float) -> int:
+        """
+        Worker count the stage should run now, `current` when unchanged.
+        """
+        target = self.target(stats)
+        self._recent.append(target)
+
+        # Out of bounds counts are corrected regardless of cooldowns
+        if current != self._clamp(current):
+            return self._change(self._clamp(current), now)
+
+        elapsed = now - self._last_change
+        if target > current:
+            if elapsed < self.policy.scale_up_cooldown:
+                return current
+            return self._change(target, now)
+
+        stable = max(self._recent)
+        if (
+            stable < current
+            and len(self._recent) == self._recent.maxlen
+            and elapsed >= self.policy.scale_down_cooldown
+        ):
+            return self._change(stable, now)
+        return current
+
+    def _change(self, count: int, now: float) -> int:
+        self._last_change = now
+        return count
@@ -0,0 +1,93 @@
+from functools import lru_cache
+from typing import Literal
+
+from pydantic_settings import (
+    BaseSettings,
+    PydanticBaseSettingsSource,
+    YamlConfigSettingsSource,
+)
+from pydantic import BaseModel, HttpUrl, SecretStr
+
+
+class MasterConnectorSettings(BaseModel):
+    url: HttpUrl
+
+
+class ManagementSettings(BaseModel):
+    """RabbitMQ management API, e.g. http://rabbitmq:15672."""
+
+    url: HttpUrl
+    username: str = "guest"
+    password: SecretStr
+    vhost: str = "/"
+
+
+class StagePolicy(BaseModel):
+    min_workers: int = 1
+    max_workers: int = 4
+    # Backlog a single worker is expected to hold, used until the stage has
+    # processed enough messages to measure its rate.
+    messages_per_worker: int = 10
+    # Seconds the current backlog should take to drain at the measured rate
+    target_drain_time: float = 60.0
+    # Scale down to the highest target seen over this many polls, so a short
+    # dip in the backlog does not remove workers that are needed again soon.
+    scale_down_window: int = 6
+    # Minimum seconds since the last change before scaling up / down again
+    scale_up_cooldown: float = 30.0
+    scale_down_cooldown: float = 300.0
+
+
+class SubprocessBackendSettings(BaseModel):
+    # Command starting a worker, `--stages <stage>` is appended
+    command: list[str] = ["uv", "run", "worker"]
+
+
+class ComposeBackendSettings(BaseModel):
+    project_directory: str = "."
+    # Compose service running the workers of a stage
+    service_template: str = "worker-{stage}"
+    command: list[str] = ["docker", "compose"]
+
+
+class Settings(BaseSettings):
+    management: ManagementSettings
+    master: MasterConnectorSettings
+
+    poll_interval: float = 10.0
+    # `compose` needs one `worker-{stage}` service per stage, see the README
+    backend: Literal["subprocess", "compose"] = "subprocess"
+    subprocess: SubprocessBackendSettings = SubprocessBackendSettings()
+    compose: ComposeBackendSettings = ComposeBackendSettings()
+
+    # Policy of every stage, overridden per stage name in `stages`
+    default_policy: StagePolicy = StagePolicy()
+    stages: dict[str, StagePolicy] = {}
+
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource,
+    ) -> tuple[PydanticBaseSettingsSource, ...]:
+        return (
+            init_settings,
+            env_settings,
+            dotenv_settings,
+            file_secret_settings,
+            YamlConfigSettingsSource(
+                settings_cls,
+                yaml_file="config/autoscaler.yaml",
+            ),
+        )
+
+    def policy(self, stage: str) -> StagePolicy:
+        return self.stages.get(stage, self.default_policy)
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()  # type: ignore
@@ -0,0 +1,25 @@
+import sys
+
+import pytest
+
+from autoscaler.backends import SubprocessBackend
+
+
+@pytest.mark.asyncio
+async def test_subprocess_backend_scales_per_stage():
+    backend = SubprocessBackend(
+        command=[sys.executable, "-c", "import time; time.sleep(60)"],
+        stop_timeout=5.0,
+    )
+    try:
+        await backend.scale("parser", 2)
+        await backend.scale("chunker", 1)
+        assert await backend.current("parser") == 2
+        assert await backend.current("chunker") == 1
+
+        await backend.scale("parser", 1)
+        assert await backend.current("parser") == 1
+    finally:
+        await backend.close()
+    assert await backend.current("parser") == 0
+    assert await backend.current("chunker") == 0
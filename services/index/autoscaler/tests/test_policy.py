@@ -0,0 +1,85 @@
+from autoscaler.metrics import QueueStats
+from autoscaler.policy import StageScaler
+from autoscaler.settings import StagePolicy
+
+
+def _stats(backlog: int) -> QueueStats:
+    # No measured rate, targets are backlog / messages_per_worker
+    return QueueStats(
+        name="backlog.parser",
+        ready=backlog,
+        unacked=0,
+        consumers=0,
+        publish_rate=0.0,
+        ack_rate=0.0,
+    )
+
+
+def _scaler(**policy) -> StageScaler:
+    return StageScaler(
+        stage="parser",
+        policy=StagePolicy(
+            min_workers=1,
+            max_workers=4,
+            messages_per_worker=10,
+            scale_down_window=3,
+            scale_up_cooldown=30.0,
+            scale_down_cooldown=300.0,
+            **policy,
+        ),
+    )
+
+
+def test_target_is_clamped():
+    scaler = _scaler()
+    assert scaler.target(None) == 1
+    assert scaler.target(_stats(0)) == 1
+    assert scaler.target(_stats(25)) == 3
+    assert scaler.target(_stats(1000)) == 4
+
+
+def test_target_follows_measured_rate():
+    scaler = _scaler(target_drain_time=10.0)
+    stats = QueueStats(
+        name="backlog.parser",
+        ready=20,
+        unacked=0,
+        consumers=2,
+        publish_rate=1.0,
+        ack_rate=2.0,
+    )
+    # 1 msg/s per worker, 1 msg/s published + 20 messages over 10s
+    assert scaler.target(stats) == 3
+
+
+def test_scale_up_waits_for_cooldown():
+    scaler = _scaler()
+    assert scaler.decide(_stats(20), current=1, now=0.0) == 2
+    assert scaler.decide(_stats(40), current=2, now=10.0) == 2
+    assert scaler.decide(_stats(40), current=2, now=30.0) == 4
+
+
+def test_scale_down_follows_window_peak():
+    scaler = _scaler()
+    assert scaler.decide(_stats(40), current=1, now=0.0) == 4
+    # The backlog drops but the window still holds the peak
+    assert scaler.decide(_stats(0), current=4, now=400.0) == 4
+    assert scaler.decide(_stats(0), current=4, now=410.0) == 4
+    # Down to the highest target of the window, not the latest one
+    assert scaler.decide(_stats(20), current=4, now=420.0) == 2
+    assert scaler.decide(_stats(0), current=2, now=430.0) == 2
+
+
+def test_scale_down_waits_for_cooldown():
+    scaler = _scaler()
+    assert scaler.decide(_stats(40), current=1, now=0.0) == 4
+    for now in (10.0, 20.0, 30.0):
+        assert scaler.decide(_stats(0), current=4, now=now) == 4
+    assert scaler.decide(_stats(0), current=4, now=300.0) == 1
+
+
+def test_out_of_bounds_ignores_cooldown():
+    scaler = _scaler()
+    assert scaler.decide(_stats(40), current=1, now=0.0) == 4
+    assert scaler.decide(_stats(40), current=6, now=1.0) == 4
+    assert scaler.decide(_stats(0), current=0, now=2.0) == 1
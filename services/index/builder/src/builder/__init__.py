@@ -4,7 +4,12 @@ from neo4j import AsyncGraphDatabase
 
 from logs import get_logger, setup_logging
 from db import PostgresClient
-from tasks import Pipeline, PostgreSQLController
+from tasks import (
+    Pipeline,
+    PostgreSQLController,
+    BufferedTaskController,
+    StageRecorder,
+)
 from broker import RabbitMQPublisher, RabbitMQPool, RabbitMQSubscriber
 from storage import MinIOStorage
 from .settings import get_settings
@@ -21,8 +26,6 @@ async def run() -> None:
 
     pool = RabbitMQPool(settings=settings.rabbitmq)
     publisher = RabbitMQPublisher(pool)
-    controller = PostgreSQLController(await PostgresClient.init(settings.postgre))
-
     storage = MinIOStorage(settings=settings.minio)
 
     pipeline_config = None
@@ -53,17 +56,41 @@ async def run() -> None:
         )
         raise RuntimeError("Failed to fetch pipeline configuration from master service")
 
+    # Status updates are written behind, in batches
+    controller = BufferedTaskController(
+        PostgreSQLController(await PostgresClient.init(settings.postgre)),
+        max_batch=settings.status_writer.max_batch,
+        flush_interval=settings.status_writer.flush_interval,
+        phases=pipeline_config.phases,
+    )
+    recorder = StageRecorder(
+        controller,
+        max_batch=settings.status_writer.max_batch,
+        flush_interval=settings.status_writer.flush_interval,
+    )
+
     driver = AsyncGraphDatabase.driver(
         settings.neo4j.dsn.encoded_string(), auth=settings.neo4j.dsn.get_auth()
     )
 
     builder = Neo4jBuilder(
-        storage=storage, logger=get_logger("builder.neo4j"), driver=driver
+        storage=storage,
+        logger=get_logger("builder.neo4j"),
+        driver=driver,
+        batch_size=settings.neo4j.batch_size,
+        write_concurrency=settings.neo4j.write_concurrency,
+        max_retries=settings.neo4j.max_retries,
+        retry_backoff=settings.neo4j.retry_backoff,
     )  # type: ignore
 
+    await builder.ensure_schema()
+
     subscriber = RabbitMQSubscriber(
         pool=pool,
         queue_name=pipeline_config.builder_queue_name,
+        prefetch_count=settings.subscriber.prefetch_count,
+        max_in_flight=settings.subscriber.max_in_flight,
+        drain_timeout=settings.subscriber.drain_timeout,
     )
 
     processor = Processor(
@@ -72,12 +99,19 @@ async def run() -> None:
         rabbitmq_publisher=publisher,
         rabbitmq_subscriber=subscriber,
         builder=builder,
+        stage_recorder=recorder,
         logger=get_logger("builder.processor"),
     )
     await pool.bind("builder_ex", pipeline_config.builder_queue_name, "builder.#")
     logger.info("Pipeline configuration fetched successfully", pipeline=pipeline_config)
 
-    await processor.process()
+    try:
+        await processor.process()
+    finally:
+        await recorder.close()
+        await controller.close()
+        # The subscriber is drained, no storage call is in flight anymore
+        await storage.close()
 
 
 def main():
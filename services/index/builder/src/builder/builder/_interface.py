@@ -12,6 +12,11 @@ class IBuilder(Protocol):
 
     async def build(self, resources_url: str) -> None: ...
 
+    async def build_many(self, resources_urls: list[str]) -> None:
+        """Build the graph of several artifacts, e.g. the parts of a fan-out."""
+        for resources_url in resources_urls:
+            await self.build(resources_url)
+
 
 class ResourceInvalid(Exception):
     def __init__(self, resource: str, message: str):
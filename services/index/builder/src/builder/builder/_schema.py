@@ -0,0 +1,148 @@
+import asyncio
+from dataclasses import dataclass, field
+
+from neo4j import AsyncDriver
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+
+
+# Plain indexes created by earlier versions which now clash with the backing
+# index of a constraint on the same schema.
+LEGACY_INDEXES = [
+    ("Chunk", ["id"]),
+]
+
+# Merge nodes sharing a key before the constraints are created, moving their
+# CONTAINS relationships onto the node that is kept. Only the duplicated keys
+# are gathered over the whole graph, they are merged in batched transactions.
+DEDUPLICATE_CHUNKS = """
+MATCH (c:Chunk)
+WHERE c.id IS NOT NULL
+WITH c.id AS id, count(*) AS n
+WHERE n > 1
+CALL {
+    WITH id
+    MATCH (c:Chunk {id: id})
+    WITH collect(c) AS nodes
+    WITH head(nodes) AS keep, tail(nodes) AS dups
+    UNWIND dups AS dup
+    OPTIONAL MATCH (dup)-[:CONTAINS]->(e:Entity)
+    FOREACH (_ IN CASE WHEN e IS NULL THEN [] ELSE [1] END | MERGE (keep)-[:CONTAINS]->(e))
+    WITH DISTINCT dup
+    DETACH DELETE dup
+    RETURN count(*) AS removed
+} IN TRANSACTIONS OF $batch_size ROWS
+RETURN sum(removed) AS removed
+"""
+
+DEDUPLICATE_ENTITIES = """
+MATCH (e:Entity)
+WHERE e.name IS NOT NULL AND e.type IS NOT NULL
+WITH e.name AS name, e.type AS type, count(*) AS n
+WHERE n > 1
+CALL {
+    WITH name, type
+    MATCH (e:Entity {name: name, type: type})
+    WITH collect(e) AS nodes
+    WITH head(nodes) AS keep, tail(nodes) AS dups
+    UNWIND dups AS dup
+    OPTIONAL MATCH (c:Chunk)-[:CONTAINS]->(dup)
+    FOREACH (_ IN CASE WHEN c IS NULL THEN [] ELSE [1] END | MERGE (c)-[:CONTAINS]->(keep))
+    WITH DISTINCT dup
+    DETACH DELETE dup
+    RETURN count(*) AS removed
+} IN TRANSACTIONS OF $batch_size ROWS
+RETURN sum(removed) AS removed
+"""
+
+# Label, constraint name and statement, with the deduplication that must run
+# before the constraint can be created.
+CONSTRAINTS = [
+    (
+        "Chunk",
+        "chunk_id",
+        "CREATE CONSTRAINT chunk_id IF NOT EXISTS "
+        "FOR (c:Chunk) REQUIRE c.id IS UNIQUE",
+        DEDUPLICATE_CHUNKS,
+    ),
+    (
+        "Entity",
+        "entity_key",
+        "CREATE CONSTRAINT entity_key IF NOT EXISTS "
+        "FOR (e:Entity) REQUIRE (e.name, e.type) IS UNIQUE",
+        DEDUPLICATE_ENTITIES,
+    ),
+]
+
+INDEXES = [
+    "CREATE INDEX entity_name IF NOT EXISTS FOR (e:Entity) ON (e.name)",
+]
+
+
+@dataclass
+class GraphSchema:
+    """
+    Keyed graph model: `Chunk` is identified by `id` and `Entity` by
+    `(name, type)`. The schema is applied once per process, migrating graphs
+    written before the constraints existed.
+    """
+
+    driver: AsyncDriver
+    logger: BoundLogger = get_logger("builder.neo4j.schema")
+    # Duplicated keys merged per transaction by the migration
+    migration_batch_size: int = 1000
+    _applied: bool = field(default=False, init=False)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+
+    async def ensure(self) -> None:
+        if self._applied:
+            return
+        async with self._lock:
+            if self._applied:
+                return
+            rows = await self._run("SHOW CONSTRAINTS YIELD name RETURN name")
+            existing = {row["name"] for row in rows}
+            # Graphs with every constraint in place are already migrated
+            missing = [c for c in CONSTRAINTS if c[1] not in existing]
+            if missing:
+                await self._migrate(missing)
+            for _, _, statement, _ in missing:
+                await self._run(statement)
+            for statement in INDEXES:
+                await self._run(statement)
+            self._applied = True
+            await self.logger.ainfo("Graph schema ready")
+
+    async def _run(self, query: str, **params) -> list[dict]:
+        # Schema statements cannot share a transaction with data writes, so
+        # each one runs in its own auto-commit transaction.
+        async with self.driver.session() as session:
+            result = await session.run(query, **params)
+            return await result.data()
+
+    async def _migrate(self, constraints: list[tuple[str, str, str, str]]) -> None:
+        for label, properties in LEGACY_INDEXES:
+            rows = await self._run(
+                """
+                SHOW INDEXES YIELD name, labelsOrTypes, properties, owningConstraint
+                WHERE owningConstraint IS NULL
+                  AND labelsOrTypes = [$label] AND properties = $properties
+                RETURN name
+                """,
+                label=label,
+                properties=properties,
+            )
+            for row in rows:
+                await self._run(f"DROP INDEX `{row['name']}` IF EXISTS")
+                await self.logger.ainfo(
+                    "Dropped legacy index", name=row["name"], label=label
+                )
+
+        for label, _, _, query in constraints:
+            rows = await self._run(query, batch_size=self.migration_batch_size)
+            removed = rows[0]["removed"] if rows else 0
+            if removed:
+                await self.logger.ainfo(
+                    "Merged duplicate nodes", label=label, removed=removed
+                )
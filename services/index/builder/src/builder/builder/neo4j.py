@@ -1,17 +1,23 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
-from neo4j import AsyncDriver, AsyncManagedTransaction
+from typing import Any
 
-from storage import ObjectStorage
+from neo4j import AsyncDriver, AsyncManagedTransaction, AsyncSession
+from neo4j.exceptions import DriverError, Neo4jError
+
+from storage import ObjectStorage, StoredObject, codec_for_content_type
 from pydantic import AnyUrl
 
 from ._interface import IBuilder, ResourceInvalid
+from ._schema import GraphSchema
 
 
 async def load_resources(
     storage: ObjectStorage, bucket_name: str, object_name: str
-) -> bytes | None:
-    resource_content = await storage.get_file(bucket_name, object_name)
-    return resource_content
+) -> StoredObject | None:
+    return await storage.get_object(bucket_name, object_name)
 
 
 def parse_s3_resource_url(resource_url: AnyUrl) -> tuple[str, str]:
@@ -25,6 +31,44 @@ def parse_s3_resource_url(resource_url: AnyUrl) -> tuple[str, str]:
     return paths[0], paths[1]
 
 
+def expand_extraction(
+    data: dict[str, Any],
+) -> tuple[list[dict[str, str]], list[dict[str, str]], list[dict[str, str]]]:
+    """
+    Turn an extractor artifact into chunk, unique entity and relationship rows.
+
+    The extractor emits a unique entity table, interned label descriptions and
+    `[chunk_index, entity_index]` mentions. Artifacts from older workers hold
+    one `{chunk_id, name, type, description}` row per mention instead.
+    """
+    chunks: list[dict[str, str]] = data.get("chunks", [])
+
+    if "mentions" not in data:
+        mentions = data.get("entities", [])
+        unique: dict[tuple[str, str], dict[str, str]] = {}
+        for m in mentions:
+            unique.setdefault(
+                (m["name"], m["type"]),
+                {"name": m["name"], "type": m["type"], "description": m["description"]},
+            )
+        return chunks, list(unique.values()), mentions
+
+    labels: dict[str, str] = data.get("labels", {})
+    entities = [
+        {**e, "description": labels.get(e["type"], "")}
+        for e in data.get("entities", [])
+    ]
+    relationships = [
+        {
+            "chunk_id": chunks[chunk_idx]["id"],
+            "name": entities[entity_idx]["name"],
+            "type": entities[entity_idx]["type"],
+        }
+        for chunk_idx, entity_idx in data["mentions"]
+    ]
+    return chunks, entities, relationships
+
+
 @dataclass(slots=True)
 class Entity:
     name: str
@@ -35,8 +79,43 @@ class Entity:
 @dataclass
 class Neo4jBuilder(IBuilder):
     driver: AsyncDriver
+    # Rows per write transaction
+    batch_size: int = 1000
+    # Concurrent write sessions per ingestion phase
+    write_concurrency: int = 4
+    # Attempts per batch on retryable errors
+    max_retries: int = 3
+    retry_backoff: float = 0.5
+
+    def __post_init__(self):
+        self._schema = GraphSchema(self.driver, self.logger)
+
+    async def ensure_schema(self) -> None:
+        await self._schema.ensure()
 
     async def build(self, resources_url: str) -> None:
+        await self.build_many([resources_url])
+
+    async def build_many(self, resources_urls: list[str]) -> None:
+        """
+        Load every artifact and ingest them together, so the parts of a
+        fanned out task are written in full batches.
+        """
+        extractions = await asyncio.gather(
+            *(self._load_extraction(url) for url in resources_urls)
+        )
+        chunks, entities, relationships = [], {}, []
+        for part_chunks, part_entities, part_relationships in extractions:
+            chunks.extend(part_chunks)
+            # Parts can mention the same entities
+            for entity in part_entities:
+                entities.setdefault((entity["name"], entity["type"]), entity)
+            relationships.extend(part_relationships)
+        await self._build_graph(chunks, list(entities.values()), relationships)
+
+    async def _load_extraction(
+        self, resources_url: str
+    ) -> tuple[list[dict[str, str]], list[dict[str, str]], list[dict[str, str]]]:
         try:
             _url = AnyUrl(resources_url)
         except Exception as e:
@@ -45,54 +124,110 @@ class Neo4jBuilder(IBuilder):
         match (_url.scheme, _url.host):
             case ("minio", "arxiv"):
                 try:
-                    resource_content = await self._build_graph(
-                        resource_url=_url,
+                    bucket_name, object_name = parse_s3_resource_url(_url)
+                    resource_content = await load_resources(
+                        storage=self.storage,
+                        bucket_name=bucket_name,
+                        object_name=object_name,
                     )
+                    if resource_content is None:
+                        raise ValueError(f"Resource not found: {resources_url}")
+                    data = self._parse_resource_content(resource_content)
+                    return expand_extraction(data)
                 except ValueError as e:
                     raise ResourceInvalid(resources_url, str(e))
-                return resource_content
             case _:
                 raise ResourceInvalid(
                     resources_url,
                     f"Unsupported resource scheme and host: {_url.scheme}, {_url.host}",
                 )
 
-    async def _build_graph(self, resource_url: AnyUrl):
-        bucket_name, object_name = parse_s3_resource_url(resource_url)
-        resource_content = await load_resources(
-            storage=self.storage,
-            bucket_name=bucket_name,
-            object_name=object_name,
-        )
-
-        if resource_content is None:
-            raise ValueError(f"Resource not found: {resource_url}")
+    async def _build_graph(
+        self,
+        chunks: list[dict[str, str]],
+        entities: list[dict[str, str]],
+        relationships: list[dict[str, str]],
+    ):
+        await self.ensure_schema()
+        # Phases run in order since relationships need both node sets in place
+        await self._ingest("chunks", self._create_chunks, chunks)
+        await self._ingest("entities", self._create_entities, entities)
+        await self._ingest("relationships", self._create_relationships, relationships)
 
-        data = self._parse_resource_content(resource_content)
-        chunks: list[dict[str, str]] = data.get("chunks", [])
-        entities: list[dict[str, str]] = data.get("entities", [])
+    async def _ingest(
+        self,
+        phase: str,
+        tx_func: Callable[[AsyncManagedTransaction, list[Any]], Awaitable[None]],
+        rows: list[Any],
+    ) -> None:
+        """
+        Write `rows` in batches of `batch_size` through a small pool of
+        concurrent sessions, each pulling the next batch until none are left.
+        """
+        if not rows:
+            return
+        batches = iter(
+            rows[i : i + self.batch_size] for i in range(0, len(rows), self.batch_size)
+        )
+        no_batches = -(-len(rows) // self.batch_size)
+        started = time.perf_counter()
 
-        await self._run_transaction(self._create_index)
-        await self._run_transaction(self._create_chunks, chunks)
-        await self._run_transaction(self._create_entities, entities)
-        await self._run_transaction(self._create_relationships, entities)
+        async def writer() -> None:
+            async with self.driver.session() as session:
+                for batch in batches:
+                    await self._write_batch(session, phase, tx_func, batch)
 
-    async def _run_transaction(self, tx_func, *args, **kwargs):
-        async with self.driver.session() as session:
-            await session.execute_write(tx_func, *args, **kwargs)
+        writers = [
+            asyncio.create_task(writer())
+            for _ in range(min(self.write_concurrency, no_batches))
+        ]
+        try:
+            await asyncio.gather(*writers)
+        except Exception:
+            for w in writers:
+                w.cancel()
+            raise
 
-    async def _create_index(self, tx: AsyncManagedTransaction):
+        elapsed = time.perf_counter() - started
+        await self.logger.ainfo(
+            "Ingestion phase completed",
+            phase=phase,
+            rows=len(rows),
+            batches=no_batches,
+            elapsed=round(elapsed, 3),
+            rows_per_sec=round(len(rows) / elapsed, 1) if elapsed else None,
+        )
 
-        await tx.run("CREATE INDEX IF NOT EXISTS FOR (c:Chunk) ON (c.id)")
-        await tx.run("CREATE INDEX IF NOT EXISTS FOR (e:Entity) ON (e.name)")
-        await self.logger.ainfo("Created indexes in Neo4j")
+    async def _write_batch(
+        self,
+        session: AsyncSession,
+        phase: str,
+        tx_func: Callable[[AsyncManagedTransaction, list[Any]], Awaitable[None]],
+        batch: list[Any],
+    ) -> None:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await session.execute_write(tx_func, batch)
+                return
+            except (Neo4jError, DriverError) as e:
+                if attempt == self.max_retries or not e.is_retryable():
+                    raise
+                await self.logger.awarning(
+                    "Retrying batch",
+                    phase=phase,
+                    attempt=attempt,
+                    batch_size=len(batch),
+                    error=str(e),
+                )
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
 
     async def _create_chunks(
         self, tx: AsyncManagedTransaction, chunks: list[dict[str, str]]
     ):
         query = """
         UNWIND $chunks AS chunk
-        MERGE (c:Chunk {id: chunk.id, text: chunk.text})
+        MERGE (c:Chunk {id: chunk.id})
+        SET c.text = chunk.text
         RETURN COUNT(c) AS no_chunks
         """
 
@@ -104,7 +239,7 @@ class Neo4jBuilder(IBuilder):
             raise ValueError(
                 f"Expected {len(chunks)} chunks, but got {no_chunks['no_chunks']}."
             )
-        await self.logger.ainfo(
+        await self.logger.adebug(
             "Created chunks in Neo4j",
             no_chunks=no_chunks["no_chunks"],
         )
@@ -114,7 +249,8 @@ class Neo4jBuilder(IBuilder):
     ):
         query = """
         UNWIND $entities AS entity
-        MERGE (e:Entity {name: entity.name, type: entity.type, description: entity.description})
+        MERGE (e:Entity {name: entity.name, type: entity.type})
+        SET e.description = entity.description
         RETURN COUNT(e) AS no_entities
         """
 
@@ -126,37 +262,36 @@ class Neo4jBuilder(IBuilder):
             raise ValueError(
                 f"Expected {len(entities)} entities, but got {no_entities['no_entities']}."
             )
-        await self.logger.ainfo(
+        await self.logger.adebug(
             "Created entities in Neo4j",
             no_entities=no_entities["no_entities"],
         )
 
     async def _create_relationships(
-        self, tx: AsyncManagedTransaction, entities: list[dict[str, str]]
+        self, tx: AsyncManagedTransaction, relationships: list[dict[str, str]]
     ):
         query = """
-        UNWIND $entities AS entity
-        MATCH (c:Chunk {id: entity.chunk_id}), (e:Entity {name: entity.name})
+        UNWIND $relationships AS rel
+        MATCH (c:Chunk {id: rel.chunk_id})
+        MATCH (e:Entity {name: rel.name, type: rel.type})
         MERGE (c)-[:CONTAINS]->(e)
         RETURN COUNT(*) AS no_relationships
         """
 
-        result = await tx.run(query, entities=entities)
+        result = await tx.run(query, relationships=relationships)
         no_relationships = await result.single()
         if not no_relationships:
             raise ValueError("No relationships were created in the database.")
-        await self.logger.ainfo(
+        await self.logger.adebug(
             "Created relationships in Neo4j",
             no_relationships=no_relationships["no_relationships"],
         )
 
-    def _parse_resource_content(
-        self, resource_content: bytes
-    ) -> dict[str, list[dict[str, str]]]:
-        import json
-
+    def _parse_resource_content(self, resource_content: StoredObject) -> dict[str, Any]:
+        codec = codec_for_content_type(resource_content.content_type)
         try:
-            resource_json = json.loads(resource_content.decode("utf-8"))
-            return resource_json
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON format: {e}") from e
+            return codec.decode(resource_content.data)
+        except Exception as e:
+            raise ValueError(
+                f"Invalid {resource_content.content_type} artifact: {e}"
+            ) from e
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+import datetime
 import io
 from functools import wraps
 
@@ -6,7 +7,7 @@ from structlog.stdlib import BoundLogger
 from logs import get_logger
 
 from storage import ObjectStorage
-from tasks import TaskController, TaskUpdate, TaskStatus
+from tasks import TaskController, TaskUpdate, TaskStatus, StageRecorder
 from broker import (
     RabbitMQPublisher,
     AbstractIncomingMessage,
@@ -24,6 +25,8 @@ class Processor:
     rabbitmq_publisher: RabbitMQPublisher
     rabbitmq_subscriber: RabbitMQSubscriber
     builder: IBuilder
+    # Stage timings for the task history
+    stage_recorder: StageRecorder
     logger: BoundLogger = get_logger("worker.processor")
 
     async def _process_message(self, task_msg: TaskMessage) -> bool:
@@ -36,16 +39,32 @@ class Processor:
             )
             return False
 
-        # Process the task message (e.g., download, analyze, etc.)
-        # This is a placeholder for actual processing logic
-        await self.builder.build(task_msg.resource_url)
+        # Fanned out tasks carry the outputs of all their parts
+        parts = task_msg.metadata.get("parts")
+        if parts:
+            await self.builder.build_many(parts)
+        else:
+            await self.builder.build(task_msg.resource_url)
 
         return True
 
     async def callback(self, msg: AbstractIncomingMessage) -> bool:
         try:
             task_msg = TaskMessage.model_validate_json(msg.body)
-            result = await self._process_message(task_msg)
+            started_at = datetime.datetime.now(datetime.UTC)
+            try:
+                result = await self._process_message(task_msg)
+            except Exception:
+                await self.stage_recorder.record(
+                    task_msg.id, task_msg.task_name, TaskStatus.FAILED, started_at
+                )
+                raise
+            await self.stage_recorder.record(
+                task_msg.id,
+                task_msg.task_name,
+                TaskStatus.COMPLETED if result else TaskStatus.FAILED,
+                started_at,
+            )
             if result:
                 await self.task_controller.update(
                     TaskUpdate(
@@ -79,4 +98,4 @@ class Processor:
             callback=self.callback,
         )
         await self.logger.ainfo("Processor started and listening for messages")
-        await start_subscriber(coro)
+        await start_subscriber(coro, drain=self.rabbitmq_subscriber.drain)
@@ -6,8 +6,9 @@ from pydantic_settings import (
 )
 from pydantic import BaseModel, AnyUrl, HttpUrl
 
-from broker import RabbitMQSettings
+from broker import RabbitMQSettings, SubscriberSettings
 from db import PostgreSQLSettings
+from tasks import StatusWriterSettings
 from storage import MinioSettings
 
 
@@ -28,6 +29,12 @@ class Neo4jDsn(AnyUrl):
 class Neo4jSettings(BaseModel):
     dsn: Neo4jDsn
 
+    batch_size: int = 1000
+    write_concurrency: int = 4
+    max_retries: int = 3
+    # Seconds before the first retry of a batch, doubled on every attempt
+    retry_backoff: float = 0.5
+
 
 class MasterConnectorSettings(BaseModel):
     url: HttpUrl
@@ -35,7 +42,9 @@ class MasterConnectorSettings(BaseModel):
 
 class Settings(BaseSettings):
     rabbitmq: RabbitMQSettings
+    subscriber: SubscriberSettings = SubscriberSettings()
     postgre: PostgreSQLSettings
+    status_writer: StatusWriterSettings = StatusWriterSettings()
     minio: MinioSettings
     neo4j: Neo4jSettings
     master: MasterConnectorSettings
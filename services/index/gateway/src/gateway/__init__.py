@@ -1,16 +1,20 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from broker import RabbitMQPool
+from broker import RabbitMQPool, RabbitMQPublisher
 from db import PostgresClient
+from tasks import PostgreSQLController, TaskListener, TaskStatus, install_schema
 
 from .api.routers import arxiv_router
 from .api.routers import tasks_router
 from .api.routers import pipeline_router
 from .api.models import Resources
 from .api.dependencies.config import load_pipeline
+from .application.outbox import OutboxRelay
+from .application.retention import RetentionJob
 
 from .settings import get_settings
 
@@ -18,17 +22,49 @@ from .settings import get_settings
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     settings = get_settings()
+    broker = RabbitMQPool(settings.rabbitmq)
+    db = await PostgresClient.init(settings.postgre)
+    outbox = OutboxRelay(
+        controller=PostgreSQLController(db),
+        publisher=RabbitMQPublisher(broker),
+        batch_size=settings.outbox.batch_size,
+        poll_interval=settings.outbox.poll_interval,
+    )
+    events = TaskListener(db)
     app.state.resources = Resources(
-        broker=RabbitMQPool(settings.rabbitmq),
-        db=await PostgresClient.init(settings.postgre),
+        broker=broker, db=db, outbox=outbox, events=events
     )
+    await install_schema(db)
     pipeline = load_pipeline()
     await app.state.resources.broker.bind(
         exchange_name="gateway",
-        queue_name=pipeline.backlog_queue_name,
+        queue_name=pipeline.input_queue(pipeline.first_task_name),
         routing_key="gateway.#",
     )
+
+    stop = asyncio.Event()
+    background = [
+        asyncio.create_task(outbox.run(stop)),
+        asyncio.create_task(events.run(stop)),
+    ]
+    if settings.retention.enabled:
+        retention = RetentionJob(
+            controller=PostgreSQLController(db),
+            db=db,
+            retain_days=settings.retention.retain_days,
+            statuses=(
+                (TaskStatus.COMPLETED, TaskStatus.FAILED)
+                if settings.retention.include_failed
+                else (TaskStatus.COMPLETED,)
+            ),
+            archive=settings.retention.archive,
+            batch_size=settings.retention.batch_size,
+            interval=settings.retention.interval,
+        )
+        background.append(asyncio.create_task(retention.run(stop)))
     yield
+    stop.set()
+    await asyncio.gather(*background)
 
 
 app = FastAPI(lifespan=lifespan)
@@ -4,10 +4,11 @@ from functools import lru_cache
 
 from db import PostgresClient
 from broker import RabbitMQPool, RabbitMQPublisher, RabbitMQSubscriber
-from tasks import TaskController, PostgreSQLController, Pipeline
+from tasks import TaskController, TaskListener, PostgreSQLController, Pipeline
 from ..dependencies.config import load_pipeline
 
 from ..models import Resources
+from ...application.outbox import OutboxRelay
 
 
 async def get_resources(request: Request) -> Resources:
@@ -59,3 +60,21 @@ async def get_publisher(
     This function retrieves the publisher from the resources.
     """
     return RabbitMQPublisher(rabbitmq_pool)
+
+
+async def get_outbox_relay(
+    resources: Annotated[Resources, Depends(get_resources)],
+) -> OutboxRelay:
+    """
+    Dependency to provide access to the outbox relay of the gateway.
+    """
+    return resources.outbox
+
+
+async def get_task_listener(
+    resources: Annotated[Resources, Depends(get_resources)],
+) -> TaskListener:
+    """
+    Dependency to provide access to the shared listener of task events.
+    """
+    return resources.events
@@ -1,8 +1,12 @@
+import datetime
 from typing import Annotated, Literal
 from pydantic import BaseModel, Field
 
 from db import PostgresClient
 from broker import RabbitMQPool
+from tasks import TaskListener, StageStats
+
+from ..application.outbox import OutboxRelay
 
 from ..base import ArbitraryBaseModel as BaseModel
 
@@ -10,6 +14,8 @@ from ..base import ArbitraryBaseModel as BaseModel
 class Resources(BaseModel):
     db: PostgresClient
     broker: RabbitMQPool
+    outbox: OutboxRelay
+    events: TaskListener
 
 
 class ArxivMetadata(BaseModel):
@@ -32,6 +38,10 @@ class IndexRequest(BaseModel):
     metadata: RequestMetadata
 
 
+class BatchIndexRequest(BaseModel):
+    requests: list[IndexRequest] = Field(min_length=1, max_length=1000)
+
+
 class Progress(BaseModel):
     order: int
     status: str
@@ -42,3 +52,36 @@ class TaskStatusResponse(BaseModel):
     status: str
     phase: str
     progress: dict[str, Progress] | None = None
+    # Sub-task counts per status for fanned out tasks
+    subtasks: dict[str, int] | None = None
+
+
+class BatchStatusRequest(BaseModel):
+    task_ids: list[str] = Field(min_length=1, max_length=1000)
+
+
+class BatchStatusResponse(BaseModel):
+    tasks: list[TaskStatusResponse]
+    # Requested ids with no task
+    missing: list[str] = []
+
+
+class StageStatsResponse(BaseModel):
+    since: datetime.datetime
+    until: datetime.datetime
+    stats: list[StageStats]
+
+
+class TaskItem(BaseModel):
+    task_id: str
+    status: str
+    department: str
+    phase: str
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+    parent_id: str | None = None
+
+
+class TaskListResponse(BaseModel):
+    tasks: list[TaskItem]
+    next_cursor: str | None = None
@@ -5,15 +5,15 @@ from fastapi.responses import JSONResponse
 from fastapi import Path
 from fastapi import Depends
 
-from broker import RabbitMQPublisher
 from tasks import TaskController, Pipeline
 
 
 from ...application.status import StatusPolling
 from ...application.arxiv import ArxivIndexer
+from ...application.outbox import OutboxRelay
 
-from ..models import IndexRequest, TaskStatusResponse, Progress
-from ..dependencies.resources import get_publisher, get_task_controller
+from ..models import IndexRequest, BatchIndexRequest, TaskStatusResponse, Progress
+from ..dependencies.resources import get_outbox_relay, get_task_controller
 from ..dependencies.config import load_pipeline
 
 from ...settings import Settings, get_settings
@@ -25,14 +25,14 @@ router = APIRouter(prefix="/arxiv", tags=["arxiv"])
 async def index_arxiv(
     request: IndexRequest,
     controller: Annotated[TaskController, Depends(get_task_controller)],
-    publisher: Annotated[RabbitMQPublisher, Depends(get_publisher)],
+    relay: Annotated[OutboxRelay, Depends(get_outbox_relay)],
     pipeline: Annotated[Pipeline, Depends(load_pipeline)],
     settings: Annotated[Settings, Depends(get_settings)],
 ):
     if request.metadata.kind != "arxiv":
         return Response(status_code=400, content="Invalid metadata kind")
 
-    indexer = ArxivIndexer(controller=controller, publisher=publisher)
+    indexer = ArxivIndexer(controller=controller, relay=relay)
 
     first_task_name = None
 
@@ -59,3 +59,33 @@ async def index_arxiv(
         },
         status_code=202,
     )
+
+
+@router.post("/index:batch")
+async def index_arxiv_batch(
+    request: BatchIndexRequest,
+    controller: Annotated[TaskController, Depends(get_task_controller)],
+    relay: Annotated[OutboxRelay, Depends(get_outbox_relay)],
+    pipeline: Annotated[Pipeline, Depends(load_pipeline)],
+):
+    if any(item.metadata.kind != "arxiv" for item in request.requests):
+        return Response(status_code=400, content="Invalid metadata kind")
+
+    indexer = ArxivIndexer(controller=controller, relay=relay)
+
+    task_ids = await indexer.run_many(
+        queries=[
+            (item.query, item.metadata.max_results) for item in request.requests
+        ],
+        exchange_name="gateway",
+        routing_key="gateway.#",
+        task_name=pipeline.first_task_name,
+    )
+
+    return JSONResponse(
+        content={
+            "task_ids": task_ids,
+            "pipeline": list(pipeline.pipeline.keys()) + ["builder"],
+        },
+        status_code=202,
+    )
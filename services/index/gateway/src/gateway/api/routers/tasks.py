@@ -1,17 +1,104 @@
+import datetime
 from os import pipe
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, Path, Response
-from tasks import TaskController, Pipeline, TaskStatus
+from fastapi import APIRouter, Depends, Path, Query, Response
+from fastapi.responses import StreamingResponse
+from tasks import (
+    TaskController,
+    TaskListener,
+    TaskStatus,
+    Pipeline,
+    Task,
+    SubtaskCount,
+)
 from ...application.status import StatusPolling
-from ..models import TaskStatusResponse
+from ...application.stream import TaskStream
+from ...domain.status import summarize_subtasks, task_progress
+from ..models import (
+    TaskStatusResponse,
+    BatchStatusRequest,
+    BatchStatusResponse,
+    StageStatsResponse,
+    TaskItem,
+    TaskListResponse,
+)
 
-from ..dependencies.resources import get_task_controller
+from ..dependencies.resources import get_task_controller, get_task_listener
 from ..dependencies.config import load_pipeline
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
+def _pipeline_steps(pipeline: Pipeline) -> list[str]:
+    pipeline_steps = list(pipeline.pipeline)
+    pipeline_steps.append(
+        "builder"
+    )  # Ensure 'builder' is included in the pipeline steps
+    return pipeline_steps
+
+
+def _status_response(
+    task: Task, subtasks: list[SubtaskCount], steps: list[str]
+) -> TaskStatusResponse:
+    return TaskStatusResponse(
+        task_id=task.id,
+        status=task.status.name,
+        phase=task.phase,
+        progress=task_progress(task, subtasks, steps),
+        subtasks=summarize_subtasks(subtasks),
+    )
+
+
+@router.get("")
+async def list_tasks(
+    task_controller: Annotated[TaskController, Depends(get_task_controller)],
+    status: Annotated[
+        Literal["PENDING", "IN_PROGRESS", "COMPLETED", "FAILED"] | None, Query()
+    ] = None,
+    phase: str | None = None,
+    department: str | None = None,
+    since: Annotated[
+        datetime.datetime | None,
+        Query(description="Updated at or after, UTC when no offset is given"),
+    ] = None,
+    include_subtasks: bool = False,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 100,
+):
+    """
+    Tasks matching the filters, most recently updated first. Pass the
+    returned `next_cursor` as `cursor` to get the next page.
+    """
+    try:
+        page = await task_controller.list(
+            status=TaskStatus[status] if status else None,
+            phase=phase,
+            department=department,
+            since=since,
+            include_subtasks=include_subtasks,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        return Response(status_code=400, content=str(e))
+    return TaskListResponse(
+        tasks=[
+            TaskItem(
+                task_id=task.id,
+                status=task.status.name,
+                department=task.department,
+                phase=task.phase,
+                created_at=task.createAt,
+                updated_at=task.updateAt,
+                parent_id=task.parent_id,
+            )
+            for task in page.tasks
+        ],
+        next_cursor=page.next_cursor,
+    )
+
+
 @router.get("/status/{task_id}")
 async def status_arxiv(
     task_id: Annotated[str, Path(description="The task ID to check status for")],
@@ -24,50 +111,109 @@ async def status_arxiv(
     if task_status is None:
         return Response(status_code=404, content="Task not found")
 
-    progress = {}
-    pipeline_steps = list(pipeline.pipeline)
-    pipeline_steps.append(
-        "builder"
-    )  # Ensure 'builder' is included in the pipeline steps
-    if task_status.phase in pipeline_steps:
-        match task_status.status:
-            case TaskStatus.PENDING:
-                # If the task is pending, we assume it has not started yet
-                for order, phase in enumerate(pipeline_steps):
-                    progress[phase] = {
-                        "order": order,
-                        "status": "PENDING",
-                    }
-            case TaskStatus.IN_PROGRESS:
-                ptr = pipeline_steps.index(task_status.phase)
-                for order, phase in enumerate(pipeline_steps):
-                    if order < ptr:
-                        progress[phase] = {
-                            "order": order,
-                            "status": "COMPLETED",
-                        }
-                    elif order == ptr:
-                        progress[phase] = {
-                            "order": order,
-                            "status": "IN_PROGRESS",
-                        }
-                    else:
-
-                        progress[phase] = {
-                            "order": order,
-                            "status": "PENDING",
-                        }
-            case TaskStatus.COMPLETED:
-                for order, phase in enumerate(pipeline_steps):
-                    progress[phase] = {
-                        "order": order,
-                        "status": "COMPLETED",
-                    }
-    resp = TaskStatusResponse(
-        task_id=task_status.id,
-        status=task_status.status.name,
-        phase=task_status.phase,
-        progress=progress,
+    subtasks = await status_polling.poll_subtasks(task_id)
+
+    return _status_response(task_status, subtasks, _pipeline_steps(pipeline))
+
+
+@router.post("/status:batch")
+async def status_batch(
+    request: BatchStatusRequest,
+    task_controller: Annotated[TaskController, Depends(get_task_controller)],
+    pipeline: Annotated[Pipeline, Depends(load_pipeline)],
+) -> BatchStatusResponse:
+    """
+    Status of several tasks with one lookup of the tasks and one of their
+    sub-tasks, in request order.
+    """
+    status_polling = StatusPolling(controller=task_controller)
+    task_ids = list(dict.fromkeys(request.task_ids))
+
+    found = {task.id: task for task in await status_polling.poll_many(task_ids)}
+    subtasks = await status_polling.poll_subtasks_many(list(found))
+
+    steps = _pipeline_steps(pipeline)
+    return BatchStatusResponse(
+        tasks=[
+            _status_response(found[task_id], subtasks.get(task_id, []), steps)
+            for task_id in task_ids
+            if task_id in found
+        ],
+        missing=[task_id for task_id in task_ids if task_id not in found],
+    )
+
+
+@router.get("/stats")
+async def stage_stats(
+    task_controller: Annotated[TaskController, Depends(get_task_controller)],
+    window: Annotated[
+        int, Query(gt=0, le=90 * 86400, description="Seconds back from now")
+    ] = 3600,
+    bucket: Annotated[
+        int | None,
+        Query(gt=0, description="Split the window in buckets of that many seconds"),
+    ] = None,
+) -> StageStatsResponse:
+    """
+    Per-phase stage duration percentiles (p50/p95/p99) over the last
+    `window` seconds, optionally bucketed over time.
+    """
+    until = datetime.datetime.now(datetime.UTC)
+    since = until - datetime.timedelta(seconds=window)
+    stats = await task_controller.stage_stats(
+        since,
+        until,
+        datetime.timedelta(seconds=bucket) if bucket else None,
+    )
+    return StageStatsResponse(since=since, until=until, stats=stats)
+
+
+async def _event_stream(stream: TaskStream, task_ids: list[str], steps: list[str]):
+    async for changes in stream.updates(task_ids):
+        for task, subtasks in changes:
+            data = _status_response(task, subtasks, steps).model_dump_json()
+            yield f"event: status\ndata: {data}\n\n"
+
+
+def _sse(stream: TaskStream, task_ids: list[str], pipeline: Pipeline):
+    return StreamingResponse(
+        _event_stream(stream, task_ids, _pipeline_steps(pipeline)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    return resp
+
+@router.get("/stream/{task_id}")
+async def stream_status(
+    task_id: Annotated[str, Path(description="The task ID to follow")],
+    task_controller: Annotated[TaskController, Depends(get_task_controller)],
+    listener: Annotated[TaskListener, Depends(get_task_listener)],
+    pipeline: Annotated[Pipeline, Depends(load_pipeline)],
+):
+    """
+    Server-Sent Events with the status of the task each time it changes,
+    closed once the task completed or failed.
+    """
+    if await task_controller.get(task_id) is None:
+        return Response(status_code=404, content="Task not found")
+    stream = TaskStream(controller=task_controller, listener=listener)
+    return _sse(stream, [task_id], pipeline)
+
+
+@router.get("/stream")
+async def stream_statuses(
+    task_ids: Annotated[
+        list[str],
+        Query(alias="task_id", min_length=1, max_length=1000),
+    ],
+    task_controller: Annotated[TaskController, Depends(get_task_controller)],
+    listener: Annotated[TaskListener, Depends(get_task_listener)],
+    pipeline: Annotated[Pipeline, Depends(load_pipeline)],
+):
+    """
+    Server-Sent Events with the status of each task given as `task_id`
+    every time it changes, closed once all of them completed or failed.
+    Unknown tasks are left out.
+    """
+    stream = TaskStream(controller=task_controller, listener=listener)
+    return _sse(stream, list(dict.fromkeys(task_ids)), pipeline)
@@ -1,15 +1,15 @@
 from dataclasses import dataclass
 from ..domain.arxiv import ArxivQueryPreprocessor, ArxivTaskCreator
-from ..domain.publish import publish_task, create_task
+from ..domain.publish import enqueue_task, enqueue_tasks
+from .outbox import OutboxRelay
 
-from tasks import TaskController, TaskCreate, TaskStatus
-from broker import RabbitMQPublisher, TaskMessage
+from tasks import TaskController
 
 
 @dataclass
 class ArxivIndexer:
     controller: TaskController
-    publisher: RabbitMQPublisher
+    relay: OutboxRelay
 
     async def run(
         self,
@@ -28,15 +28,47 @@ class ArxivIndexer:
         # Create a task message
         task_message = await task_creator.create(processed_query)
 
-        # Publish the task to the broker
-        await publish_task(
-            publisher=self.publisher,
-            task_msg=task_message,
+        # Store the task with its message, the relay publishes it to the broker
+        await enqueue_task(
+            self.controller,
+            task_message,
+            department="arxiv",
+            phase="crawler",
             exchange_name=exchange_name,
             routing_key=routing_key,
         )
-
-        # Optionally, create a task in the database
-        await create_task(self.controller, task_message.id, "arxiv", "crawler")
+        self.relay.wake()
 
         return task_message.id
+
+    async def run_many(
+        self,
+        queries: list[tuple[str, int | None]],
+        exchange_name: str,
+        routing_key: str,
+        task_name: str,
+    ) -> list[str]:
+        """
+        Submit `(query, max_results)` pairs as one batch of tasks.
+        """
+        preprocessor = ArxivQueryPreprocessor()
+        task_creator = ArxivTaskCreator(task_name=task_name)
+
+        task_messages = [
+            await task_creator.create(
+                await preprocessor.preprocess(query, max_results)
+            )
+            for query, max_results in queries
+        ]
+
+        await enqueue_tasks(
+            self.controller,
+            task_messages,
+            department="arxiv",
+            phase="crawler",
+            exchange_name=exchange_name,
+            routing_key=routing_key,
+        )
+        self.relay.wake()
+
+        return [task_message.id for task_message in task_messages]
@@ -0,0 +1,66 @@
+import asyncio
+from dataclasses import dataclass
+
+from structlog.stdlib import BoundLogger
+
+from broker import RabbitMQPublisher
+from logs import get_logger
+from tasks import TaskController
+
+
+@dataclass
+class OutboxRelay:
+    """
+    Publishes the task outbox to RabbitMQ in the background. Polls every
+    `poll_interval` seconds, or right away when woken up after a task was
+    created, and keeps relaying while full batches come back.
+    """
+
+    controller: TaskController
+    publisher: RabbitMQPublisher
+    batch_size: int = 500
+    poll_interval: float = 1.0
+    logger: BoundLogger = get_logger("gateway.outbox")
+
+    def __post_init__(self):
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def relay(self) -> int:
+        """
+        Relay the outbox until it is empty. Returns the number of messages
+        published.
+        """
+        total = 0
+        while True:
+            count = await self.controller.relay_outbox(
+                self.publisher.publish_many, self.batch_size
+            )
+            total += count
+            if count < self.batch_size:
+                return total
+
+    async def run(self, stop: asyncio.Event) -> None:
+        await self.logger.ainfo("Outbox relay started")
+        while not stop.is_set():
+            self._wakeup.clear()
+            try:
+                count = await self.relay()
+                if count:
+                    await self.logger.adebug("Outbox relayed", count=count)
+            except Exception:
+                await self.logger.aexception("Failed to relay outbox")
+            waiters = [
+                asyncio.ensure_future(stop.wait()),
+                asyncio.ensure_future(self._wakeup.wait()),
+            ]
+            _, pending = await asyncio.wait(
+                waiters,
+                timeout=self.poll_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for waiter in pending:
+                waiter.cancel()
+        await self.logger.ainfo("Outbox relay stopped")
@@ -0,0 +1,65 @@
+import asyncio
+import datetime
+from dataclasses import dataclass
+
+from structlog.stdlib import BoundLogger
+
+from db import PostgresClient
+from logs import get_logger
+from tasks import TaskController, TaskStatus, ensure_partitions
+
+
+@dataclass
+class RetentionJob:
+    """
+    Removes finished tasks older than `retain_days` in batches of
+    `batch_size`, archiving them when `archive` is set, every `interval`
+    seconds. Also keeps the task history partitions ahead of time.
+    """
+
+    controller: TaskController
+    db: PostgresClient
+    retain_days: int = 30
+    statuses: tuple[TaskStatus, ...] = (TaskStatus.COMPLETED,)
+    archive: bool = True
+    batch_size: int = 1000
+    interval: float = 3600.0
+    logger: BoundLogger = get_logger("gateway.retention")
+
+    async def purge(self) -> int:
+        """
+        Purge every expired task, one batch per transaction. Returns the
+        number of rows removed.
+        """
+        # `updateAt` holds the database time without zone, UTC
+        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+        before = now - datetime.timedelta(days=self.retain_days)
+        total = 0
+        while True:
+            count = await self.controller.purge(
+                before, self.batch_size, self.statuses, self.archive
+            )
+            total += count
+            if count < self.batch_size:
+                return total
+            # Leave room for the regular traffic between batches
+            await asyncio.sleep(0)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        await self.logger.ainfo(
+            "Retention job started",
+            retain_days=self.retain_days,
+            archive=self.archive,
+        )
+        while not stop.is_set():
+            try:
+                await ensure_partitions(self.db)
+                count = await self.purge()
+                await self.logger.ainfo("Retention pass done", removed=count)
+            except Exception:
+                await self.logger.aexception("Retention pass failed")
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+        await self.logger.ainfo("Retention job stopped")
@@ -1,7 +1,12 @@
 from dataclasses import dataclass
 
 from tasks import TaskController
-from ..domain.status import poll_task_status
+from ..domain.status import (
+    poll_task_status,
+    poll_subtasks,
+    poll_task_statuses,
+    poll_subtasks_many,
+)
 
 
 @dataclass
@@ -10,3 +15,12 @@ class StatusPolling:
 
     async def poll(self, task_id: str):
         return await poll_task_status(self.controller, task_id)
+
+    async def poll_subtasks(self, task_id: str):
+        return await poll_subtasks(self.controller, task_id)
+
+    async def poll_many(self, task_ids: list[str]):
+        return await poll_task_statuses(self.controller, task_ids)
+
+    async def poll_subtasks_many(self, task_ids: list[str]):
+        return await poll_subtasks_many(self.controller, task_ids)
@@ -0,0 +1,69 @@
+import asyncio
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+from tasks import TaskController, TaskListener, Task, TaskStatus, SubtaskCount
+from ..domain.status import apply_event
+
+
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED)
+
+
+@dataclass
+class TaskStream:
+    controller: TaskController
+    listener: TaskListener
+    # Seconds without events after which the tasks are reloaded anyway
+    refresh_interval: float = 15.0
+
+    async def _load(
+        self, task_ids: list[str]
+    ) -> tuple[dict[str, Task], dict[str, list[SubtaskCount]]]:
+        tasks = {task.id: task for task in await self.controller.get_many(task_ids)}
+        counts = await self.controller.count_subtasks_many(list(tasks))
+        return tasks, counts
+
+    async def updates(
+        self, task_ids: list[str]
+    ) -> AsyncIterator[list[tuple[Task, list[SubtaskCount]]]]:
+        """
+        Yields the tasks that changed with their sub-task counts, all of them
+        first, until every task is completed or failed. Changes of the task
+        rows are applied as notified, sub-task counts are reloaded once per
+        batch of sub-task events. Unknown ids are ignored.
+        """
+        async with self.listener.subscribe(task_ids) as queue:
+            tasks, counts = await self._load(task_ids)
+            changed = set(tasks)
+            while True:
+                yield [(tasks[i], counts.get(i, [])) for i in changed]
+                if all(task.status in TERMINAL_STATUSES for task in tasks.values()):
+                    return
+
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.refresh_interval)
+                except asyncio.TimeoutError:
+                    event = None
+                events = [event]
+                while not queue.empty():
+                    events.append(queue.get_nowait())
+
+                # Missed events or a quiet period, reload everything
+                if any(event is None for event in events):
+                    tasks, counts = await self._load(list(tasks))
+                    changed = set(tasks)
+                    continue
+
+                changed = set()
+                parents = set()
+                for event in events:
+                    if event.id in tasks:
+                        tasks[event.id] = apply_event(tasks[event.id], event)
+                        changed.add(event.id)
+                    if event.parent_id in tasks:
+                        parents.add(event.parent_id)
+                if parents:
+                    counts.update(
+                        await self.controller.count_subtasks_many(list(parents))
+                    )
+                    changed |= parents
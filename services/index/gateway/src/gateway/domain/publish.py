@@ -1,27 +1,50 @@
-from tasks import TaskController, TaskCreate, TaskStatus
-from broker import RabbitMQPublisher, TaskMessage
+from tasks import TaskController, TaskCreate, TaskStatus, OutboxMessage
+from broker import TaskMessage
 
 
-async def create_task(
-    controller: TaskController, task_id: str, department: str, phase: str
+async def enqueue_task(
+    controller: TaskController,
+    task_msg: TaskMessage,
+    department: str,
+    phase: str,
+    exchange_name: str,
+    routing_key: str,
 ):
-    task = TaskCreate(
-        id=task_id,
-        status=TaskStatus.PENDING,
-        department=department,
-        phase=phase,
+    """
+    Create the task and its outbox message in one transaction, the outbox
+    relay publishes the message.
+    """
+    return await enqueue_tasks(
+        controller, [task_msg], department, phase, exchange_name, routing_key
     )
-    return await controller.create(task)
 
 
-async def publish_task(
-    publisher: RabbitMQPublisher,
-    task_msg: TaskMessage,
+async def enqueue_tasks(
+    controller: TaskController,
+    task_msgs: list[TaskMessage],
+    department: str,
+    phase: str,
     exchange_name: str,
     routing_key: str,
 ):
-    await publisher.publish(
-        exchange_name=exchange_name,
-        routing_key=routing_key,
-        message=task_msg.model_dump_json().encode("utf-8"),
-    )
+    """
+    Create several tasks and their outbox messages in one transaction.
+    """
+    tasks = [
+        TaskCreate(
+            id=task_msg.id,
+            status=TaskStatus.PENDING,
+            department=department,
+            phase=phase,
+        )
+        for task_msg in task_msgs
+    ]
+    messages = [
+        OutboxMessage(
+            exchange_name=exchange_name,
+            routing_key=routing_key,
+            payload=task_msg.model_dump_json().encode("utf-8"),
+        )
+        for task_msg in task_msgs
+    ]
+    return await controller.create_many(tasks, messages)
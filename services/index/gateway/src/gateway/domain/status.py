@@ -1,5 +1,84 @@
-from tasks import TaskController
+from tasks import TaskController, Task, TaskEvent, TaskStatus, SubtaskCount
 
 
 async def poll_task_status(controller: TaskController, task_id: str):
     return await controller.get(task_id)
+
+
+async def poll_subtasks(controller: TaskController, task_id: str):
+    return await controller.count_subtasks(task_id)
+
+
+async def poll_task_statuses(controller: TaskController, task_ids: list[str]):
+    return await controller.get_many(task_ids)
+
+
+async def poll_subtasks_many(controller: TaskController, task_ids: list[str]):
+    return await controller.count_subtasks_many(task_ids)
+
+
+def summarize_subtasks(counts: list[SubtaskCount]) -> dict[str, int] | None:
+    """
+    Number of sub-tasks in total and per status, None for tasks that were
+    not fanned out.
+    """
+    if not counts:
+        return None
+    summary = {"total": sum(c.count for c in counts)}
+    for status in TaskStatus:
+        summary[status.name] = sum(c.count for c in counts if c.status == status)
+    return summary
+
+
+def slowest_phase(counts: list[SubtaskCount], steps: list[str]) -> str | None:
+    """
+    Earliest pipeline phase among the unfinished sub-tasks, which is how far
+    the task as a whole has progressed.
+    """
+    phases = [
+        c.phase
+        for c in counts
+        if c.status != TaskStatus.COMPLETED and c.phase in steps
+    ]
+    return min(phases, key=steps.index) if phases else None
+
+
+def task_progress(
+    task: Task, counts: list[SubtaskCount], steps: list[str]
+) -> dict[str, dict]:
+    """
+    Status of every pipeline step for the task, keyed by step name.
+    """
+    progress = {}
+    # A fanned out task is as far along as its slowest part
+    phase = task.phase
+    if task.status == TaskStatus.IN_PROGRESS:
+        phase = slowest_phase(counts, steps) or phase
+    if phase not in steps:
+        return progress
+    match task.status:
+        case TaskStatus.PENDING:
+            # If the task is pending, we assume it has not started yet
+            for order, step in enumerate(steps):
+                progress[step] = {"order": order, "status": "PENDING"}
+        case TaskStatus.IN_PROGRESS:
+            ptr = steps.index(phase)
+            for order, step in enumerate(steps):
+                if order < ptr:
+                    status = "COMPLETED"
+                elif order == ptr:
+                    status = "IN_PROGRESS"
+                else:
+                    status = "PENDING"
+                progress[step] = {"order": order, "status": status}
+        case TaskStatus.COMPLETED:
+            for order, step in enumerate(steps):
+                progress[step] = {"order": order, "status": "COMPLETED"}
+    return progress
+
+
+def apply_event(task: Task, event: TaskEvent) -> Task:
+    """
+    The task after a change notified for it.
+    """
+    return task.model_copy(update={"status": event.status, "phase": event.phase})
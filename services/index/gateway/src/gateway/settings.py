@@ -11,10 +11,32 @@ from db import PostgreSQLSettings
 from storage import MinioSettings
 
 
+class OutboxSettings(BaseModel):
+    # Messages relayed per transaction
+    batch_size: int = 500
+    # Seconds between polls when no task was created in this process
+    poll_interval: float = 1.0
+
+
+class RetentionSettings(BaseModel):
+    enabled: bool = True
+    # Finished tasks are kept that many days after their last update
+    retain_days: int = 30
+    # Also remove failed tasks, not only completed ones
+    include_failed: bool = False
+    # Copy removed tasks to `tasks_archive`
+    archive: bool = True
+    batch_size: int = 1000
+    # Seconds between retention passes
+    interval: float = 3600.0
+
+
 class Settings(BaseSettings):
     rabbitmq: RabbitMQSettings
     postgre: PostgreSQLSettings
     minio: MinioSettings
+    outbox: OutboxSettings = OutboxSettings()
+    retention: RetentionSettings = RetentionSettings()
 
     @classmethod
     def settings_customise_sources(
@@ -1,27 +1,32 @@
 import importlib
+import os
 import requests
 
 from logs import get_logger, setup_logging
 from db import PostgresClient
-from tasks import Pipeline, PostgreSQLController
+from tasks import (
+    Pipeline,
+    PostgreSQLController,
+    BufferedTaskController,
+    StageRecorder,
+)
 from broker import RabbitMQPublisher, RabbitMQPool, RabbitMQSubscriber
-from storage import MinIOStorage
+from storage import MinIOStorage, get_codec
 from .settings import get_settings
 from .handler import IHandler, HandlerRegistry
+from .compute import ComputeExecutor
 from .processor import Processor
 
 setup_logging()
 
 
-async def run() -> None:
+async def run(stages: list[str] | None = None) -> None:
     settings = get_settings()
 
     logger = get_logger("worker.main")
 
     pool = RabbitMQPool(settings=settings.rabbitmq)
     publisher = RabbitMQPublisher(pool)
-    controller = PostgreSQLController(await PostgresClient.init(settings.postgre))
-
     storage = MinIOStorage(settings=settings.minio)
 
     pipeline_config = None
@@ -51,45 +56,42 @@ async def run() -> None:
             url=settings.master.url,
         )
         raise RuntimeError("Failed to fetch pipeline configuration from master service")
-    handler_register = HandlerRegistry()
 
-    subscriber = RabbitMQSubscriber(
-        pool=pool,
-        queue_name=pipeline_config.backlog_queue_name,
+    # Status updates are written behind, in batches
+    controller = BufferedTaskController(
+        PostgreSQLController(await PostgresClient.init(settings.postgre)),
+        max_batch=settings.status_writer.max_batch,
+        flush_interval=settings.status_writer.flush_interval,
+        phases=pipeline_config.phases,
+    )
+    recorder = StageRecorder(
+        controller,
+        max_batch=settings.status_writer.max_batch,
+        flush_interval=settings.status_writer.flush_interval,
+    )
+    consumed = _select_stages(pipeline_config, stages or settings.stages)
+    # A fused chain runs in the worker consuming its first stage
+    loaded = list(
+        dict.fromkeys(
+            name
+            for task_name in consumed
+            for name in pipeline_config.fused_chain(task_name)
+        )
     )
+    await logger.ainfo("Serving stages", consumed=consumed, loaded=loaded)
 
-    for task_name, task_info in pipeline_config.pipeline.items():
+    await storage.ensure_buckets(
+        pipeline_config.pipeline[task_name].bucket_name for task_name in loaded
+    )
+
+    # Only the modules of the loaded stages are imported, so a worker that
+    # does not run the NLP stages never imports spaCy.
+    handler_classes: dict[str, type[IHandler]] = {}
+    for task_name in loaded:
+        task_info = pipeline_config.pipeline[task_name]
         try:
             module = importlib.import_module(f".{task_info.handler}", "worker")
-            handler_class: type[IHandler] = getattr(module, "Handler")
-            handler_instance = handler_class(
-                publisher=publisher,
-                controller=controller,
-                storage=storage,
-                logger=get_logger(f"worker.handler.{task_name}"),
-                task_name=task_name,
-                bucket_name=task_info.bucket_name,
-                object_name=task_info.object_name,
-                exchange_name=pipeline_config.exchange_name,
-                routing_key=task_info.routing_key,
-                from_queue=pipeline_config.backlog_queue_name,
-                to_queue=(
-                    pipeline_config.builder_queue_name
-                    if task_info.last
-                    else pipeline_config.backlog_queue_name
-                ),
-                next_task_name=task_info.next_task_name,
-                **task_info.args,
-            )
-            await pool.bind(
-                handler_instance.exchange_name,
-                handler_instance.to_queue,
-                handler_instance.routing_key,
-            )
-
-            handler_register.register(task_name, handler_instance)
-
-            logger.info("Handler loaded successfully", task_name=task_name)
+            handler_classes[task_name] = getattr(module, "Handler")
         except (ImportError, AttributeError):
             logger.error(
                 "Failed to load handler",
@@ -97,20 +99,124 @@ async def run() -> None:
                 **task_info.model_dump(),
             )
             raise
+
+    pool_size = settings.compute.pool_size or os.cpu_count() or 1
+    compute = ComputeExecutor(
+        pool_size=pool_size,
+        max_pending=settings.compute.max_pending or 2 * pool_size,
+        initializers=[
+            handler_class.compute_initializer
+            for handler_class in handler_classes.values()
+            if handler_class.compute_initializer is not None
+        ],
+    )
+
+    codec = get_codec(pipeline_config.codec)
+
+    handler_register = HandlerRegistry()
+
+    for task_name, handler_class in handler_classes.items():
+        task_info = pipeline_config.pipeline[task_name]
+        routing_key, to_queue = pipeline_config.output_route(task_name)
+        handler_instance = handler_class(
+            publisher=publisher,
+            controller=controller,
+            storage=storage,
+            compute=compute,
+            codec=codec,
+            logger=get_logger(f"worker.handler.{task_name}"),
+            task_name=task_name,
+            bucket_name=task_info.bucket_name,
+            object_name=task_info.object_name,
+            exchange_name=pipeline_config.exchange_name,
+            routing_key=routing_key,
+            from_queue=pipeline_config.input_queue(task_name),
+            to_queue=to_queue,
+            next_task_name=task_info.next_task_name,
+            **task_info.args,
+        )
+        await pool.bind(
+            handler_instance.exchange_name,
+            handler_instance.to_queue,
+            handler_instance.routing_key,
+        )
+
+        handler_register.register(task_name, handler_instance)
+
+        logger.info("Handler loaded successfully", task_name=task_name)
+
+    if pipeline_config.stage_queues:
+        # Declare the input queues as well, the upstream stages may be served
+        # by workers that have not started yet.
+        for task_name in consumed:
+            await pool.bind(
+                pipeline_config.exchange_name,
+                pipeline_config.input_queue(task_name),
+                pipeline_config.input_routing_key(task_name),
+            )
+
+    subscribers = [
+        RabbitMQSubscriber(
+            pool=pool,
+            queue_name=queue_name,
+            prefetch_count=settings.subscriber.prefetch_count,
+            max_in_flight=settings.subscriber.max_in_flight,
+            drain_timeout=settings.subscriber.drain_timeout,
+        )
+        for queue_name in dict.fromkeys(
+            pipeline_config.input_queue(task_name) for task_name in consumed
+        )
+    ]
+
     processor = Processor(
         storage=storage,
         task_controller=controller,
         rabbitmq_publisher=publisher,
-        rabbitmq_subscriber=subscriber,
+        rabbitmq_subscribers=subscribers,
         handlers=handler_register,
+        pipeline=pipeline_config,
+        stage_recorder=recorder,
         logger=get_logger("worker.processor"),
     )
     logger.info("Pipeline configuration fetched successfully", pipeline=pipeline_config)
 
-    await processor.process()
+    try:
+        await processor.process()
+    finally:
+        await recorder.close()
+        await controller.close()
+        # Subscribers are drained, no storage call is in flight anymore
+        await storage.close()
+        compute.shutdown()
+
+
+def _select_stages(pipeline: Pipeline, stages: list[str] | None) -> list[str]:
+    """
+    Stages whose queues this worker consumes, all of them by default.
+    """
+    if not stages:
+        return list(pipeline.pipeline)
+    unknown = [name for name in stages if name not in pipeline.pipeline]
+    if unknown:
+        raise ValueError(f"Unknown pipeline stages: {', '.join(unknown)}")
+    if not pipeline.stage_queues and set(stages) != set(pipeline.pipeline):
+        raise ValueError(
+            "Serving a subset of the stages requires `stage_queues` in the pipeline"
+        )
+    return list(dict.fromkeys(stages))
 
 
 def main():
+    import argparse
     import asyncio
 
-    asyncio.run(run())
+    parser = argparse.ArgumentParser(prog="worker")
+    parser.add_argument(
+        "--stages",
+        type=lambda value: [stage.strip() for stage in value.split(",") if stage],
+        default=None,
+        help="Comma separated pipeline stages to serve, e.g. `extractor`",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(stages=args.stages))
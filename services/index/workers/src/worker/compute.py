@@ -0,0 +1,73 @@
+import asyncio
+import multiprocessing
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, TypeVar
+
+from structlog.stdlib import BoundLogger
+from logs import get_logger
+
+T = TypeVar("T")
+
+
+# Set in the pool processes by `run_initializers`
+_in_pool = False
+
+
+def in_compute_pool() -> bool:
+    """Whether the caller runs in a `ComputeExecutor` pool process."""
+    return _in_pool
+
+
+def run_initializers(initializers: Sequence[Callable[[], Any]]) -> None:
+    global _in_pool
+    _in_pool = True
+    for initializer in initializers:
+        initializer()
+
+
+@dataclass
+class ComputeExecutor:
+    """
+    Process pool for CPU-bound handler work, keeping the event loop free for
+    broker heartbeats, storage and database I/O.
+
+    `initializers` run once in every pool process, e.g. to load a model.
+    Jobs must not start process pools of their own (see `in_compute_pool`),
+    the parallelism of CPU-bound work is set by `pool_size` alone.
+    At most `max_pending` jobs are submitted or running at a time, callers
+    beyond that wait, which pushes back on the subscriber.
+    """
+
+    pool_size: int
+    max_pending: int
+    initializers: Sequence[Callable[[], Any]] = ()
+    logger: BoundLogger = get_logger("worker.compute")
+
+    def __post_init__(self):
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=partial(
+                run_initializers, tuple(dict.fromkeys(self.initializers))
+            ),
+        )
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self.logger.info(
+            "Compute executor initialized",
+            pool_size=self.pool_size,
+            max_pending=self.max_pending,
+        )
+
+    async def submit(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, partial(func, *args, **kwargs)
+            )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.logger.info("Compute executor stopped")
@@ -1,2 +1 @@
 from ._interface import IHandler, ResourceInvalid, HandlerException, HandlerRegistry
-from .crawler.handler import CrawlerHandler
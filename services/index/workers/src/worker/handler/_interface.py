@@ -1,18 +1,23 @@
-from typing import Protocol
+from collections.abc import Callable
+from typing import Any, ClassVar, Protocol
 from dataclasses import dataclass, field
 
 from structlog.stdlib import BoundLogger
 from broker import RabbitMQPublisher
 from tasks import TaskController
-from storage import ObjectStorage
+from storage import ObjectStorage, ArtifactCodec
 from logs import get_logger
 
+from ..compute import ComputeExecutor
+
 
 @dataclass
 class IHandler(Protocol):
     publisher: RabbitMQPublisher
     controller: TaskController
     storage: ObjectStorage
+    compute: ComputeExecutor
+    codec: ArtifactCodec
     logger: BoundLogger
 
     task_name: str
@@ -27,7 +32,47 @@ class IHandler(Protocol):
 
     next_task_name: str
 
-    async def handle(self, task_id: str, resources_url: str) -> tuple[bytes, str]: ...
+    # Run once in every compute pool process, e.g. to load a model. Only the
+    # initializers of the stages a worker serves are run.
+    compute_initializer: ClassVar[Callable[[], Any] | None] = None
+
+    async def load(self, resources_url: str) -> Any:
+        """Fetch and decode the stage input referenced by `resources_url`."""
+        ...
+
+    async def run(self, task_id: str, data: Any) -> Any:
+        """Turn the decoded input into this stage's output, in memory."""
+        ...
+
+    def dump(self, data: Any) -> bytes:
+        """Encode the stage output for storage."""
+        return self.codec.encode(data)
+
+    def output_url(self, task_id: str, resources_url: str) -> str:
+        """
+        Resource URL of the stage output produced from `resources_url`, stored
+        under the `task_id` prefix (a content address in content-addressed
+        pipelines).
+        """
+        ...
+
+    def split(self, data: Any, size: int) -> list[Any]:
+        """
+        Split the stage output into parts of at most `size` documents, for
+        stages configured with a fan-out.
+        """
+        raise HandlerException(f"Stage '{self.task_name}' does not support fan-out")
+
+    def fingerprint(self) -> dict[str, Any]:
+        """
+        Handler state, besides the stage args, that changes the output for a
+        given input (e.g. model versions). Part of content-addressed keys.
+        """
+        return {}
+
+    async def handle(self, task_id: str, resources_url: str) -> tuple[bytes, str]:
+        data = await self.run(task_id, await self.load(resources_url))
+        return self.dump(data), self.output_url(task_id, resources_url)
 
 
 @dataclass
@@ -1,49 +1,64 @@
+from collections.abc import Iterable
+
 from storage import ObjectStorage
 from pydantic import AnyUrl
 from uuid import uuid4
 
-from ..utils import load_resources, parse_s3_resource_url, get_spacy
-
+from ..utils import (
+    load_artifact,
+    parse_s3_resource_url,
+    get_spacy,
+    spacy_n_process,
+)
 
-def parse_resource_content(resource_content: bytes) -> str:
-    return resource_content.decode("utf-8")
 
-
-def chunk_document(doc: str) -> list[str]:
+def chunk_documents(
+    docs: Iterable[str], batch_size: int = 32, n_process: int = 1
+) -> list[str]:
+    """
+    Split documents into sentences, running spaCy over them in batches.
+    Only sentence boundaries are needed, so the NER component is skipped.
+    """
     nlp = get_spacy()
-    processed_doc = nlp(doc)
     chunks = []
-    for sent in processed_doc.sents:
-        if sent.text.strip():
-            chunks.append(sent.text.strip())
+    for processed_doc in nlp.pipe(
+        docs,
+        batch_size=batch_size,
+        n_process=spacy_n_process(n_process),
+        disable=["ner"],
+    ):
+        for sent in processed_doc.sents:
+            if sent.text.strip():
+                chunks.append(sent.text.strip())
     return chunks
 
 
-async def chunk_arxiv_documents(
-    storage: ObjectStorage, resource_url: AnyUrl, separator: str
-) -> bytes:
-    import json
-
+async def load_arxiv_documents(
+    storage: ObjectStorage, resource_url: AnyUrl
+) -> list[str]:
     bucket_name, object_name = parse_s3_resource_url(resource_url)
-    resource_content = await load_resources(
+    artifact = await load_artifact(
         storage=storage,
         bucket_name=bucket_name,
         object_name=object_name,
     )
 
-    if resource_content is None:
+    if artifact is None:
         raise ValueError(f"Resource not found: {resource_url}")
 
-    docs = parse_resource_content(resource_content)
+    docs = artifact.get("docs", [])
     if not docs:
         raise ValueError(f"No documents found in resource: {resource_url}")
+    return docs
 
-    chunks = []
-    for d in docs.split(separator):
-        if d.strip():
-            chunked_docs = chunk_document(d.strip())
-            chunks.extend(chunked_docs)
-
-    return json.dumps(
-        {str(uuid4()): chunk for chunk in chunks}, ensure_ascii=False
-    ).encode("utf-8")
+
+def chunk_arxiv_documents(
+    docs: list[str], batch_size: int = 32, n_process: int = 1
+) -> dict[str, list[dict[str, str]]]:
+    chunks = chunk_documents(
+        (d.strip() for d in docs if d.strip()),
+        batch_size=batch_size,
+        n_process=n_process,
+    )
+
+    return {"chunks": [{"id": str(uuid4()), "text": chunk} for chunk in chunks]}
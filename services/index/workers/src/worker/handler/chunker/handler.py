@@ -1,48 +1,60 @@
 from dataclasses import dataclass
-from structlog.stdlib import BoundLogger
-from pydantic import ValidationError, AnyUrl
+from typing import Any
 
-from broker import AbstractIncomingMessage, TaskMessage, RabbitMQPublisher
-from tasks import TaskController
-from storage import ObjectStorage
-
-from .arxiv import chunk_arxiv_documents
-from .._interface import IHandler, ResourceInvalid, HandlerException
-from ..utils import build_resource_url
+from .arxiv import load_arxiv_documents, chunk_arxiv_documents
+from .._interface import IHandler, ResourceInvalid
+from ..utils import (
+    build_resource_url,
+    get_spacy,
+    parse_resource_url,
+    spacy_model_version,
+)
 
 
 @dataclass
 class ChunkerHandler(IHandler):
-    separator: str
+    compute_initializer = get_spacy
+
+    batch_size: int = 32
+    n_process: int = 1
 
-    async def handle(self, task_id: str, resources_url: str) -> tuple[bytes, str]:
-        try:
-            _url = AnyUrl(resources_url)
-        except Exception as e:
-            raise ResourceInvalid(resources_url, "Invalid resource format") from e
+    async def load(self, resources_url: str) -> list[str]:
+        _url = parse_resource_url(resources_url)
 
         match (_url.scheme, _url.host):
             case ("minio", "arxiv"):
                 try:
-                    resource_content = await chunk_arxiv_documents(
-                        resource_url=_url,
+                    return await load_arxiv_documents(
                         storage=self.storage,
-                        separator=self.separator,
+                        resource_url=_url,
                     )
                 except ValueError as e:
                     raise ResourceInvalid(resources_url, str(e))
-                return (
-                    resource_content,
-                    build_resource_url(
-                        "minio",
-                        _url.host,
-                        self.bucket_name,
-                        self.object_name,
-                        task_id,
-                    ),
-                )
             case _:
                 raise ResourceInvalid(
                     resources_url,
                     f"Unsupported resource scheme and host: {_url.scheme}, {_url.host}",
                 )
+
+    async def run(
+        self, task_id: str, data: list[str]
+    ) -> dict[str, list[dict[str, str]]]:
+        return await self.compute.submit(
+            chunk_arxiv_documents,
+            data,
+            batch_size=self.batch_size,
+            n_process=self.n_process,
+        )
+
+    def output_url(self, task_id: str, resources_url: str) -> str:
+        _url = parse_resource_url(resources_url)
+        return build_resource_url(
+            "minio",
+            _url.host or "",
+            self.bucket_name,
+            self.object_name,
+            task_id,
+        )
+
+    def fingerprint(self) -> dict[str, Any]:
+        return {"model": spacy_model_version()}
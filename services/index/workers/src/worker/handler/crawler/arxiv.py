@@ -1,54 +1,149 @@
-import json
+import asyncio
+import time
+from typing import Any
 
+import arxiv
+import fitz
+import requests
 from pydantic import AnyUrl
-from langchain_community.document_loaders import ArxivLoader
 from structlog.stdlib import BoundLogger
 
 from logs import get_logger
 
+from ...compute import ComputeExecutor
+from .cache import PaperCache
+from .scheduler import FetchScheduler
+
+
+def search_arxiv(query: str, max_results: int) -> list[arxiv.Result]:
+    """
+    Run the search against the arXiv API. Only returns metadata, one request
+    per page of results.
+    """
+    client = arxiv.Client()
+    return list(client.results(arxiv.Search(query=query, max_results=max_results)))
+
+
+def paper_id(result: arxiv.Result) -> str:
+    """Versionless arXiv id, e.g. `2401.01234` or `hep-th/9901001`."""
+    short_id = result.get_short_id()
+    base, _, version = short_id.rpartition("v")
+    return base if base and version.isdigit() else short_id
+
+
+def download_pdf(result: arxiv.Result, timeout: float = 60.0) -> bytes:
+    response = requests.get(result.pdf_url, timeout=timeout)
+    response.raise_for_status()
+    return response.content
+
+
+def pdf_to_text(pdf: bytes) -> str:
+    """
+    Extract the text of a PDF, run in the compute pool.
+    """
+    with fitz.open(stream=pdf, filetype="pdf") as doc:
+        return "".join(page.get_text() for page in doc)
+
+
+def to_document(result: arxiv.Result, content: str) -> dict[str, Any]:
+    return {
+        "id": paper_id(result),
+        "content": content,
+        "title": result.title,
+        "authors": [author.name for author in result.authors],
+        "summary": result.summary,
+        "published": result.published.date().isoformat(),
+        "url": result.entry_id,
+    }
+
+
+async def crawl_paper(
+    result: arxiv.Result,
+    scheduler: FetchScheduler,
+    compute: ComputeExecutor,
+    cache: PaperCache | None = None,
+    cache_ttl: float = 7 * 24 * 3600,
+) -> tuple[dict[str, Any], bool]:
+    """
+    Fetch a single paper, or reuse it from the cache. Returns the document
+    and whether it came from the cache.
+    """
+    arxiv_id = paper_id(result)
+    updated = result.updated.isoformat()
+
+    entry = await cache.get(arxiv_id) if cache else None
+    if (
+        entry is not None
+        and entry.get("updated") == updated
+        and time.time() - entry.get("fetched_at", 0) < cache_ttl
+    ):
+        return entry["doc"], True
+
+    pdf = await scheduler.run(
+        lambda: asyncio.to_thread(download_pdf, result), name=arxiv_id
+    )
+    content = await compute.submit(pdf_to_text, pdf)
+    doc = to_document(result, content)
+    if cache:
+        await cache.put(
+            arxiv_id,
+            {"doc": doc, "updated": updated, "fetched_at": time.time()},
+        )
+    return doc, False
+
 
 async def query_arxiv(
     query: str,
+    scheduler: FetchScheduler,
+    compute: ComputeExecutor,
     max_results: int = 10,
+    cache: PaperCache | None = None,
+    cache_ttl: float = 7 * 24 * 3600,
+    logger: BoundLogger = get_logger("worker.crawler.arxiv"),
 ) -> list[dict]:
     """
     Query Arxiv for papers matching the given query string.
 
+    The search is resolved first, then papers are fetched concurrently
+    through `scheduler` and their PDFs converted to text in the compute pool.
+    Papers are cached by arXiv id. A cached paper is reused while it is
+    younger than `cache_ttl` seconds and the search still reports the version
+    it was fetched from, so only new or revised papers are downloaded.
+
     Args:
         query (str): The search query.
+        scheduler (FetchScheduler): Rate limited scheduler for arXiv calls.
+        compute (ComputeExecutor): Pool running the PDF to text conversion.
         max_results (int): Maximum number of results to return.
+        cache (PaperCache | None): Paper cache, None disables caching.
+        cache_ttl (float): Maximum age of a cached paper in seconds.
         logger (BoundLogger): Logger instance for logging.
 
     Returns:
         list[dict]: List of dictionaries containing paper metadata.
     """
-    loader = ArxivLoader(
-        query=query,
-        load_max_docs=max_results,
+    started = time.perf_counter()
+    results = await scheduler.run(
+        lambda: asyncio.to_thread(search_arxiv, query, max_results), name=query
     )
-    documents = loader.alazy_load()
-
-    results = []
-    async for doc in documents:
-        results.append(
-            {
-                "content": doc.page_content,
-                "title": doc.metadata.get("title"),
-                "authors": doc.metadata.get("authors"),
-                "summary": doc.metadata.get("summary"),
-                "published": doc.metadata.get("published"),
-                "url": doc.metadata.get("url"),
-            }
-        )
 
-    return results
+    crawled = await asyncio.gather(
+        *(crawl_paper(result, scheduler, compute, cache, cache_ttl) for result in results)
+    )
 
+    await logger.ainfo(
+        "arXiv query crawled",
+        query=query,
+        results=len(crawled),
+        cache_hits=sum(hit for _, hit in crawled),
+        elapsed=round(time.perf_counter() - started, 2),
+    )
+    return [doc for doc, _ in crawled]
 
-async def handle_arxiv_query(
-    resource_url: AnyUrl,
-):
+
+def parse_arxiv_query(resource_url: AnyUrl) -> tuple[str, int]:
     """
-    Handle the arXiv query and publish results.
+    Extract the search query and result limit from an arXiv resource URL.
     """
     query = resource_url.query
     if query is None:
@@ -61,21 +156,28 @@ async def handle_arxiv_query(
     query = queries[0].split("=")[1]
     max_results = queries[1].split("=")[1]
 
-    _max_results = 1
-    if not max_results.isdigit():
-        _max_results = 1
+    _max_results = int(max_results) if max_results.isdigit() else 1
+    return query, max(_max_results, 1)
 
-    if int(max_results) <= 0:
-        _max_results = 1
 
+async def handle_arxiv_query(
+    query: str,
+    max_results: int,
+    scheduler: FetchScheduler,
+    compute: ComputeExecutor,
+    cache: PaperCache | None = None,
+    cache_ttl: float = 7 * 24 * 3600,
+) -> dict[str, list[dict]]:
+    """
+    Handle the arXiv query and return the crawled documents.
+    """
     docs = await query_arxiv(
         query,
-        max_results=int(_max_results),
+        scheduler=scheduler,
+        compute=compute,
+        max_results=max_results,
+        cache=cache,
+        cache_ttl=cache_ttl,
     )
 
-    _docs_object = {"docs": docs}
-
-    _docs_json = json.dumps(_docs_object, ensure_ascii=False)
-    _docs_bytes = _docs_json.encode("utf-8")
-
-    return _docs_bytes
+    return {"docs": docs}
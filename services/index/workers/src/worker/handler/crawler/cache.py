@@ -0,0 +1,122 @@
+import asyncio
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+from storage import JSONCodec, ObjectStorage, ObjectStorageOptionalPutArgs
+
+
+class PaperCache(Protocol):
+    """
+    Crawled papers keyed by versionless arXiv id. Entries hold the paper
+    document plus the `updated` stamp of the version it was fetched from and
+    the `fetched_at` time used for TTL checks.
+    """
+
+    async def get(self, arxiv_id: str) -> dict[str, Any] | None: ...
+
+    async def put(self, arxiv_id: str, entry: dict[str, Any]) -> None: ...
+
+
+def _cache_key(arxiv_id: str) -> str:
+    # Old style ids contain the archive name, e.g. `hep-th/9901001`
+    return arxiv_id.replace("/", "_") + ".json"
+
+
+@dataclass
+class MinIOPaperCache:
+    """Cache shared by every worker, stored in a dedicated bucket."""
+
+    storage: ObjectStorage
+    bucket_name: str = "arxiv-cache"
+
+    def __post_init__(self):
+        self._codec = JSONCodec()
+
+    async def get(self, arxiv_id: str) -> dict[str, Any] | None:
+        # A missing entry comes back as None, one round trip per lookup
+        obj = await self.storage.get_object(self.bucket_name, _cache_key(arxiv_id))
+        if obj is None:
+            return None
+        return self._codec.decode(obj.data)
+
+    async def put(self, arxiv_id: str, entry: dict[str, Any]) -> None:
+        await self.storage.put_file(
+            self.bucket_name,
+            _cache_key(arxiv_id),
+            io.BytesIO(self._codec.encode(entry)),
+            ObjectStorageOptionalPutArgs(content_type=self._codec.content_type),
+        )
+
+
+@dataclass
+class DiskPaperCache:
+    """
+    Worker local cache, one JSON file per paper. Reads refresh the file's
+    mtime and writes evict the least recently used files above `max_bytes`.
+    """
+
+    directory: Path
+    max_bytes: int = 1 << 30
+    logger: BoundLogger = get_logger("worker.crawler.cache")
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+
+    def __post_init__(self):
+        self.directory = Path(self.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _read(self, path: Path) -> dict[str, Any] | None:
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by a concurrent write, before or after the read
+            return None
+        return json.loads(data)
+
+    def _write(self, path: Path, entry: dict[str, Any]) -> int:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(path)
+        return self._evict()
+
+    def _evict(self) -> int:
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+    async def get(self, arxiv_id: str) -> dict[str, Any] | None:
+        try:
+            return await asyncio.to_thread(
+                self._read, self.directory / _cache_key(arxiv_id)
+            )
+        except ValueError:
+            # Truncated or corrupt entry, refetch the paper
+            return None
+
+    async def put(self, arxiv_id: str, entry: dict[str, Any]) -> None:
+        async with self._lock:
+            evicted = await asyncio.to_thread(
+                self._write, self.directory / _cache_key(arxiv_id), entry
+            )
+        if evicted:
+            await self.logger.adebug("Evicted cached papers", evicted=evicted)
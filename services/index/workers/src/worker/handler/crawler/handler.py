@@ -1,39 +1,53 @@
 from dataclasses import dataclass
-from structlog.stdlib import BoundLogger
-from pydantic import ValidationError, AnyUrl
+from typing import Literal
 
-from broker import AbstractIncomingMessage, TaskMessage, RabbitMQPublisher
-from tasks import TaskController
-from storage import ObjectStorage
-
-from .arxiv import handle_arxiv_query
-from .._interface import IHandler, ResourceInvalid, HandlerException
-from ..utils import build_resource_url
+from .arxiv import handle_arxiv_query, parse_arxiv_query
+from .cache import DiskPaperCache, MinIOPaperCache, PaperCache
+from .scheduler import FetchScheduler, TokenBucket
+from .._interface import IHandler, ResourceInvalid
+from ..utils import build_resource_url, parse_resource_url
 
 
 @dataclass
 class CrawlerHandler(IHandler):
+    # Paper cache backend: `minio` is shared by every worker, `disk` is local
+    # to the worker and bounded by `cache_max_bytes`.
+    cache: Literal["minio", "disk", "none"] = "minio"
+    cache_bucket: str = "arxiv-cache"
+    cache_dir: str = ".cache/arxiv"
+    cache_max_bytes: int = 1 << 30
+    # Cached papers older than this are fetched again, in seconds
+    cache_ttl: float = 7 * 24 * 3600
+    # arXiv requests (search and PDF downloads) shared by every task of the
+    # worker: at most `fetch_concurrency` in flight, `fetch_rate` per second
+    # on average with bursts of `fetch_burst`.
+    fetch_concurrency: int = 4
+    fetch_rate: float = 1.0
+    fetch_burst: int = 4
+    fetch_retries: int = 3
+
+    def __post_init__(self):
+        self._scheduler = FetchScheduler(
+            bucket=TokenBucket(rate=self.fetch_rate, capacity=self.fetch_burst),
+            concurrency=self.fetch_concurrency,
+            max_retries=self.fetch_retries,
+        )
+        self._cache: PaperCache | None
+        match self.cache:
+            case "minio":
+                self._cache = MinIOPaperCache(self.storage, self.cache_bucket)
+            case "disk":
+                self._cache = DiskPaperCache(self.cache_dir, self.cache_max_bytes)
+            case _:
+                self._cache = None
 
-    async def handle(self, task_id: str, resources_url: str) -> tuple[bytes, str]:
-        try:
-            _url = AnyUrl(resources_url)
-        except Exception as e:
-            raise ResourceInvalid(resources_url, "Invalid resource format") from e
+    async def load(self, resources_url: str) -> tuple[str, int]:
+        _url = parse_resource_url(resources_url)
 
         match (_url.scheme, _url.host):
             case ("web", "arxiv"):
                 try:
-                    resource_content = await handle_arxiv_query(resource_url=_url)
-                    return (
-                        resource_content,
-                        build_resource_url(
-                            "minio",
-                            _url.host,
-                            self.bucket_name,
-                            self.object_name,
-                            task_id,
-                        ),
-                    )
+                    return parse_arxiv_query(_url)
                 except ValueError as e:
                     raise ResourceInvalid(resources_url, str(e))
             case _:
@@ -41,3 +55,30 @@ class CrawlerHandler(IHandler):
                     resources_url,
                     f"Unsupported resource scheme and host: {_url.scheme}, {_url.host}",
                 )
+
+    async def run(self, task_id: str, data: tuple[str, int]) -> dict[str, list[dict]]:
+        query, max_results = data
+        return await handle_arxiv_query(
+            query,
+            max_results,
+            scheduler=self._scheduler,
+            compute=self.compute,
+            cache=self._cache,
+            cache_ttl=self.cache_ttl,
+        )
+
+    def split(
+        self, data: dict[str, list[dict]], size: int
+    ) -> list[dict[str, list[dict]]]:
+        docs = data["docs"]
+        return [{"docs": docs[i : i + size]} for i in range(0, len(docs), size)]
+
+    def output_url(self, task_id: str, resources_url: str) -> str:
+        _url = parse_resource_url(resources_url)
+        return build_resource_url(
+            "minio",
+            _url.host or "",
+            self.bucket_name,
+            self.object_name,
+            task_id,
+        )
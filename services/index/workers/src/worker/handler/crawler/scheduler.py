@@ -0,0 +1,111 @@
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import TypeVar
+
+import arxiv
+import requests
+from structlog.stdlib import BoundLogger
+
+from logs import get_logger
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average, with bursts of up to
+    `capacity`.
+    """
+
+    rate: float
+    capacity: int = 1
+    _tokens: float = field(init=False)
+    _updated: float = field(init=False)
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+
+    def __post_init__(self):
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retry_after(error: Exception) -> float | None:
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        value = error.response.headers.get("Retry-After", "")
+        if value.isdigit():
+            return float(value)
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, requests.HTTPError):
+        return (
+            error.response is not None
+            and error.response.status_code in RETRYABLE_STATUS
+        )
+    # Raised by `arxiv.Client` searches once its own retries are exhausted
+    if isinstance(error, arxiv.HTTPError):
+        return error.status in RETRYABLE_STATUS
+    if isinstance(error, arxiv.UnexpectedEmptyPageError):
+        return True
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+@dataclass
+class FetchScheduler:
+    """
+    Runs remote calls with at most `concurrency` in flight, each attempt
+    taking a token from the shared bucket. Throttling and transient errors
+    are retried with exponential backoff, honouring `Retry-After`.
+    """
+
+    bucket: TokenBucket
+    concurrency: int = 4
+    max_retries: int = 3
+    backoff: float = 1.0
+    logger: BoundLogger = get_logger("worker.crawler.scheduler")
+
+    def __post_init__(self):
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+    async def run(self, func: Callable[[], Awaitable[T]], name: str = "") -> T:
+        async with self._slots:
+            attempt = 0
+            while True:
+                await self.bucket.acquire()
+                try:
+                    return await func()
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise
+                    delay = _retry_after(e)
+                    if delay is None:
+                        delay = self.backoff * 2**attempt * (1 + random.random())
+                    attempt += 1
+                    await self.logger.awarning(
+                        "Fetch failed, retrying",
+                        name=name,
+                        attempt=attempt,
+                        delay=round(delay, 2),
+                        error=str(e),
+                    )
+                    await asyncio.sleep(delay)
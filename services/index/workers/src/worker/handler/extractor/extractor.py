@@ -1,78 +1,81 @@
+from typing import Any
+
 from pydantic import AnyUrl
 from storage import ObjectStorage
 import spacy
-from dataclasses import dataclass, asdict
-
-from ..utils import load_resources, parse_s3_resource_url, get_spacy
-
-
-@dataclass(slots=True)
-class Entity:
-    name: str
-    type: str
-    description: str
-
-
-def parse_resource_content(resource_content: bytes) -> dict[str, str]:
-    import json
-
-    try:
-        resource_json = json.loads(resource_content.decode("utf-8"))
-        return resource_json
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON format: {e}")
 
-
-def extract_from_sent(sent: str) -> list[Entity]:
+from ..utils import (
+    load_artifact,
+    parse_s3_resource_url,
+    get_spacy,
+    spacy_n_process,
+)
+
+
+def extract_entities_from_docs(
+    chunks: list[dict[str, str]], batch_size: int = 256, n_process: int = 1
+) -> dict[str, Any]:
+    """
+    Run NER over every chunk in batches, keeping the chunk index attached to
+    each document through `as_tuples`. Sentence segmentation is not needed here.
+
+    Returns a deduplicated payload:
+        labels: entity type -> description, stored once per type
+        entities: unique `{name, type}` rows
+        mentions: `[chunk_index, entity_index]` pairs, one per chunk and entity
+    """
     nlp = get_spacy()
-    doc = nlp(sent)
-    entities = []
-    for ent in doc.ents:
-        description = spacy.explain(ent.label_)  # type: ignore
-        entities.append(
-            Entity(
-                name=ent.text,
-                type=ent.label_,
-                description=description if description else "",
-            )
-        )
-    return entities
-
-
-def extract_entities_from_docs(docs: dict[str, str]) -> list[dict[str, str]]:
-    extracted_entities = []
-    for k, v in docs.items():
-        if v.strip():
-            entities = extract_from_sent(v.strip())
-            if entities:
-                for entity in entities:
-
-                    extracted_entities.append({"chunk_id": k, **asdict(entity)})
-    return extracted_entities
-
+    labels: dict[str, str] = {}
+    entities: list[dict[str, str]] = []
+    entity_index: dict[tuple[str, str], int] = {}
+    mentions: dict[tuple[int, int], None] = {}
+    for doc, chunk_idx in nlp.pipe(
+        ((c["text"].strip(), i) for i, c in enumerate(chunks) if c["text"].strip()),
+        as_tuples=True,
+        batch_size=batch_size,
+        n_process=spacy_n_process(n_process),
+        disable=["senter"],
+    ):
+        for ent in doc.ents:
+            if ent.label_ not in labels:
+                labels[ent.label_] = spacy.explain(ent.label_) or ""  # type: ignore
+            key = (ent.text, ent.label_)
+            if key not in entity_index:
+                entity_index[key] = len(entities)
+                entities.append({"name": ent.text, "type": ent.label_})
+            mentions[(chunk_idx, entity_index[key])] = None
+    return {
+        "labels": labels,
+        "entities": entities,
+        "mentions": [list(m) for m in mentions],
+    }
 
-async def extract_entities(
-    resource_url: AnyUrl,
-    storage: ObjectStorage,
-) -> bytes:
-    import json
 
+async def load_chunks(
+    resource_url: AnyUrl, storage: ObjectStorage
+) -> list[dict[str, str]]:
     bucket_name, object_name = parse_s3_resource_url(resource_url)
-    resource_content = await load_resources(
+    artifact = await load_artifact(
         storage=storage,
         bucket_name=bucket_name,
         object_name=object_name,
     )
 
-    if resource_content is None:
+    if artifact is None:
         raise ValueError(f"Resource not found: {resource_url}")
 
-    docs = parse_resource_content(resource_content)
-    if not docs:
+    chunks = artifact.get("chunks", [])
+    if not chunks:
         raise ValueError(f"No documents found in resource: {resource_url}")
+    return chunks
+
 
-    extracted_output = {
-        "chunks": [{"id": k, "text": v} for k, v in docs.items()],
-        "entities": extract_entities_from_docs(docs),
+def extract_entities(
+    chunks: list[dict[str, str]], batch_size: int = 256, n_process: int = 1
+) -> dict[str, Any]:
+    return {
+        "chunks": chunks,
+        **extract_entities_from_docs(
+            chunks, batch_size=batch_size, n_process=n_process
+        ),
     }
-    return json.dumps(extracted_output, ensure_ascii=False).encode("utf-8")
@@ -1,45 +1,60 @@
 from dataclasses import dataclass
-from structlog.stdlib import BoundLogger
-from pydantic import ValidationError, AnyUrl
+from typing import Any
 
-from broker import AbstractIncomingMessage, TaskMessage, RabbitMQPublisher
-from tasks import TaskController
-from storage import ObjectStorage
-
-from .extractor import extract_entities
-from .._interface import IHandler, ResourceInvalid, HandlerException
-from ..utils import build_resource_url
+from .extractor import load_chunks, extract_entities
+from .._interface import IHandler, ResourceInvalid
+from ..utils import (
+    build_resource_url,
+    get_spacy,
+    parse_resource_url,
+    spacy_model_version,
+)
 
 
 @dataclass
 class ExtractorHandler(IHandler):
-    async def handle(self, task_id: str, resources_url: str) -> tuple[bytes, str]:
-        try:
-            _url = AnyUrl(resources_url)
-        except Exception as e:
-            raise ResourceInvalid(resources_url, "Invalid resource format") from e
+    compute_initializer = get_spacy
+
+    batch_size: int = 256
+    n_process: int = 1
+
+    async def load(self, resources_url: str) -> list[dict[str, str]]:
+        _url = parse_resource_url(resources_url)
 
         match (_url.scheme, _url.host):
             case ("minio", "arxiv"):
                 try:
-                    resource_content = await extract_entities(
+                    return await load_chunks(
                         resource_url=_url,
                         storage=self.storage,
                     )
                 except ValueError as e:
                     raise ResourceInvalid(resources_url, str(e))
-                return (
-                    resource_content,
-                    build_resource_url(
-                        "minio",
-                        _url.host,
-                        self.bucket_name,
-                        self.object_name,
-                        task_id,
-                    ),
-                )
             case _:
                 raise ResourceInvalid(
                     resources_url,
                     f"Unsupported resource scheme and host: {_url.scheme}, {_url.host}",
                 )
+
+    async def run(
+        self, task_id: str, data: list[dict[str, str]]
+    ) -> dict[str, Any]:
+        return await self.compute.submit(
+            extract_entities,
+            data,
+            batch_size=self.batch_size,
+            n_process=self.n_process,
+        )
+
+    def output_url(self, task_id: str, resources_url: str) -> str:
+        _url = parse_resource_url(resources_url)
+        return build_resource_url(
+            "minio",
+            _url.host or "",
+            self.bucket_name,
+            self.object_name,
+            task_id,
+        )
+
+    def fingerprint(self) -> dict[str, Any]:
+        return {"model": spacy_model_version()}
@@ -1,7 +1,7 @@
 from storage import ObjectStorage
 from pydantic import AnyUrl
 
-from ..utils import load_resources, parse_s3_resource_url
+from ..utils import load_artifact, parse_s3_resource_url
 
 
 def format_arxiv_document(doc: dict) -> str:
@@ -22,32 +22,24 @@ def format_arxiv_document(doc: dict) -> str:
     return doc_str.strip()
 
 
-def parse_resource_content(resource_content: bytes) -> list[dict]:
-    import json
-
-    try:
-        resource_json = json.loads(resource_content.decode("utf-8"))
-        return resource_json.get("docs", [])
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON format: {e}")
-
-
-async def parse_arxiv_documents(
-    storage: ObjectStorage, resource_url: AnyUrl, separator: str
-) -> bytes:
+async def load_arxiv_documents(
+    storage: ObjectStorage, resource_url: AnyUrl
+) -> list[dict]:
     bucket_name, object_name = parse_s3_resource_url(resource_url)
-    resource_content = await load_resources(
+    artifact = await load_artifact(
         storage=storage,
         bucket_name=bucket_name,
         object_name=object_name,
     )
 
-    if resource_content is None:
+    if artifact is None:
         raise ValueError(f"Resource not found: {resource_url}")
 
-    docs = parse_resource_content(resource_content)
+    docs = artifact.get("docs", [])
     if not docs:
         raise ValueError(f"No documents found in resource: {resource_url}")
+    return docs
+
 
-    formatted_docs = [format_arxiv_document(doc) for doc in docs]
-    return separator.join(formatted_docs).encode("utf-8")
+def parse_arxiv_documents(docs: list[dict]) -> dict[str, list[str]]:
+    return {"docs": [format_arxiv_document(doc) for doc in docs]}
@@ -1,23 +1,88 @@
+import hashlib
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import lru_cache
+from importlib import metadata
+from typing import Any
 
-from storage import ObjectStorage
+from storage import ObjectStorage, codec_for_content_type
 from pydantic import AnyUrl
 
+from ._interface import ResourceInvalid
+from ..compute import in_compute_pool
+
+
+SPACY_MODEL = "en_core_web_sm"
+
 
 @lru_cache
 def get_spacy():
     import spacy
 
-    nlp = spacy.load("en_core_web_sm", exclude=["parser"])
+    nlp = spacy.load(SPACY_MODEL, exclude=["parser"])
     nlp.enable_pipe("senter")
     return nlp
 
 
-async def load_resources(
+def spacy_n_process(n_process: int) -> int:
+    """
+    `n_process` for `nlp.pipe`. Inside the compute pool every process already
+    runs its own jobs, so spaCy is kept in-process there instead of starting a
+    nested pool per job; `n_process` only applies to calls outside the pool.
+    """
+    return 1 if in_compute_pool() else n_process
+
+
+@lru_cache
+def spacy_model_version() -> str:
+    """
+    Version of the installed spaCy model, read from the package metadata so
+    the model does not have to be loaded in the event loop process.
+    """
+    try:
+        return f"{SPACY_MODEL}-{metadata.version(SPACY_MODEL)}"
+    except metadata.PackageNotFoundError:
+        import spacy
+
+        return f"{SPACY_MODEL}-spacy-{spacy.__version__}"
+
+
+# Bytes fetched by `load_artifact` in the current context, if counted
+_loaded_bytes: ContextVar[list[int] | None] = ContextVar("loaded_bytes", default=None)
+
+
+@contextmanager
+def count_loaded_bytes() -> Iterator[list[int]]:
+    """
+    Count the artifact bytes loaded within the block, available as the only
+    item of the yielded list.
+    """
+    counter = [0]
+    token = _loaded_bytes.set(counter)
+    try:
+        yield counter
+    finally:
+        _loaded_bytes.reset(token)
+
+
+async def load_artifact(
     storage: ObjectStorage, bucket_name: str, object_name: str
-) -> bytes | None:
-    resource_content = await storage.get_file(bucket_name, object_name)
-    return resource_content
+) -> Any | None:
+    """
+    Fetch a stage artifact and decode it with the codec matching the content
+    type it was stored with.
+    """
+    resource = await storage.get_object(bucket_name, object_name)
+    if resource is None:
+        return None
+    if (counter := _loaded_bytes.get()) is not None:
+        counter[0] += len(resource.data)
+    try:
+        return codec_for_content_type(resource.content_type).decode(resource.data)
+    except Exception as e:
+        raise ValueError(f"Invalid artifact format: {e}") from e
 
 
 def parse_s3_resource_url(resource_url: AnyUrl) -> tuple[str, str]:
@@ -35,3 +100,33 @@ def build_resource_url(
     scheme: str, host: str, bucket_name: str, object_name: str, task_id: str
 ) -> str:
     return f"{scheme}://{host}/{bucket_name}/{task_id}_{object_name}"
+
+
+def artifact_key(
+    task_name: str,
+    resources_url: str,
+    args: dict[str, Any],
+    fingerprint: dict[str, Any],
+) -> str:
+    """
+    Content address of a stage output. Inputs are themselves addressed this
+    way, so the key transitively covers the whole chain that produced it.
+    """
+    payload = json.dumps(
+        {
+            "stage": task_name,
+            "input": resources_url,
+            "args": args,
+            "handler": fingerprint,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_resource_url(resources_url: str) -> AnyUrl:
+    try:
+        return AnyUrl(resources_url)
+    except Exception as e:
+        raise ResourceInvalid(resources_url, "Invalid resource format") from e
@@ -1,11 +1,16 @@
+import asyncio
 from dataclasses import dataclass
+import datetime
+import hashlib
 import io
+import time
+from typing import Any
 
 from structlog.stdlib import BoundLogger
 from logs import get_logger
 
-from storage import ObjectStorage
-from tasks import TaskController, TaskUpdate, TaskStatus
+from storage import ObjectStorage, ObjectStorageOptionalPutArgs
+from tasks import TaskController, TaskUpdate, TaskStatus, Pipeline, StageRecorder
 from broker import (
     RabbitMQPublisher,
     AbstractIncomingMessage,
@@ -13,8 +18,13 @@ from broker import (
     RabbitMQSubscriber,
     start_subscriber,
 )
-from .handler import HandlerRegistry
-from .handler.utils import build_resource_url
+from .handler import HandlerRegistry, IHandler
+from .handler.utils import artifact_key, count_loaded_bytes
+
+# Metadata of sub-task messages created by a fan-out
+PARENT_ID = "parent_id"
+PART_INDEX = "part_index"
+PART_COUNT = "part_count"
 
 
 @dataclass
@@ -22,11 +32,248 @@ class Processor:
     storage: ObjectStorage
     task_controller: TaskController
     rabbitmq_publisher: RabbitMQPublisher
-    rabbitmq_subscriber: RabbitMQSubscriber
+    rabbitmq_subscribers: list[RabbitMQSubscriber]
     handlers: HandlerRegistry
+    pipeline: Pipeline
+    # Stage timings for the task history
+    stage_recorder: StageRecorder
     logger: BoundLogger = get_logger("worker.processor")
 
-    async def _process_message(self, task_msg: TaskMessage) -> bool:
+    def _output_key(self, handler: IHandler, task_id: str, resource_url: str) -> str:
+        """
+        Prefix of the stored output object: the task id, or the content
+        address of the output when the pipeline is content addressed.
+        """
+        if not self.pipeline.content_addressed:
+            return task_id
+        return artifact_key(
+            handler.task_name,
+            resource_url,
+            self.pipeline.pipeline[handler.task_name].args,
+            handler.fingerprint(),
+        )
+
+    def _keyed_by_content(self, handler: IHandler) -> bool:
+        """
+        Whether the stage output is keyed by the hash of its own content. The
+        first stage fetches external data and fan-out stages are split per
+        run, their output is not a function of their input location: they are
+        always run and the following stages are addressed from what they
+        produced.
+        """
+        task_info = self.pipeline.pipeline[handler.task_name]
+        return self.pipeline.content_addressed and (
+            task_info.first or task_info.fan_out > 0
+        )
+
+    def _address(
+        self,
+        chain: list[IHandler],
+        task_id: str,
+        urls: list[str],
+        keys: list[str],
+        begin: int = 0,
+    ) -> None:
+        """
+        Compute the output keys and locations of `chain[begin:]` from the
+        input location `urls[begin]`, replacing any previous ones.
+        """
+        del urls[begin + 1 :], keys[begin:]
+        for handler in chain[begin:]:
+            keys.append(self._output_key(handler, task_id, urls[-1]))
+            urls.append(handler.output_url(keys[-1], urls[-1]))
+
+    async def _reusable_from(
+        self, chain: list[IHandler], keys: list[str], task_id: str, begin: int = 0
+    ) -> int:
+        """
+        Index of the first handler of `chain[begin:]` that has to run, skipping
+        the prefix whose outputs are already stored.
+        """
+        if not self.pipeline.content_addressed:
+            return begin
+        # Keys past a stage keyed by content are only known once it has run
+        end = next(
+            (
+                i
+                for i in range(begin, len(chain))
+                if self._keyed_by_content(chain[i])
+            ),
+            len(chain),
+        )
+        for i in range(end - 1, begin - 1, -1):
+            handler = chain[i]
+            if await self.storage.exists(
+                handler.bucket_name, f"{keys[i]}_{handler.object_name}"
+            ):
+                await self.logger.ainfo(
+                    "Reusing stored artifact",
+                    task_id=task_id,
+                    task_name=handler.task_name,
+                    key=keys[i],
+                )
+                return i + 1
+        return begin
+
+    async def _store(
+        self, handler: IHandler, task_id: str, key: str | None, data: Any
+    ) -> tuple[str, int]:
+        """
+        Store a stage output under `key`, or under the hash of its encoded
+        content when `key` is None. Returns the key used and the stored size.
+        """
+        started = time.perf_counter()
+        payload = handler.dump(data)
+        encode_time = time.perf_counter() - started
+        if key is None:
+            key = hashlib.sha256(payload).hexdigest()
+        await self.storage.put_file(
+            handler.bucket_name,
+            f"{key}_{handler.object_name}",
+            io.BytesIO(payload),
+            ObjectStorageOptionalPutArgs(content_type=handler.codec.content_type),
+        )
+        await self.logger.ainfo(
+            "Artifact stored",
+            task_id=task_id,
+            task_name=handler.task_name,
+            content_type=handler.codec.content_type,
+            size=len(payload),
+            encode_ms=round(encode_time * 1000, 2),
+        )
+        return key, len(payload)
+
+    async def _record(
+        self,
+        task_msg: TaskMessage,
+        handler: IHandler,
+        status: TaskStatus,
+        started_at: datetime.datetime,
+        bytes_in: int | None = None,
+        bytes_out: int | None = None,
+    ) -> None:
+        await self.stage_recorder.record(
+            task_id=task_msg.id,
+            phase=handler.task_name,
+            status=status,
+            started_at=started_at,
+            bytes_in=bytes_in,
+            bytes_out=bytes_out,
+        )
+
+    def _fans_out(self, handler: IHandler, task_msg: TaskMessage) -> bool:
+        # Sub-tasks are not split again
+        return (
+            self.pipeline.pipeline[handler.task_name].fan_out > 0
+            and PARENT_ID not in task_msg.metadata
+        )
+
+    async def _fan_out(
+        self, handler: IHandler, task_msg: TaskMessage, input_url: str, data: Any
+    ) -> int | None:
+        """
+        Split the stage output into sub-tasks published to the next stage.
+        Returns the stored size of the parts, or None when the output is too
+        small to be split.
+        """
+        parts = handler.split(data, self.pipeline.pipeline[handler.task_name].fan_out)
+        if len(parts) < 2:
+            return None
+
+        ids = await self.task_controller.create_subtasks(
+            task_msg.id, len(parts), handler.next_task_name
+        )
+        # Parts of a content-addressed pipeline are keyed by their content, so
+        # the following stages can reuse outputs of identical parts.
+        stored = await asyncio.gather(
+            *(
+                self._store(
+                    handler,
+                    task_id,
+                    None if self.pipeline.content_addressed else task_id,
+                    part,
+                )
+                for task_id, part in zip(ids, parts)
+            )
+        )
+        await self.rabbitmq_publisher.publish_many(
+            exchange_name=handler.exchange_name,
+            messages=(
+                (
+                    handler.routing_key,
+                    TaskMessage(
+                        id=task_id,
+                        task_name=handler.next_task_name,
+                        resource_url=handler.output_url(key, input_url),
+                        metadata={
+                            **task_msg.metadata,
+                            PARENT_ID: task_msg.id,
+                            PART_INDEX: i,
+                            PART_COUNT: len(parts),
+                        },
+                    )
+                    .model_dump_json(exclude_none=True)
+                    .encode("utf-8"),
+                )
+                for i, (task_id, (key, _)) in enumerate(zip(ids, stored))
+            ),
+        )
+        await self.logger.ainfo(
+            "Task fanned out",
+            task_id=task_msg.id,
+            task_name=handler.task_name,
+            parts=len(parts),
+        )
+        return sum(size for _, size in stored)
+
+    async def _fan_in(
+        self, handler: IHandler, task_msg: TaskMessage, resource_url: str
+    ) -> TaskUpdate:
+        """
+        Record a finished sub-task. The last one to finish publishes the
+        outputs of every part to the next stage under the parent task.
+        """
+        parent_id = task_msg.metadata[PARENT_ID]
+        parts = await self.task_controller.complete_subtask(
+            task_msg.id, parent_id, handler.task_name, resource_url
+        )
+        if parts is not None:
+            metadata = {
+                k: v
+                for k, v in task_msg.metadata.items()
+                if k not in (PARENT_ID, PART_INDEX, PART_COUNT)
+            }
+            await self.rabbitmq_publisher.publish(
+                exchange_name=handler.exchange_name,
+                routing_key=handler.routing_key,
+                message=TaskMessage(
+                    id=parent_id,
+                    task_name=handler.next_task_name,
+                    resource_url=parts[0],
+                    metadata={**metadata, "parts": parts},
+                )
+                .model_dump_json(exclude_none=True)
+                .encode("utf-8"),
+            )
+            await self.task_controller.update(
+                TaskUpdate(
+                    id=parent_id,
+                    status=TaskStatus.IN_PROGRESS,
+                    phase=handler.task_name,
+                )
+            )
+            await self.logger.ainfo(
+                "Sub-tasks gathered", task_id=parent_id, parts=len(parts)
+            )
+        return TaskUpdate(
+            id=task_msg.id, status=TaskStatus.COMPLETED, phase=handler.task_name
+        )
+
+    async def _process_message(self, task_msg: TaskMessage) -> TaskUpdate | None:
+        """
+        Run the handler chain for the message and hand the result to the next
+        stage. Returns the task update to record, or None if nothing was run.
+        """
         if task_msg.resource_url is None:
             await self.logger.aerror(
                 "Task message has no resource URL",
@@ -34,43 +281,139 @@ class Processor:
                 task_name=task_msg.task_name,
                 resource_url=task_msg.resource_url,
             )
-            return False
+            return None
 
-        # Process the task message (e.g., download, analyze, etc.)
-        # This is a placeholder for actual processing logic
-        handler = self.handlers.get_handler(task_msg.task_name)
-        if not handler:
-            await self.logger.aerror(
-                "No handler found for task",
-                task_name=task_msg.task_name,
-                task_id=task_msg.id,
-                resource_url=task_msg.resource_url,
+        chain: list[IHandler] = []
+        for task_name in self.pipeline.fused_chain(task_msg.task_name):
+            handler = self.handlers.get_handler(task_name)
+            if not handler:
+                await self.logger.aerror(
+                    "No handler found for task",
+                    task_name=task_name,
+                    task_id=task_msg.id,
+                    resource_url=task_msg.resource_url,
+                )
+                return None
+            chain.append(handler)
+
+        # Output locations only depend on the input location, so they are
+        # known before anything runs and stored outputs can be looked up, up
+        # to the first stage keyed by its content.
+        urls = [task_msg.resource_url]
+        keys: list[str] = []
+        self._address(chain, task_msg.id, urls, keys)
+        i = load_at = await self._reusable_from(chain, keys, task_msg.id)
+
+        # Outputs are passed in memory along the chain, only the last one,
+        # checkpointed stages and stages keyed by content are written to
+        # storage.
+        data = None
+        while i < len(chain):
+            handler = chain[i]
+            started_at = datetime.datetime.now(datetime.UTC)
+            bytes_in = bytes_out = None
+            by_content = self._keyed_by_content(handler)
+            try:
+                if i == load_at:
+                    with count_loaded_bytes() as loaded:
+                        data = await handler.load(urls[i])
+                    bytes_in = loaded[0]
+                data = await handler.run(task_msg.id, data)
+                if handler is chain[-1] and self._fans_out(handler, task_msg):
+                    bytes_out = await self._fan_out(handler, task_msg, urls[i], data)
+                    if bytes_out is not None:
+                        await self._record(
+                            task_msg,
+                            handler,
+                            TaskStatus.COMPLETED,
+                            started_at,
+                            bytes_in=bytes_in,
+                            bytes_out=bytes_out,
+                        )
+                        return TaskUpdate(
+                            id=task_msg.id,
+                            status=TaskStatus.IN_PROGRESS,
+                            phase=handler.task_name,
+                        )
+                if (
+                    handler is chain[-1]
+                    or by_content
+                    or self.pipeline.pipeline[handler.task_name].checkpoint
+                ):
+                    keys[i], bytes_out = await self._store(
+                        handler, task_msg.id, None if by_content else keys[i], data
+                    )
+                    urls[i + 1] = handler.output_url(keys[i], urls[i])
+            except Exception:
+                await self._record(
+                    task_msg, handler, TaskStatus.FAILED, started_at, bytes_in=bytes_in
+                )
+                raise
+            await self._record(
+                task_msg,
+                handler,
+                TaskStatus.COMPLETED,
+                started_at,
+                bytes_in=bytes_in,
+                bytes_out=bytes_out,
             )
-            return False
-        processed_data, new_resource_url = await handler.handle(
-            task_msg.id, task_msg.resource_url
-        )
+            if handler is not chain[-1]:
+                await self.task_controller.update(
+                    TaskUpdate(
+                        id=task_msg.id,
+                        status=TaskStatus.IN_PROGRESS,
+                        phase=handler.task_name,
+                    )
+                )
+            i += 1
+            if by_content and i < len(chain):
+                # The rest of the chain is addressed from the stored output
+                self._address(chain, task_msg.id, urls, keys, i)
+                resume = await self._reusable_from(chain, keys, task_msg.id, i)
+                if resume > i:
+                    i = load_at = resume
 
-        await self.storage.put_file(
-            handler.bucket_name,
-            f"{task_msg.id}_{handler.object_name}",
-            io.BytesIO(processed_data),
-        )
+        last = chain[-1]
+        if (
+            PARENT_ID in task_msg.metadata
+            and self.pipeline.pipeline[last.task_name].last
+        ):
+            return await self._fan_in(last, task_msg, urls[-1])
 
         await self.rabbitmq_publisher.publish(
-            exchange_name=handler.exchange_name,
-            routing_key=handler.routing_key,
+            exchange_name=last.exchange_name,
+            routing_key=last.routing_key,
             message=TaskMessage(
                 id=task_msg.id,
-                task_name=handler.next_task_name,
-                resource_url=new_resource_url,
+                task_name=last.next_task_name,
+                resource_url=urls[-1],
                 metadata=task_msg.metadata,
             )
             .model_dump_json(exclude_none=True)
             .encode("utf-8"),
         )
 
-        return True
+        return TaskUpdate(
+            id=task_msg.id, status=TaskStatus.IN_PROGRESS, phase=last.task_name
+        )
+
+    async def _fail(self, task_msg: TaskMessage) -> None:
+        await self.task_controller.update(
+            TaskUpdate(
+                id=task_msg.id,
+                status=TaskStatus.FAILED,
+                phase=task_msg.task_name,
+            )
+        )
+        # A failed part fails the whole task, the fan-in would never complete
+        if parent_id := task_msg.metadata.get(PARENT_ID):
+            await self.task_controller.update(
+                TaskUpdate(
+                    id=parent_id,
+                    status=TaskStatus.FAILED,
+                    phase=task_msg.task_name,
+                )
+            )
 
     async def callback(self, msg: AbstractIncomingMessage) -> bool:
         try:
@@ -83,40 +426,34 @@ class Processor:
             )
             return False
         try:
-            result = await self._process_message(task_msg)
-            if result:
-                await self.task_controller.update(
-                    TaskUpdate(
-                        id=task_msg.id,
-                        status=TaskStatus.IN_PROGRESS,
-                        phase=task_msg.task_name,
-                    )
-                )
+            update = await self._process_message(task_msg)
+            if update:
+                await self.task_controller.update(update)
             else:
-                await self.task_controller.update(
-                    TaskUpdate(
-                        id=task_msg.id,
-                        status=TaskStatus.FAILED,
-                        phase=task_msg.task_name,
-                    )
-                )
-            return result
+                await self._fail(task_msg)
+            return update is not None
         except Exception as e:
-            await self.task_controller.update(
-                TaskUpdate(
-                    id=task_msg.id,
-                    status=TaskStatus.FAILED,
-                    phase=task_msg.task_name,
-                )
-            )
+            await self._fail(task_msg)
             return False
 
     async def process(self):
         """
         Start the message processing loop.
         """
-        coro = await self.rabbitmq_subscriber.subscribe(
-            callback=self.callback,
+        # One subscriber per input queue, all feeding the same callback
+        coros = [
+            await subscriber.subscribe(callback=self.callback)
+            for subscriber in self.rabbitmq_subscribers
+        ]
+
+        async def consume() -> None:
+            await asyncio.gather(*coros)
+
+        async def drain() -> None:
+            await asyncio.gather(*(s.drain() for s in self.rabbitmq_subscribers))
+
+        await self.logger.ainfo(
+            "Processor started and listening for messages",
+            queues=[s.queue_name for s in self.rabbitmq_subscribers],
         )
-        await self.logger.ainfo("Processor started and listening for messages")
-        await start_subscriber(coro)
+        await start_subscriber(consume(), drain=drain)
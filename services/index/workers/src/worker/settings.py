@@ -6,8 +6,9 @@ from pydantic_settings import (
 )
 from pydantic import BaseModel, HttpUrl
 
-from broker import RabbitMQSettings
+from broker import RabbitMQSettings, SubscriberSettings
 from db import PostgreSQLSettings
+from tasks import StatusWriterSettings
 from storage import MinioSettings
 
 
@@ -15,10 +16,25 @@ class MasterConnectorSettings(BaseModel):
     url: HttpUrl
 
 
+class ComputeSettings(BaseModel):
+    # Number of processes for CPU-bound handlers, defaults to the CPU count.
+    pool_size: int | None = None
+    # Jobs allowed in the pool at once, defaults to twice the pool size so
+    # every process has the next job queued. Messages taken from the broker
+    # are bounded by the subscriber prefetch, not by this.
+    max_pending: int | None = None
+
+
 class Settings(BaseSettings):
     rabbitmq: RabbitMQSettings
+    subscriber: SubscriberSettings = SubscriberSettings()
     postgre: PostgreSQLSettings
+    status_writer: StatusWriterSettings = StatusWriterSettings()
     minio: MinioSettings
+    compute: ComputeSettings = ComputeSettings()
+    # Pipeline stages served by this worker, all of them when unset. The
+    # `--stages` command line option takes precedence.
+    stages: list[str] | None = None
 
     master: MasterConnectorSettings
 
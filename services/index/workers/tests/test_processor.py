@@ -0,0 +1,161 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+
+from broker import TaskMessage
+from storage import get_codec
+from tasks import Pipeline, TaskInfo
+from worker.handler import HandlerRegistry
+from worker.processor import Processor
+
+
+class FakeStorage:
+    def __init__(self):
+        self.objects: dict[tuple[str, str], bytes] = {}
+
+    async def exists(self, bucket_name: str, object_name: str) -> bool:
+        return (bucket_name, object_name) in self.objects
+
+    async def put_file(self, bucket_name, object_name, data, optional_args=None):
+        self.objects[(bucket_name, object_name)] = data.read()
+        return bucket_name, object_name
+
+    def load(self, resources_url: str) -> Any:
+        bucket_name, object_name = resources_url.removeprefix("minio://").split("/")
+        return json.loads(self.objects[(bucket_name, object_name)])
+
+
+class FakePublisher:
+    def __init__(self):
+        self.messages: list[TaskMessage] = []
+
+    async def publish(self, exchange_name: str, routing_key: str, message: bytes):
+        self.messages.append(TaskMessage.model_validate_json(message))
+
+
+class Noop:
+    async def update(self, *args, **kwargs):
+        pass
+
+    async def record(self, *args, **kwargs):
+        pass
+
+
+@dataclass
+class FakeHandler:
+    task_name: str
+    next_task_name: str
+    storage: FakeStorage
+    # Crawl results served for any query, changed by the tests
+    results: list[str] = field(default_factory=list)
+    runs: int = 0
+
+    codec = get_codec("json")
+    object_name = "out.json"
+    exchange_name = "backlog"
+    routing_key = "backlog.first"
+
+    @property
+    def bucket_name(self) -> str:
+        return self.task_name
+
+    async def load(self, resources_url: str) -> Any:
+        if resources_url.startswith("query://"):
+            return None
+        return self.storage.load(resources_url)
+
+    async def run(self, task_id: str, data: Any) -> Any:
+        self.runs += 1
+        if data is None:
+            return list(self.results)
+        return [doc.upper() for doc in data]
+
+    def dump(self, data: Any) -> bytes:
+        return self.codec.encode(data)
+
+    def output_url(self, task_id: str, resources_url: str) -> str:
+        return f"minio://{self.bucket_name}/{task_id}_{self.object_name}"
+
+    def fingerprint(self) -> dict[str, Any]:
+        return {}
+
+
+def _processor(fuse: list[str]) -> tuple[Processor, FakeHandler, FakeHandler]:
+    storage = FakeStorage()
+    pipeline = Pipeline(
+        exchange_name="backlog",
+        backlog_queue_name="backlog",
+        builder_queue_name="builder_queue",
+        content_addressed=True,
+        fuse=fuse,
+        pipeline={
+            name: TaskInfo(
+                handler=f"handler.{name}",
+                task_name=name,
+                next_task_name=next_name,
+                first=name == "crawler",
+                routing_key="backlog.first",
+                bucket_name=name,
+                object_name="out.json",
+            )
+            for name, next_name in (("crawler", "parser"), ("parser", "builder"))
+        },
+    )
+    crawler = FakeHandler("crawler", "parser", storage, results=["a", "b"])
+    parser = FakeHandler("parser", "builder", storage)
+    handlers = HandlerRegistry()
+    handlers.register("crawler", crawler)  # type: ignore[arg-type]
+    handlers.register("parser", parser)  # type: ignore[arg-type]
+    processor = Processor(
+        storage=storage,  # type: ignore[arg-type]
+        task_controller=Noop(),  # type: ignore[arg-type]
+        rabbitmq_publisher=FakePublisher(),  # type: ignore[arg-type]
+        rabbitmq_subscribers=[],
+        handlers=handlers,
+        pipeline=pipeline,
+        stage_recorder=Noop(),  # type: ignore[arg-type]
+    )
+    return processor, crawler, parser
+
+
+async def _run(processor: Processor, task_id: str, task_name: str, url: str) -> str:
+    await processor._process_message(
+        TaskMessage(id=task_id, task_name=task_name, resource_url=url, metadata={})
+    )
+    return processor.rabbitmq_publisher.messages[-1].resource_url  # type: ignore
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_follows_new_crawl_results():
+    processor, crawler, parser = _processor(fuse=[])
+    storage = processor.storage
+
+    crawled = await _run(processor, "t1", "crawler", "query://q")
+    parsed = await _run(processor, "t1", "parser", crawled)
+    assert storage.load(parsed) == ["A", "B"]  # type: ignore[attr-defined]
+
+    crawler.results = ["a", "c"]
+    crawled_again = await _run(processor, "t2", "crawler", "query://q")
+    assert crawled_again != crawled
+    parsed_again = await _run(processor, "t2", "parser", crawled_again)
+    assert storage.load(parsed_again) == ["A", "C"]  # type: ignore[attr-defined]
+    assert crawler.runs == parser.runs == 2
+
+
+@pytest.mark.asyncio
+async def test_fused_chain_reuses_only_unchanged_crawls():
+    processor, crawler, parser = _processor(fuse=["crawler", "parser"])
+    storage = processor.storage
+
+    first = await _run(processor, "t1", "crawler", "query://q")
+    assert await _run(processor, "t2", "crawler", "query://q") == first
+    # The crawl is always run, the parser output of the same crawl is reused
+    assert (crawler.runs, parser.runs) == (2, 1)
+
+    crawler.results = ["c"]
+    changed = await _run(processor, "t3", "crawler", "query://q")
+    assert changed != first
+    assert storage.load(changed) == ["C"]  # type: ignore[attr-defined]
+    assert (crawler.runs, parser.runs) == (3, 2)